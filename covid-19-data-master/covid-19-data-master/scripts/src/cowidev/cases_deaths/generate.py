@@ -10,8 +10,11 @@ from cowidev.utils.utils import export_timestamp
 from cowidev.grapher.db.utils.db_imports import import_dataset
 
 
-def generate_dataset(logger, server_mode):
-    """Generate Cases/Deaths dataset."""
+def generate_dataset(logger, server_mode, bundle=None):
+    """Generate Cases/Deaths dataset.
+
+    If `bundle` is given ("parquet" or "zip"), all wide-format metrics are also exported in one compressed file.
+    """
     # Load data
     logger.info("Cases/Deaths: Loading data…")
     df = load_data(server_mode)
@@ -21,7 +24,7 @@ def generate_dataset(logger, server_mode):
     df = process_data(df)
 
     # Export data
-    export_grapher_file(df, logger)
+    export_grapher_file(df, logger, bundle=bundle)
 
     # logger.info("Generating subnational file…")
     # create_subnational()
@@ -1,9 +1,8 @@
 import os
 from termcolor import colored
 
-import pandas as pd
-
 from cowidev import PATHS
+from cowidev.utils.io import days_since, export_wide
 from cowidev.cases_deaths.params import (
     zero_day,
     DATASET_NAME,
@@ -15,9 +14,9 @@ from cowidev.cases_deaths.params import (
 )
 
 
-def export_grapher_file(df, logger):
+def export_grapher_file(df, logger, bundle=None):
     # The rest of the CSVs
-    succeed = _export_grapher_file(df, PATHS.DATA_CASES_DEATHS_DIR, DATASET_NAME)
+    succeed = _export_grapher_file(df, PATHS.DATA_CASES_DEATHS_DIR, DATASET_NAME, bundle=bundle)
     if succeed:
         logger.info(
             "Successfully exported CSVs to %s\n" % colored(os.path.abspath(PATHS.DATA_CASES_DEATHS_DIR), "magenta")
@@ -27,12 +26,11 @@ def export_grapher_file(df, logger):
         raise ValueError("Case/Death export failed.")
 
 
-def _export_grapher_file(df, output_path, grapher_name):
+def _export_grapher_file(df, output_path, grapher_name, bundle=None):
     # Grapher
-    df_grapher = df.copy()
-    df_grapher["date"] = pd.to_datetime(df_grapher["date"]).map(lambda date: (date - zero_day).days)
-    df_grapher = (
-        df_grapher[GRAPHER_COL_NAMES.keys()]
+    (
+        df[GRAPHER_COL_NAMES.keys()]
+        .assign(date=days_since(df["date"], zero_day))
         .rename(columns=GRAPHER_COL_NAMES)
         .to_csv(os.path.join(output_path, "%s.csv" % grapher_name), index=False)
     )
@@ -64,13 +62,16 @@ def _export_grapher_file(df, output_path, grapher_name):
     df_table[full_data_cols].dropna(subset=METRICS_BASE, how="all").to_csv(
         os.path.join(output_path, "full_data.csv"), index=False
     )
-    # Pivot variables (wide format)
-    for col_name in [*METRICS_BASE, *METRICS_PER_MILLION]:
-        df_pivot = df_table.pivot(index="date", columns="location", values=col_name)
-        # move World to first column
-        cols = df_pivot.columns.tolist()
-        cols.insert(0, cols.pop(cols.index("World")))
-        df_pivot[cols].to_csv(os.path.join(output_path, "%s.csv" % col_name))
+    # Pivot variables (wide format), with World as first column
+    export_wide(
+        df_table,
+        [*METRICS_BASE, *METRICS_PER_MILLION],
+        output_path,
+        first_columns=["World"],
+        bundle=bundle,
+        bundle_name="wide_data",
+        parquet=True,
+    )
     return True
 
 
@@ -17,6 +17,8 @@ from cowidev.cmd.decoupling import click_decoup
 from cowidev.cmd.sweden import click_sweden
 from cowidev.cmd.uk_nations import click_uk_nations
 from cowidev.cmd.check import click_check
+from cowidev.cmd.dag import click_dag
+from cowidev.cmd.grapher import click_grapher_db
 
 
 @click.group(name="cowid", cls=OrderedGroup)
@@ -67,6 +69,8 @@ cli.add_command(click_decoup)
 cli.add_command(click_sweden)
 cli.add_command(click_uk_nations)
 cli.add_command(click_check)
+cli.add_command(click_dag)
+cli.add_command(click_grapher_db)
 
 
 if __name__ == "__main__":
@@ -12,8 +12,14 @@ def click_cases_deaths(ctx):
 
 
 @click.command(name="generate", short_help="Step 1: Generate dataset.")
+@click.option(
+    "--bundle",
+    type=click.Choice(["parquet", "zip"]),
+    default=None,
+    help="Also export all wide-format metrics in one compressed file (wide_data.parquet or wide_data.zip).",
+)
 @click.pass_context
-def click_cd_generate(ctx):
+def click_cd_generate(ctx, bundle):
     feedback_log(
         func=generate_dataset,
         server=ctx.obj["server"],
@@ -22,6 +28,7 @@ def click_cd_generate(ctx):
         step="generate",
         text_success="Public data files generated.",
         logger=ctx.obj["logger"],
+        bundle=bundle,
     )
 
 
@@ -0,0 +1,159 @@
+import os
+import sys
+
+import click
+
+from cowidev import PATHS
+from cowidev.cmd.commons.utils import feedback_log
+from cowidev.utils.dag import DAG, Step, STATUS_FAIL, STATUS_BLOCK
+
+
+# Hospitalization file read by the megafile (written by `cowid hosp grapher-io`)
+HOSP_GRAPHER_FILE = os.path.join(PATHS.INTERNAL_GRAPHER_DIR, "COVID-2019 - Hospital & ICU.csv")
+
+
+def build_dag(global_args: list = None) -> DAG:
+    """Build the DAG of the pipeline steps.
+
+    Each step runs a `cowid` command in a separate process.
+
+    Args:
+        global_args (list, optional): Options passed to `cowid` (e.g. ["--server"]). Defaults to None.
+    """
+    global_args = [] if global_args is None else global_args
+
+    def _cowid(*args):
+        return [sys.executable, "-m", "cowidev.cmd"] + global_args + list(args)
+
+    steps = [
+        # Cases/Deaths
+        Step("jhu-get", _cowid("jhu", "get"), outputs=[PATHS.INTERNAL_INPUT_JHU_DIR]),
+        Step(
+            "jhu-generate",
+            _cowid("jhu", "generate"),
+            depends_on=["jhu-get"],
+            inputs=[PATHS.INTERNAL_INPUT_JHU_DIR, PATHS.INTERNAL_INPUT_JHU_STD_FILE],
+            outputs=[PATHS.DATA_JHU_DIR],
+        ),
+        Step("casedeath-generate", _cowid("casedeath", "generate"), outputs=[PATHS.DATA_CASES_DEATHS_DIR]),
+        # Vaccinations
+        Step("vax-get", _cowid("vax", "get"), outputs=[PATHS.INTERNAL_OUTPUT_VAX_MAIN_DIR]),
+        Step(
+            "vax-process",
+            _cowid("vax", "process"),
+            depends_on=["vax-get"],
+            inputs=[PATHS.INTERNAL_OUTPUT_VAX_MAIN_DIR],
+            outputs=[PATHS.DATA_VAX_COUNTRY_DIR, PATHS.INTERNAL_OUTPUT_VAX_META_FILE],
+        ),
+        Step(
+            "vax-generate",
+            _cowid("vax", "generate"),
+            depends_on=["vax-process"],
+            inputs=[
+                PATHS.DATA_VAX_COUNTRY_DIR,
+                PATHS.INTERNAL_OUTPUT_VAX_META_FILE,
+                PATHS.INTERNAL_OUTPUT_VAX_MANUFACT_DIR,
+                PATHS.INTERNAL_OUTPUT_VAX_AGE_DIR,
+            ],
+            outputs=[PATHS.DATA_VAX_MAIN_FILE, PATHS.DATA_VAX_MANUFACT_FILE, PATHS.DATA_VAX_AGE_FILE],
+        ),
+        # Testing
+        Step("test-get", _cowid("test", "get"), outputs=[PATHS.INTERNAL_OUTPUT_TEST_MAIN_DIR]),
+        # Hospitalizations
+        Step("hosp-generate", _cowid("hosp", "generate"), outputs=[PATHS.DATA_HOSP_MAIN_FILE]),
+        Step(
+            "hosp-grapher-io",
+            _cowid("hosp", "grapher-io"),
+            depends_on=["hosp-generate"],
+            inputs=[PATHS.DATA_HOSP_MAIN_FILE],
+            outputs=[HOSP_GRAPHER_FILE],
+        ),
+        # Excess mortality
+        Step("xm-generate", _cowid("xm", "generate"), outputs=[PATHS.DATA_XM_MAIN_FILE]),
+        # Variants
+        Step("variants-generate", _cowid("variants", "generate")),
+        Step("variants-grapher-io", _cowid("variants", "grapher-io"), depends_on=["variants-generate"]),
+        # Policy responses
+        Step("oxcgrt-get", _cowid("oxcgrt", "get"), outputs=[PATHS.INTERNAL_INPUT_BSG_FILE]),
+        Step(
+            "oxcgrt-grapher-io",
+            _cowid("oxcgrt", "grapher-io"),
+            depends_on=["oxcgrt-get"],
+            inputs=[PATHS.INTERNAL_INPUT_BSG_FILE, PATHS.INTERNAL_INPUT_BSG_STD_FILE],
+            outputs=[PATHS.INTERNAL_GRAPHER_BSG_FILE],
+        ),
+        # Megafile
+        Step(
+            "megafile",
+            _cowid("megafile", "--incremental"),
+            depends_on=[
+                "jhu-generate",
+                "casedeath-generate",
+                "vax-generate",
+                "hosp-grapher-io",
+                "xm-generate",
+                "variants-generate",
+                "oxcgrt-get",
+            ],
+            # The testing file is built outside `cowid` (scripts/testing/generate_dataset.R)
+            inputs=[HOSP_GRAPHER_FILE, PATHS.DATA_TEST_MAIN_FILE],
+        ),
+    ]
+    return DAG(steps)
+
+
+def run_dag(targets: list, global_args: list, max_workers: int, force: bool, dry_run: bool, logger):
+    dag = build_dag(global_args)
+    if targets:
+        dag = dag.subset(targets)
+    results = dag.run(max_workers=max_workers, force=force, dry_run=dry_run)
+    logger.info(f"DAG report:\n{dag.report(results)}")
+    failed = [name for name, result in results.items() if result.status in (STATUS_FAIL, STATUS_BLOCK)]
+    if failed:
+        raise Exception(f"Some steps failed or could not run: {failed}")
+
+
+@click.command(name="dag", short_help="Run pipeline steps concurrently, in dependency order.")
+@click.argument("targets", nargs=-1)
+@click.option(
+    "--max-workers",
+    default=4,
+    type=int,
+    help="Maximum number of steps running at the same time.",
+    show_default=True,
+)
+@click.option(
+    "--force/--no-force",
+    default=False,
+    help="Run steps even if their outputs are newer than their inputs.",
+    show_default=True,
+)
+@click.option(
+    "--dry-run/--no-dry-run",
+    default=False,
+    help="Only list the steps that would run.",
+    show_default=True,
+)
+@click.pass_context
+def click_dag(ctx, targets, max_workers, force, dry_run):
+    """Run the steps needed to build TARGETS (all steps by default) and their dependencies.
+
+    Steps run in separate processes, as soon as the steps they depend on have finished: independent domains
+    (vaccinations, testing, hospitalizations, etc.) run concurrently. Steps whose outputs are newer than their inputs
+    are skipped. A timing report, with the critical path, is logged at the end.
+    """
+    global_args = ["--parallel" if ctx.obj["parallel"] else "--no-parallel", "--n-jobs", str(ctx.obj["n_jobs"])]
+    if ctx.obj["server"]:
+        global_args.append("--server")
+    feedback_log(
+        func=run_dag,
+        targets=list(targets),
+        global_args=global_args,
+        max_workers=max_workers,
+        force=force,
+        dry_run=dry_run,
+        logger=ctx.obj["logger"],
+        server=ctx.obj["server"],
+        domain="DAG",
+        hide_success=True,
+    )
@@ -0,0 +1,23 @@
+import click
+
+from cowidev.cmd.commons.utils import feedback_log
+from cowidev.grapher.db.__main__ import main as run_db_updater
+
+
+@click.command(name="grapher-db", short_help="Update Grapher database with all grapher datasets.")
+@click.pass_context
+def click_grapher_db(ctx):
+    """Update the Grapher database with the grapher files of testing, vaccinations, variants, etc.
+
+    With `--parallel`, up to `--n-jobs` datasets are imported concurrently (each in its own transaction), sharing a
+    pool of database connections.
+    """
+    feedback_log(
+        func=run_db_updater,
+        n_jobs=ctx.obj["n_jobs"] if ctx.obj["parallel"] else 1,
+        server=ctx.obj["server"],
+        domain="Grapher",
+        step="grapher-db",
+        text_success="Grapher datasets were correctly uploaded to the database.",
+        hide_success=True,
+    )
@@ -26,8 +26,14 @@ def click_jhu_download(ctx):
 
 
 @click.command(name="generate", short_help="Step 2: Generate dataset.")
+@click.option(
+    "--bundle",
+    type=click.Choice(["parquet", "zip"]),
+    default=None,
+    help="Also export all wide-format metrics in one compressed file (wide_data.parquet or wide_data.zip).",
+)
 @click.pass_context
-def click_jhu_generate(ctx):
+def click_jhu_generate(ctx, bundle):
     feedback_log(
         func=generate_dataset,
         server=ctx.obj["server"],
@@ -37,6 +43,7 @@ def click_jhu_generate(ctx):
         text_success="Public data files generated.",
         logger=ctx.obj["logger"],
         skip_download=True,
+        bundle=bundle,
     )
 
 
@@ -4,12 +4,19 @@ from cowidev.cmd.commons.utils import feedback_log
 
 
 @click.command(name="megafile")
+@click.option(
+    "--incremental/--no-incremental",
+    default=False,
+    help="Only recompute locations whose input data changed since the last run.",
+    show_default=True,
+)
 @click.pass_context
-def click_megafile(ctx):
+def click_megafile(ctx, incremental):
     """COVID-19 data integration pipeline (former megafile)"""
     feedback_log(
         func=generate_megafile,
         logger=ctx.obj["logger"],
+        incremental=incremental,
         server=ctx.obj["server"],
         domain="Megafile",
         text_success="Public data files generated.",
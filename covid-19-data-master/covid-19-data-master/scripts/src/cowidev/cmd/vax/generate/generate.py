@@ -9,7 +9,7 @@ from cowidev.utils.utils import get_traceback
 @click.pass_context
 def click_vax_generate(ctx):
     # Select columns
-    generator = DatasetGenerator(ctx.obj["logger"])
+    generator = DatasetGenerator(ctx.obj["logger"], n_jobs=ctx.obj["n_jobs"])
     try:
         generator.run()
     except Exception as err:
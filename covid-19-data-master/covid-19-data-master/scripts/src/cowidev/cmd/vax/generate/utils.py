@@ -1,11 +1,11 @@
 import os
 import itertools
 from datetime import datetime
-from math import isnan
 import glob
 import json
 from shutil import copyfile
 
+import numpy as np
 import pandas as pd
 from pandas.api.types import is_numeric_dtype
 
@@ -13,16 +13,44 @@ from cowidev import PATHS
 from cowidev.utils.clean.dates import localdate
 from cowidev.utils.utils import pd_series_diff_values
 from cowidev.utils.clean import clean_date
+from cowidev.utils.aggregates import aggregate_regions
+from cowidev.utils.io import export_parquet, read_csv_files
 from cowidev.utils.log import get_logger
+from cowidev.utils.timeseries import daily_grid, interpolated_diff, rolling_mean
 from cowidev.vax.utils.checks import VACCINES_ACCEPTED
 
 
 logger = get_logger()
 
+# Types of the input files (country data, manufacturer data and age data)
+DTYPES_VAX = {
+    "location": str,
+    "vaccine": str,
+    "source_url": str,
+    "total_vaccinations": "float64",
+    "people_vaccinated": "float64",
+    "people_fully_vaccinated": "float64",
+    "total_boosters": "float64",
+}
+DTYPES_VAX_MANUFACT = {
+    "location": str,
+    "vaccine": str,
+    "total_vaccinations": "float64",
+}
+DTYPES_VAX_AGE = {
+    "location": str,
+    "age_group_min": "int64",
+    "age_group_max": "float64",
+    "people_vaccinated_per_hundred": "float64",
+    "people_fully_vaccinated_per_hundred": "float64",
+    "people_with_booster_per_hundred": "float64",
+}
+
 
 class DatasetGenerator:
-    def __init__(self, logger):
+    def __init__(self, logger, n_jobs: int = -2):
         self.logger = logger
+        self.n_jobs = n_jobs
         self.aggregates = build_aggregates()
         self._countries_covered = None
 
@@ -99,64 +127,24 @@ class DatasetGenerator:
         # df = df.sort_values(["location", "date"])
         return df
 
-    def _add_interpolate_base(self, df: pd.DataFrame, colname_cum: str, colname_diff: str) -> pd.DataFrame:
-        dt_min = df.dropna(subset=[colname_cum]).date.min()
-        dt_max = df.dropna(subset=[colname_cum]).date.max()
-        df_nan = df[(df.date < dt_min) | (df.date > dt_max)]
-
-        # Add missing dates
-        df = df.merge(
-            pd.Series(pd.date_range(dt_min, dt_max), name="date"),
-            how="right",
-        ).sort_values(by="date")
-
-        # Calculate and add smoothed vars
-        df[colname_diff] = (
-            df[colname_cum]
-            .interpolate(method="linear")
-            .diff()
-            # .apply(lambda x: round(x) if not isnan(x) else x)
-        )
-
-        # Add missing dates
-        df = pd.concat([df, df_nan], ignore_index=True).sort_values("date")
-        df = df.assign(location=df.location.dropna().iloc[0])
-        return df
-
-    def _add_interpolate(self, df: pd.DataFrame):
-        return df.pipe(self._add_interpolate_base, "total_vaccinations", "new_vaccinations_interpolated").pipe(
-            self._add_interpolate_base, "people_vaccinated", "new_people_vaccinated_interpolated"
-        )
-
     def pipe_interpolate(self, df: pd.DataFrame) -> pd.DataFrame:
         """Interpolate missing dates."""
         logger.info("Interpolating daily metrics")
-        df = df.groupby("location").apply(self._add_interpolate).reset_index(drop=True)
-        df.to_csv("/tmp/test-interp.csv", index=False)
-        return df
-
-    def _add_smoothed(self, df: pd.DataFrame) -> pd.DataFrame:
-        # NEW VACCINATIONS
-        df["new_vaccinations_smoothed"] = (
-            df["new_vaccinations_interpolated"]
-            .rolling(7, min_periods=1)
-            .mean()
-            .apply(lambda x: round(x) if not isnan(x) else x)
-        )
-        df.loc[df.new_vaccinations_interpolated.isna(), "new_vaccinations_smoothed"] = None
-        df["new_people_vaccinated_smoothed"] = (
-            df["new_people_vaccinated_interpolated"]
-            .rolling(7, min_periods=1)
-            .mean()
-            .apply(lambda x: round(x) if not isnan(x) else x)
+        df = daily_grid(df, ["total_vaccinations", "people_vaccinated"])
+        return df.assign(
+            new_vaccinations_interpolated=interpolated_diff(df, "total_vaccinations"),
+            new_people_vaccinated_interpolated=interpolated_diff(df, "people_vaccinated"),
         )
-        df.loc[df.new_people_vaccinated_interpolated.isna(), "new_people_vaccinated_smoothed"] = None
-        return df
 
     def pipe_smoothed(self, df: pd.DataFrame) -> pd.DataFrame:
         logger.info("Adding smoothed variables")
-        df = df.groupby("location").apply(self._add_smoothed).reset_index(drop=True)
-        df.to_csv("/tmp/test-smooth.csv", index=False)
+        columns = {
+            "new_vaccinations_smoothed": "new_vaccinations_interpolated",
+            "new_people_vaccinated_smoothed": "new_people_vaccinated_interpolated",
+        }
+        for col, col_interpolated in columns.items():
+            df[col] = np.round(rolling_mean(df, col_interpolated, 7))
+            df.loc[df[col_interpolated].isna(), col] = None
         return df
 
     def _get_aggregate(self, df, agg_name, included_locs, excluded_locs):
@@ -196,76 +184,41 @@ class DatasetGenerator:
         agg = agg[agg.date.dt.date < datetime.now().date()]
         return agg
 
-    def _get_aggregate_new(self, df, agg_name, included_locs, excluded_locs):
-        # Take rows that matter
-        agg = df[~df.location.isin(self.aggregates.keys())]  # remove aggregated rows
+    def _get_aggregate_members(self, locations, included_locs, excluded_locs):
         if excluded_locs is not None:
-            agg = agg[~agg.location.isin(excluded_locs)]
+            return [loc for loc in locations if loc not in excluded_locs]
         elif included_locs is not None:
-            agg = agg[agg.location.isin(included_locs)]
-
-        # Get full location-date grid
-        agg = (
-            pd.DataFrame(
-                itertools.product(agg.location.unique(), agg.date.unique()),
-                columns=[agg.location.name, agg.date.name],
-            )
-            .merge(agg, on=["date", "location"], how="outer")
-            .sort_values(by=["location", "date"])
-        )
-
-        # cumulative metrics: Forward filling + Zero-filling if all metric is NaN
-        cols_ffill = [
-            "total_vaccinations",
-            "people_vaccinated",
-            "people_fully_vaccinated",
-            "total_boosters",
-        ]
-        # daily metrics: zero fill
-        cols_0fill = [
-            "new_vaccinations",
-            "new_vaccinations_interpolated",
-            "new_vaccinations_smoothed",
-            "new_people_vaccinated_interpolated",
-            "new_people_vaccinated_smoothed",
-        ]
-        grouper = agg.groupby("location")
-        for col in cols_ffill:
-            agg[col] = grouper[col].apply(lambda x: x.fillna(0) if x.isnull().all() else x.fillna(method="ffill"))
-        for col in cols_0fill:
-            agg[col] = grouper[col].apply(lambda x: x.fillna(0))
+            return [loc for loc in locations if loc in included_locs]
+        return list(locations)
 
+    def pipe_aggregates(self, df: pd.DataFrame) -> pd.DataFrame:
+        logger.info(f"Building aggregate regions {list(self.aggregates.keys())}")
+        df_countries = df[~df.location.isin(self.aggregates.keys())]  # remove aggregated rows
+        locations = df_countries.location.unique()
+        regions = {
+            agg_name: self._get_aggregate_members(locations, **agg_spec)
+            for agg_name, agg_spec in self.aggregates.items()
+        }
         # Use interpolated, otherwise it will be too much of an underestimate
-        agg["new_vaccinations"] = agg["new_vaccinations_interpolated"].apply(lambda x: x if isnan(x) else round(x))
-
-        # Aggregate
-        agg = agg.groupby("date").sum().reset_index().assign(location=agg_name)
-        # Filter dates for daily metrics
-        mask = agg.date.dt.date > localdate(minus_days=7, as_datetime=True).date()
-        columns = [
+        df_countries = df_countries.assign(new_vaccinations=df_countries.new_vaccinations_interpolated.round())
+        # daily metrics
+        columns_daily = [
             "new_vaccinations",
             "new_vaccinations_interpolated",
             "new_vaccinations_smoothed",
             "new_people_vaccinated_interpolated",
             "new_people_vaccinated_smoothed",
         ]
-        agg.loc[mask, columns] = None
-        return agg
-
-    def pipe_aggregates(self, df: pd.DataFrame) -> pd.DataFrame:
-        logger.info(f"Building aggregate regions {list(self.aggregates.keys())}")
-        aggs = []
-        for agg_name, _ in self.aggregates.items():
-            aggs.append(
-                self._get_aggregate_new(
-                    df=df,
-                    agg_name=agg_name,
-                    included_locs=self.aggregates[agg_name]["included_locs"],
-                    excluded_locs=self.aggregates[agg_name]["excluded_locs"],
-                )
-            )
-        df = pd.concat([df] + aggs, ignore_index=True)
-        df.to_csv("/tmp/test-agg.csv", index=False)
+        aggs = aggregate_regions(
+            df_countries,
+            regions,
+            columns_ffill=["total_vaccinations", "people_vaccinated", "people_fully_vaccinated", "total_boosters"],
+            columns_0fill=columns_daily,
+        )
+        # Filter dates for daily metrics
+        mask = aggs.date.dt.date > localdate(minus_days=7, as_datetime=True).date()
+        aggs.loc[mask, columns_daily] = None
+        df = pd.concat([df, aggs], ignore_index=True)
         return df
 
     def get_population(self, df_subnational: pd.DataFrame) -> pd.DataFrame:
@@ -695,6 +648,9 @@ class DatasetGenerator:
         for obj, path in files:
             if path.endswith(".csv"):
                 obj.to_csv(path, index=False)
+                if path == PATHS.DATA_VAX_MAIN_FILE:
+                    # Typed copy, read by the megafile
+                    export_parquet(obj, path)
             elif path.endswith(".json"):
                 with open(path, "w") as f:
                     json.dump(obj, f, indent=2)  # default=lambda o: o.__dict__, sort_keys=True
@@ -708,30 +664,36 @@ class DatasetGenerator:
         copyfile(PATHS.INTERNAL_OUTPUT_VAX_META_MANUFACT_FILE, PATHS.DATA_VAX_META_MANUFACT_FILE)
         copyfile(PATHS.INTERNAL_OUTPUT_VAX_META_AGE_FILE, PATHS.DATA_VAX_META_AGE_FILE)
 
+    def _read_files(self, path: str, dtype: dict, name: str) -> pd.DataFrame:
+        """Read all CSV files in directory `path`.
+
+        Files are read concurrently, and cached in INTERNAL_TMP_VAX_CACHE_DIR, so that only files modified since the
+        last run are parsed.
+        """
+        return read_csv_files(
+            sorted(glob.glob(os.path.join(path, "*.csv"))),
+            cache_path=os.path.join(PATHS.INTERNAL_TMP_VAX_CACHE_DIR, f"{name}.parquet"),
+            n_jobs=self.n_jobs,
+            dtype=dtype,
+            parse_dates=["date"],
+        )
+
     def run(self):
         logger.info("-- Generating dataset... --")
         logger.info("1/10 Loading input data...")
         try:
             df_metadata = pd.read_csv(PATHS.INTERNAL_OUTPUT_VAX_META_FILE)
-            df_vaccinations = pd.concat(
-                [pd.read_csv(path, parse_dates=["date"]) for path in glob.glob(PATHS.DATA_VAX_COUNTRY_DIR + "/*.csv")]
-            ).sort_values(by=["location", "date"])
+            df_vaccinations = self._read_files(PATHS.DATA_VAX_COUNTRY_DIR, DTYPES_VAX, "country_data").sort_values(
+                by=["location", "date"]
+            )
         except FileNotFoundError:
             raise FileNotFoundError(
                 "Internal files not found! Make sure to run `proccess-data` step prior to running `generate-dataset`."
             )
 
         df_iso = pd.read_csv(PATHS.INTERNAL_INPUT_ISO_FILE)
-        files_manufacturer = glob.glob(os.path.join(PATHS.INTERNAL_OUTPUT_VAX_MANUFACT_DIR, "*.csv"))
-        df_manufacturer = pd.concat(
-            (pd.read_csv(filepath, parse_dates=["date"]) for filepath in files_manufacturer),
-            ignore_index=True,
-        )
-        files_age = glob.glob(os.path.join(PATHS.INTERNAL_OUTPUT_VAX_AGE_DIR, "*.csv"))
-        df_age = pd.concat(
-            (pd.read_csv(filepath, parse_dates=["date"]) for filepath in files_age),
-            ignore_index=True,
-        )
+        df_manufacturer = self._read_files(PATHS.INTERNAL_OUTPUT_VAX_MANUFACT_DIR, DTYPES_VAX_MANUFACT, "manufacturer")
+        df_age = self._read_files(PATHS.INTERNAL_OUTPUT_VAX_AGE_DIR, DTYPES_VAX_AGE, "age")
 
         # Metadata
         logger.info("2/10 Generating `automated_state` table...")
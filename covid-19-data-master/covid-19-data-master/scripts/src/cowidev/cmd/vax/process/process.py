@@ -10,7 +10,7 @@ from cowidev import PATHS
 from cowidev.utils.log import get_logger
 from cowidev.utils.params import CONFIG
 from cowidev.utils.utils import export_timestamp, get_traceback
-from cowidev.cmd.vax.process.utils import process_location, VaccinationGSheet
+from cowidev.cmd.vax.process.utils import process_locations, VaccinationGSheet
 from cowidev.cmd.commons.utils import StepReport
 
 
@@ -36,7 +36,7 @@ def click_vax_process(ctx):
         path_output_files=PATHS.DATA_VAX_COUNTRY_DIR,
         path_output_meta=PATHS.INTERNAL_OUTPUT_VAX_META_FILE,
         column_location="location",
-        process_location=process_location,
+        process_locations=process_locations,
         path_output_status=PATHS.INTERNAL_OUTPUT_VAX_STATUS_PROCESS,
         path_output_status_ts=PATHS.INTERNAL_OUTPUT_VAX_STATUS_PROCESS_TS,
         log_header="VAX",
@@ -55,7 +55,7 @@ def main_process_data(
     path_output_files: str,
     path_output_meta: str,
     column_location: str,
-    process_location: callable,
+    process_locations: callable,
     path_output_status: str,
     path_output_status_ts: str,
     log_header: str,
@@ -82,41 +82,20 @@ def main_process_data(
     _check_no_overlapping_manual_auto(dfs_manual, dfs_auto)
 
     # vax = [v for v in vax if v.location.iloc[0] == "Pakistan"]  # DEBUG
-    # Process locations
-    def _process_location_and_move_file(df):
+    for df in dfs:
         if column_location not in df:
             raise ValueError(f"Column `{column_location}` missing. df: {df.tail(5)}")
-        country = df.loc[0, column_location]
-        if country.lower() not in skip_complete:
-            # Process dataframe
-            monotonic_check_skip = skip_monotonic.get(df.loc[0, column_location], [])
-            anomaly_check_skip = skip_anomaly.get(df.loc[0, column_location], [])
-            try:
-                df = process_location(df, monotonic_check_skip, anomaly_check_skip)
-            except Exception as err:
-                success = False
-                error_msg = get_traceback(err)
-                error_short_msg = str(err)
-                logger.error(f"{log_header} - {country}: FAILED ❌ {err}")
-            except:
-                success = False
-                error_msg = "Error"
-            else:
-                # Export
-                df.to_csv(os.path.join(path_output_files, f"{country}.csv"), index=False)
-                logger.info(f"{log_header} - {country}: SUCCESS ✅")
-                success = True
-                error_msg = error_short_msg = ""
-            finally:
-                return {
-                    "location": country,
-                    "success": success,
-                    "skipped": False,
-                    "error": error_msg,
-                    "error_short": error_short_msg,
-                    "timestamp": datetime.utcnow().replace(microsecond=0).isoformat(),
-                }
-        else:
+    countries = [df.loc[0, column_location] for df in dfs]
+    dfs_process = [df for country, df in zip(countries, dfs) if country.lower() not in skip_complete]
+
+    # Process all countries, in batch
+    logger.info("Processing and exporting data...")
+    processed, errors = process_locations(
+        dfs_process, monotonic_check_skip=skip_monotonic, anomaly_check_skip=skip_anomaly
+    )
+
+    def _status(country):
+        if country.lower() in skip_complete:
             logger.info(f"{country}: SKIPPED 🚧")
             return {
                 "location": country,
@@ -125,11 +104,25 @@ def main_process_data(
                 "error": "",
                 "timestamp": datetime.utcnow().replace(microsecond=0).isoformat(),
             }
-        # return {"location": country, "error": ""}
-
-    logger.info("Processing and exporting data...")
-    # Process all countries
-    df_status = pd.DataFrame([_process_location_and_move_file(df) for df in dfs]).set_index("location")
+        if country in errors:
+            err = errors[country]
+            logger.error(f"{log_header} - {country}: FAILED ❌ {err}")
+            success, error_msg, error_short_msg = False, get_traceback(err), str(err)
+        else:
+            # Export
+            processed[country].to_csv(os.path.join(path_output_files, f"{country}.csv"), index=False)
+            logger.info(f"{log_header} - {country}: SUCCESS ✅")
+            success, error_msg, error_short_msg = True, "", ""
+        return {
+            "location": country,
+            "success": success,
+            "skipped": False,
+            "error": error_msg,
+            "error_short": error_short_msg,
+            "timestamp": datetime.utcnow().replace(microsecond=0).isoformat(),
+        }
+
+    df_status = pd.DataFrame([_status(country) for country in countries]).set_index("location")
 
     # Export metadata
     gsheet.metadata.to_csv(path_output_meta, index=False)
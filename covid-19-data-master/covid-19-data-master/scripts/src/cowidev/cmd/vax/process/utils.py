@@ -1,71 +1,131 @@
 import tempfile
 import os
-from typing import List
+from typing import Dict, List, Tuple, Union
 import json
 
 
 import pandas as pd
+from joblib import Parallel, delayed
 
 from datetime import datetime, timedelta
-import pandas as pd
 
-from cowidev.utils.clean import clean_urls, clean_date
+from cowidev.utils.clean import clean_urls
 from cowidev.utils.clean.dates import DATE_FORMAT
 from cowidev.utils.gdrive.gsheets import GSheetApi
 from cowidev.utils.params import SECRETS
-from cowidev.vax.utils.checks import country_df_sanity_checks
-
-
-def process_location(df: pd.DataFrame, monotonic_check_skip: list = [], anomaly_check_skip: list = []) -> pd.DataFrame:
-    # print(df.tail(1))
-    # Only report up to previous day to avoid partial reporting
-    df = df.assign(date=pd.to_datetime(df.date, dayfirst=True))
-    if df.date.max().date() > (datetime.now().date() + timedelta(days=1)):
-        raise ValueError(f"{df.location.values[0]} -- Date in the future!")
-    df = df[df.date.dt.date < datetime.now().date()]
-    # Default columns for second doses
-    if "people_vaccinated" not in df:
-        df = df.assign(people_vaccinated=pd.NA)
-        df.people_vaccinated = df.people_vaccinated.astype("Int64")
-    if "people_fully_vaccinated" not in df:
-        df = df.assign(people_fully_vaccinated=pd.NA)
-        df.people_fully_vaccinated = df.people_fully_vaccinated.astype("Int64")
-    if "total_boosters" not in df:
-        df = df.assign(total_boosters=pd.NA)
-        df.total_boosters = df.total_boosters.astype("Int64")
-    # Avoid decimals
-    cols = [
-        "total_vaccinations",
-        "people_vaccinated",
-        "people_partly_vaccinated",
-        "people_fully_vaccinated",
-        "total_boosters",
-    ]
-    cols = df.columns.intersection(cols).tolist()
-    df[cols] = df[cols].astype(float).astype("Int64").fillna(pd.NA)
-    # Order columns and rows
-    usecols = [
-        "location",
-        "date",
-        "vaccine",
-        "source_url",
-    ] + cols
-    usecols = df.columns.intersection(usecols).tolist()
-    df = df[usecols]
-    df = df.sort_values(by="date")
-    # Sanity checks
-    country_df_sanity_checks(
-        df,
-        monotonic_check_skip=monotonic_check_skip,
-        anomaly_check_skip=anomaly_check_skip,
+from cowidev.vax.utils.checks import BatchChecker, country_df_sanity_checks
+
+
+def process_location(
+    df: pd.DataFrame, monotonic_check_skip: list = [], anomaly_check_skip: list = [], check_metrics: bool = True
+) -> pd.DataFrame:
+    location = df.location.values[0]
+    processed, errors = process_locations(
+        [df],
+        monotonic_check_skip={location: monotonic_check_skip},
+        anomaly_check_skip={location: anomaly_check_skip},
+        check_metrics=check_metrics,
     )
-    # Strip
-    df = df.applymap(lambda x: x.strip() if isinstance(x, str) else x)
+    if errors:
+        raise errors[location]
+    return processed[location]
+
+
+def process_locations(
+    dfs: List[pd.DataFrame],
+    monotonic_check_skip: dict = {},
+    anomaly_check_skip: dict = {},
+    check_metrics: bool = True,
+    n_jobs: int = -2,
+    min_parallel: int = 20,
+) -> Tuple[Dict[str, pd.DataFrame], Dict[str, Exception]]:
+    """Process the data of multiple locations in one batch.
+
+    Each location is prepared and checked on its own (in parallel if there are at least `min_parallel` locations).
+    Then, all locations are cleaned (strings, dates, URLs) and their metrics checked at once, on the concatenated data.
+
+    Args:
+        dfs (List[pd.DataFrame]): Data of each location.
+        monotonic_check_skip (dict, optional): Location -> entries to skip in the monotonicity check. Defaults to {}.
+        anomaly_check_skip (dict, optional): Location -> entries to skip in the anomaly check. Defaults to {}.
+        check_metrics (bool, optional): Set to False to skip metric checks. Defaults to True.
+        n_jobs (int, optional): Number of locations prepared concurrently. Defaults to -2.
+        min_parallel (int, optional): Minimum number of locations to prepare them concurrently. Defaults to 20.
+
+    Returns:
+        Tuple[Dict[str, pd.DataFrame], Dict[str, Exception]]: Processed data and error of each location.
+    """
+    if len(dfs) >= min_parallel:
+        results = Parallel(n_jobs=n_jobs, backend="threading")(delayed(_prepare_location)(df) for df in dfs)
+    else:
+        results = [_prepare_location(df) for df in dfs]
+    errors = {location: result for location, result in results if isinstance(result, Exception)}
+    prepared = {location: result for location, result in results if not isinstance(result, Exception)}
+    if not prepared:
+        return {}, errors
+
+    df = pd.concat(prepared.values(), ignore_index=True)
+    locations = df["location"].values
+    # Metric checks
+    if check_metrics:
+        checker = BatchChecker(df, monotonic_check_skip=monotonic_check_skip, anomaly_check_skip=anomaly_check_skip)
+        errors.update({location: ValueError(msg) for location, msg in checker.errors().items()})
+    # Strip (non-string values are kept as they are)
+    for col in df.select_dtypes(["object", "string"]).columns:
+        if pd.api.types.infer_dtype(df[col], skipna=True) in ["string", "mixed", "mixed-integer"]:
+            stripped = df[col].str.strip()
+            df[col] = stripped.where(stripped.notna(), df[col])
     # Date format
-    df = df.assign(date=df.date.apply(clean_date))
+    df = df.assign(date=df.date.dt.strftime(DATE_FORMAT))
     # Clean URLs
     df = clean_urls(df)
-    return df
+
+    # Split by location, with the columns and types of each location
+    processed = {}
+    for location, df_loc in df.groupby(locations, sort=False):
+        if location not in errors:
+            dtypes = prepared[location].dtypes.drop("date")
+            processed[location] = df_loc[prepared[location].columns].astype(dtypes).reset_index(drop=True)
+    return processed, errors
+
+
+def _prepare_location(df: pd.DataFrame) -> Tuple[str, Union[pd.DataFrame, Exception]]:
+    """Prepare data of a location (types, columns, order) and check its format. Exceptions are returned, not raised."""
+    location = df.location.values[0]
+    try:
+        # Only report up to previous day to avoid partial reporting
+        df = df.assign(date=pd.to_datetime(df.date, dayfirst=True))
+        if df.date.max().date() > (datetime.now().date() + timedelta(days=1)):
+            raise ValueError(f"{location} -- Date in the future!")
+        df = df[df.date.dt.date < datetime.now().date()]
+        # Default columns for second doses
+        for col in ["people_vaccinated", "people_fully_vaccinated", "total_boosters"]:
+            if col not in df:
+                df = df.assign(**{col: pd.Series(pd.NA, index=df.index, dtype="Int64")})
+        # Avoid decimals
+        cols = [
+            "total_vaccinations",
+            "people_vaccinated",
+            "people_partly_vaccinated",
+            "people_fully_vaccinated",
+            "total_boosters",
+        ]
+        cols = df.columns.intersection(cols).tolist()
+        df = df.assign(**{col: pd.to_numeric(df[col]).astype("Int64") for col in cols})
+        # Order columns and rows
+        usecols = [
+            "location",
+            "date",
+            "vaccine",
+            "source_url",
+        ] + cols
+        usecols = df.columns.intersection(usecols).tolist()
+        df = df[usecols].sort_values(by="date")
+        # Sanity checks (metrics are checked in batch)
+        country_df_sanity_checks(df, metrics=False)
+    except Exception as err:
+        return location, err
+    return location, df
 
 
 class VaccinationGSheet:
@@ -6,6 +6,8 @@ Some grapher updates are run separately, by means of run_grapher_db step in libr
 """
 import traceback
 
+from joblib import Parallel, delayed, effective_n_jobs
+
 from cowidev.grapher.db.procs.testing import GrapherTestUpdater
 from cowidev.grapher.db.procs.variants import GrapherVariantsUpdater, GrapherSequencingUpdater
 from cowidev.grapher.db.procs.vax_age import GrapherVaxAgeUpdater
@@ -14,6 +16,7 @@ from cowidev.grapher.db.procs.vax import GrapherVaxUpdater
 from cowidev.grapher.db.procs.vax_us import GrapherUSVaxUpdater
 from cowidev.grapher.db.procs.yougov_composite import GrapherYougovCompUpdater
 from cowidev.grapher.db.procs.yougov import GrapherYougovUpdater
+from cowidev.grapher.db.utils.db import ConnectionPool
 from cowidev.grapher.db.utils.slack_client import send_error
 
 
@@ -31,14 +34,34 @@ updaters = [
 updaters = [u() for u in updaters]
 
 
-def main():
-    for updater in updaters:
+def main(n_jobs: int = 1):
+    """Update all grapher datasets.
+
+    Args:
+        n_jobs (int, optional): Number of datasets updated concurrently. Defaults to 1.
+    """
+    if effective_n_jobs(n_jobs) == 1:
+        for updater in updaters:
+            _run_updater(updater)
+    else:
+        # Concurrent updates share a pool of connections and the entity cache
+        pool = ConnectionPool(max_size=min(effective_n_jobs(n_jobs), len(updaters)))
+        entity_cache = {}
         try:
-            updater.run()
-        except Exception as e:
-            tb = traceback.format_exc()
-            send_error(
-                channel="corona-data-updates",
-                title=f"Updating Grapher dataset: {updater.dataset_name}",
-                trace=tb,
+            Parallel(n_jobs=n_jobs, backend="threading")(
+                delayed(_run_updater)(updater, pool=pool, entity_cache=entity_cache) for updater in updaters
             )
+        finally:
+            pool.close()
+
+
+def _run_updater(updater, **kwargs):
+    try:
+        updater.run(**kwargs)
+    except Exception as e:
+        tb = traceback.format_exc()
+        send_error(
+            channel="corona-data-updates",
+            title=f"Updating Grapher dataset: {updater.dataset_name}",
+            trace=tb,
+        )
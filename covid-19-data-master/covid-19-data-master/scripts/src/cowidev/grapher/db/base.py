@@ -19,6 +19,7 @@ class GrapherBaseUpdater:
         year_is_day: bool = True,
         unit: str = "",
         unit_short: str = None,
+        diff: bool = True,
     ) -> None:
         self.dataset_name = dataset_name
         self._input_csv_path = input_csv_path
@@ -29,6 +30,7 @@ class GrapherBaseUpdater:
         self.year_is_day = year_is_day
         self.unit = unit
         self.unit_short = unit_short
+        self.diff = diff
 
     @property
     def project_dir(self):
@@ -50,7 +52,7 @@ class GrapherBaseUpdater:
             (datetime.now() - timedelta(minutes=10)).astimezone(pytz.timezone("Europe/London")).strftime("%-d %B %Y")
         )
 
-    def run(self):
+    def run(self, pool=None, entity_cache=None):
         try:
             import_dataset(
                 dataset_name=self.dataset_name,
@@ -64,6 +66,9 @@ class GrapherBaseUpdater:
                 slack_notifications=self.slack_notifications,
                 unit=self.unit,
                 unit_short=self.unit_short,
+                diff=self.diff,
+                pool=pool,
+                entity_cache=entity_cache,
             )
         except Exception as e:
             tb = traceback.format_exc()
@@ -1,4 +1,8 @@
 import os
+import queue
+import threading
+from contextlib import contextmanager
+
 import pymysql
 from dotenv import load_dotenv
 
@@ -16,4 +20,43 @@ def connection():
         password=os.getenv("DB_PASS"),
         charset="utf8mb4",
         autocommit=False,
+        local_infile=bool(os.getenv("DB_LOCAL_INFILE")),
     )  # requires .commit(), so everything is implicitly a transaction
+
+
+class ConnectionPool:
+    """Pool of database connections, to be shared by threads.
+
+    Connections are created on demand (up to `max_size`) and reused across datasets.
+
+    Args:
+        max_size (int, optional): Maximum number of open connections. Defaults to 4.
+    """
+
+    def __init__(self, max_size: int = 4):
+        self.max_size = max_size
+        self._connections = queue.LifoQueue()
+        self._semaphore = threading.BoundedSemaphore(max_size)
+
+    @contextmanager
+    def cursor(self):
+        """Get a cursor from a pooled connection. Blocks if all connections are in use.
+
+        Like `with connection() as cursor`, the transaction is committed on exit (rolled back if there is an error).
+        """
+        with self._semaphore:
+            try:
+                conn = self._connections.get_nowait()
+                conn.ping(reconnect=True)
+            except queue.Empty:
+                conn = connection()
+            try:
+                with conn as cursor:
+                    yield cursor
+            finally:
+                self._connections.put(conn)
+
+    def close(self):
+        """Close all connections."""
+        while not self._connections.empty():
+            self._connections.get_nowait().close()
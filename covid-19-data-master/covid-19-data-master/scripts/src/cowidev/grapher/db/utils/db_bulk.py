@@ -0,0 +1,133 @@
+"""Bulk loading of data_values.
+
+Rows are built column-wise (ids are mapped with categorical codes) and written either as large multi-row INSERT
+statements or with `LOAD DATA LOCAL INFILE` (requires `local_infile` on both client and server).
+"""
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+
+METHOD_VALUES = "values"
+METHOD_INFILE = "infile"
+# Values are sent with 15 significant digits, as PyMySQL (0.9.3) encodes floats in row-by-row inserts
+VALUE_FORMAT = "%.15g"
+
+
+def data_values_frame(
+    df: pd.DataFrame, entity_id_by_name: dict, variable_id_by_name: dict, id_names: tuple = ("Country", "Year")
+) -> pd.DataFrame:
+    """Convert a grapher table (one column per variable) to data_values rows.
+
+    Args:
+        df (pd.DataFrame): Grapher table, with columns `id_names` (entity name and year) and one column per variable.
+        entity_id_by_name (dict): Entity name -> entity ID.
+        variable_id_by_name (dict): Variable name -> variable ID.
+        id_names (tuple, optional): Entity and year columns. Defaults to ("Country", "Year").
+
+    Returns:
+        pd.DataFrame: Data values, with columns value, year, entityId and variableId.
+    """
+    column_entity, column_year = id_names
+    variable_names = [col for col in df.columns if col not in id_names]
+    values = df[variable_names].to_numpy(dtype=float, na_value=np.nan)
+    valid = ~np.isnan(values)
+    # Same order as `df.melt`: variable by variable
+    idx_var, idx_row = np.nonzero(valid.T)
+
+    entities = pd.Categorical(df[column_entity])
+    entity_ids = np.array([entity_id_by_name[name] for name in entities.categories], dtype=np.int64)
+    variable_ids = np.array([variable_id_by_name[name] for name in variable_names], dtype=np.int64)
+    return pd.DataFrame(
+        {
+            "value": values[idx_row, idx_var],
+            "year": df[column_year].to_numpy(dtype=np.int64)[idx_row],
+            "entityId": entity_ids[entities.codes][idx_row],
+            "variableId": variable_ids[idx_var],
+        }
+    )
+
+
+def insert_data_values(
+    db, df: pd.DataFrame, method: str = METHOD_VALUES, upsert: bool = False, chunk_size: int = 50000
+) -> float:
+    """Insert data_values in bulk.
+
+    Args:
+        db (DBUtils): Database utils.
+        df (pd.DataFrame): Data values, with columns value, year, entityId and variableId.
+        method (str, optional): "values" (multi-row INSERT statements) or "infile" (LOAD DATA LOCAL INFILE). Defaults
+            to "values".
+        upsert (bool, optional): Replace values of existing (entityId, variableId, year). Defaults to False.
+        chunk_size (int, optional): Rows per INSERT statement. Defaults to 50000.
+
+    Returns:
+        float: Throughput, in rows per second.
+    """
+    t0 = time.time()
+    if method == METHOD_VALUES:
+        for i in range(0, len(df), chunk_size):
+            rows = _encode_rows(df.iloc[i : i + chunk_size])
+            query = f"INSERT INTO data_values (value, year, entityId, variableId) VALUES {','.join(rows)}"
+            if upsert:
+                query += " ON DUPLICATE KEY UPDATE value = VALUES(value)"
+            db.execute(query)
+    elif method == METHOD_INFILE:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "data_values.csv")
+            df[["value", "year", "entityId", "variableId"]].assign(value=encode_values(df["value"])).to_csv(
+                path, index=False, header=False
+            )
+            db.execute(
+                f"""
+                LOAD DATA LOCAL INFILE %s
+                {"REPLACE" if upsert else ""} INTO TABLE data_values
+                FIELDS TERMINATED BY ','
+                LINES TERMINATED BY '\\n'
+                (@value, year, entityId, variableId)
+                SET value = @value + 0
+            """,
+                [path],
+            )
+    else:
+        raise ValueError(f"Invalid method {method}. Valid methods are: {[METHOD_VALUES, METHOD_INFILE]}")
+    duration = time.time() - t0
+    throughput = len(df) / duration if duration > 0 else float("inf")
+    print(f"Inserted {len(df)} data_values in {duration:.1f}s ({throughput:.0f} rows/s)")
+    return throughput
+
+
+def encode_values(values) -> np.ndarray:
+    """Encode values as numeric literals (`VALUE_FORMAT`).
+
+    Both insert methods send values in this format, and MySQL stores them as numbers converted to text (e.g. 1.0 is
+    stored as "1"), as with row-by-row inserts. Values read back from the database are equal to `values` once encoded.
+
+    Args:
+        values (array-like): Values.
+
+    Returns:
+        np.ndarray: Encoded values (object array of str).
+    """
+    return np.array([VALUE_FORMAT % v for v in np.asarray(values, dtype=float).tolist()], dtype=object)
+
+
+def _encode_rows(df):
+    """Encode rows as SQL tuples (value, year, entityId, variableId), see `encode_values`."""
+    values = df["value"].to_numpy(dtype=float)
+    if not np.isfinite(values).all():
+        raise ValueError("data_values must be finite numbers!")
+    return (
+        "("
+        + encode_values(values)
+        + ","
+        + df["year"].to_numpy().astype(str).astype(object)
+        + ","
+        + df["entityId"].to_numpy().astype(str).astype(object)
+        + ","
+        + df["variableId"].to_numpy().astype(str).astype(object)
+        + ")"
+    )
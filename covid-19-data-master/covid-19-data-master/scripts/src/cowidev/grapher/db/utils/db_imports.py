@@ -17,6 +17,14 @@ from datetime import datetime, timezone
 load_dotenv()
 
 from cowidev.grapher.db.utils.db import connection
+from cowidev.grapher.db.utils.db_bulk import (
+    data_values_frame,
+    encode_values,
+    insert_data_values,
+    METHOD_INFILE,
+    METHOD_VALUES,
+)
+from cowidev.grapher.db.utils.db_manifest import ImportManifest, changed_variables, hash_file, hash_variables
 from cowidev.grapher.db.utils.db_utils import DBUtils
 from cowidev.grapher.db.utils.slack_client import send_success
 
@@ -29,6 +37,9 @@ NAMESPACE = "owid"
 
 DEPLOY_QUEUE_PATH = os.getenv("DEPLOY_QUEUE_PATH")
 
+# Bulk load data_values with LOAD DATA LOCAL INFILE (must be enabled in the server)
+DB_LOCAL_INFILE = bool(os.getenv("DB_LOCAL_INFILE"))
+
 
 def print_err(*args, **kwargs):
     return print(*args, file=sys.stderr, **kwargs)
@@ -53,14 +64,33 @@ def import_dataset(
     slack_notifications=True,
     unit="",
     unit_short=None,
+    diff=False,
+    pool=None,
+    entity_cache=None,
 ):
+    """Update a grapher dataset with the data in `csv_path`.
+
+    If `diff` is True, only data_values that changed (added, modified or removed) with respect to the database are
+    written, instead of deleting and re-inserting all of them.
+
+    The content hashes of the imported file and of each variable are recorded in a manifest next to `csv_path`
+    (see `db_manifest`). Datasets whose file has not changed since the last import are skipped, and only charts using
+    variables with new data are rebaked.
+
+    To update several datasets concurrently, pass a `ConnectionPool` as `pool` and a dictionary shared by all imports
+    as `entity_cache` (entity name -> entity ID), so that entities are only fetched once. Each dataset is imported in
+    its own transaction.
+    """
     print(dataset_name.upper())
-    with connection() as c:
+    load_method = METHOD_INFILE if DB_LOCAL_INFILE else METHOD_VALUES
+    manifest = ImportManifest.from_csv_path(csv_path)
+    with connection() if pool is None else pool.cursor() as c:
         db = DBUtils(c)
+        entity_cache = {} if entity_cache is None else entity_cache
 
         # Check whether the database is up to date, by checking the
-        # - last modified date of the Grapher file
-        # - last modified date of the database row
+        # - content hash of the Grapher file, against that of the last import (if available in the manifest)
+        # - otherwise, last modified date of the Grapher file against last modified date of the database row
         #
         # This is not bulletproof, but it allows for flexibility – authors could manually update
         # the repo, and that would trigger a database update too.
@@ -75,10 +105,16 @@ def import_dataset(
             [dataset_name, namespace],
         )
 
-        db_dataset_modified_time = db_dataset_modified_time.replace(tzinfo=tz_db)
-        file_modified_time = datetime.fromtimestamp(os.stat(csv_path).st_mtime).replace(tzinfo=tz_local)
+        file_hash = hash_file(csv_path)
+        manifest_entry = manifest.get(dataset_name, namespace)
+        if manifest_entry is not None:
+            is_up_to_date = manifest_entry["hash"] == file_hash
+        else:
+            db_dataset_modified_time = db_dataset_modified_time.replace(tzinfo=tz_db)
+            file_modified_time = datetime.fromtimestamp(os.stat(csv_path).st_mtime).replace(tzinfo=tz_local)
+            is_up_to_date = file_modified_time <= db_dataset_modified_time
 
-        if file_modified_time <= db_dataset_modified_time:
+        if is_up_to_date:
             print(f"Dataset is up to date: {dataset_name}")
             return None
             # sys.exit(0)
@@ -88,22 +124,26 @@ def import_dataset(
         # Load dataset data frame
 
         df = pd.read_csv(csv_path)
+        variable_hashes = hash_variables(df, ["Country", "Year"])
 
         # Check whether all entities exist in the database.
         # If some are missing, report & quit.
 
         entity_names = list(df["Country"].unique())
 
-        db_entities_query = db.fetch_many(
-            """
-            SELECT id, name
-            FROM entities
-            WHERE name IN %s
-        """,
-            [entity_names],
-        )
-
-        db_entity_id_by_name = {name: id for id, name in db_entities_query}
+        # Entities are matched by exact name, and cached across datasets (if `entity_cache` is given)
+        entity_names_uncached = [name for name in entity_names if name not in entity_cache]
+        if entity_names_uncached:
+            db_entities_query = db.fetch_many(
+                """
+                SELECT id, name
+                FROM entities
+                WHERE name IN %s
+            """,
+                [entity_names_uncached],
+            )
+            entity_cache.update({name: id for id, name in db_entities_query})
+        db_entity_id_by_name = {name: entity_cache[name] for name in entity_names if name in entity_cache}
 
         # Terminate if some entities are missing from the database
         missing_entity_names = set(entity_names) - set(db_entity_id_by_name.keys())
@@ -171,49 +211,30 @@ def import_dataset(
                     display=default_variable_display,
                 )
 
-        # Delete all data_values in dataset
-
-        print("Deleting all data_values...")
+        df_data_values = data_values_frame(df, db_entity_id_by_name, db_variable_id_by_name, id_names)
 
-        db.execute(
-            """
-            DELETE FROM data_values
-            WHERE variableId IN %s
-        """,
-            [tuple(db_variable_id_by_name.values())],
-        )
-
-        # Insert new data_values
-
-        print("Inserting new data_values...")
+        if diff:
+            # Only write data_values that changed
+            update_data_values_diff(db, df_data_values, list(db_variable_id_by_name.values()), method=load_method)
+        else:
+            # Delete all data_values in dataset
 
-        df_data_values = df.melt(
-            id_vars=id_names,
-            value_vars=variable_names,
-            var_name="variable",
-            value_name="value",
-        ).dropna(how="any")
+            print("Deleting all data_values...")
 
-        for df_chunk in chunk_df(df_data_values, 50000):
-            data_values = [
-                (
-                    row["value"],
-                    int(row["Year"]),
-                    db_entity_id_by_name[row["Country"]],
-                    db_variable_id_by_name[row["variable"]],
-                )
-                for _, row in df_chunk.iterrows()
-            ]
-            db.upsert_many(
+            db.execute(
                 """
-                INSERT INTO
-                    data_values (value, year, entityId, variableId)
-                VALUES
-                    (%s, %s, %s, %s)
+                DELETE FROM data_values
+                WHERE variableId IN %s
             """,
-                data_values,
+                [tuple(db_variable_id_by_name.values())],
             )
 
+            # Insert new data_values
+
+            print("Inserting new data_values...")
+
+            insert_data_values(db, df_data_values, method=load_method)
+
         # Update dataset dataUpdatedAt time & dataUpdatedBy
 
         db.execute(
@@ -238,23 +259,30 @@ def import_dataset(
             [source_name, db_source_id],
         )
 
-        # Update chart versions to trigger rebake
+        # Update chart versions to trigger rebake (only charts using variables whose data changed)
 
-        db.execute(
-            """
-            UPDATE charts
-            SET config = JSON_SET(config, "$.version", config->"$.version" + 1)
-            WHERE id IN (
-                SELECT DISTINCT chart_dimensions.chartId
-                FROM chart_dimensions
-                JOIN variables ON variables.id = chart_dimensions.variableId
-                WHERE variables.datasetId = %s
+        variable_ids_changed = [
+            db_variable_id_by_name[name] for name in changed_variables(manifest_entry, variable_hashes)
+        ]
+        print(f"Variables with new data: {len(variable_ids_changed)}/{len(variable_hashes)}")
+        if variable_ids_changed:
+            db.execute(
+                """
+                UPDATE charts
+                SET config = JSON_SET(config, "$.version", config->"$.version" + 1)
+                WHERE id IN (
+                    SELECT DISTINCT chart_dimensions.chartId
+                    FROM chart_dimensions
+                    WHERE chart_dimensions.variableId IN %s
+                )
+            """,
+                [tuple(variable_ids_changed)],
             )
-        """,
-            [db_dataset_id],
-        )
 
-        enqueue_deploy(f"Automated dataset update: {dataset_name}")
+            enqueue_deploy(f"Automated dataset update: {dataset_name}")
+
+    # Only recorded once the transaction is committed
+    manifest.update(dataset_name, namespace, file_hash, variable_hashes)
 
     print("Database update successful.")
 
@@ -265,6 +293,64 @@ def import_dataset(
         )
 
 
+def update_data_values_diff(db, df_data_values, variable_ids, method=METHOD_VALUES, chunk_size=50000):
+    """Write only the data_values that differ from those currently in the database.
+
+    Rows are matched on (entityId, variableId, year). Rows only in the database are deleted. Rows only in
+    `df_data_values`, and rows whose value changed, are upserted. The remaining rows are not written.
+
+    Values are compared once encoded as they are sent to the database (see `db_bulk.encode_values`), so that values
+    with more significant digits than are stored are not considered changed.
+
+    Args:
+        db (DBUtils): Database utils.
+        df_data_values (pd.DataFrame): New data values, with columns value, year, entityId and variableId.
+        variable_ids (list): IDs of the variables of the dataset. Current values of these variables are compared
+            against `df_data_values`.
+        method (str, optional): Bulk insert method, see `insert_data_values`. Defaults to "values".
+        chunk_size (int, optional): Number of rows per statement batch. Defaults to 50000.
+    """
+    keys = ["entityId", "variableId", "year"]
+
+    print("Fetching current data_values...")
+    df_current = pd.DataFrame(
+        list(
+            db.fetch_many(
+                """
+                SELECT entityId, variableId, year, value
+                FROM data_values
+                WHERE variableId IN %s
+            """,
+                [tuple(variable_ids)],
+            )
+        ),
+        columns=keys + ["value"],
+    )
+    df_current["value"] = pd.to_numeric(df_current["value"], errors="coerce")
+
+    df = df_data_values.merge(df_current, on=keys, how="outer", suffixes=("", "_db"), indicator=True)
+    df_delete = df.loc[df["_merge"] == "right_only", keys]
+    changed = df["_merge"] == "left_only"
+    both = (df["_merge"] == "both").values
+    changed[both] = encode_values(df.loc[both, "value"]) != encode_values(df.loc[both, "value_db"])
+    df_upsert = df.loc[changed, ["value"] + keys]
+    print(
+        f"data_values: {len(df_upsert)} to insert/update, {len(df_delete)} to delete, "
+        f"{len(df_data_values) - len(df_upsert)} unchanged"
+    )
+
+    for df_chunk in chunk_df(df_delete, chunk_size):
+        db.execute(
+            """
+            DELETE FROM data_values
+            WHERE (entityId, variableId, year) IN %s
+        """,
+            [list(zip(*(df_chunk[col].tolist() for col in keys)))],
+        )
+    if not df_upsert.empty:
+        insert_data_values(db, df_upsert, method=method, upsert=True, chunk_size=chunk_size)
+
+
 def enqueue_deploy(message):
     if DEPLOY_QUEUE_PATH:
         if ":" in DEPLOY_QUEUE_PATH:
@@ -0,0 +1,92 @@
+"""Content hashes of the last imported version of each grapher dataset.
+
+The manifest is a JSON file stored next to the grapher files, with the hash of each dataset file and of each of its
+variables. It is used to skip datasets whose content has not changed, and to only rebake charts of changed variables.
+"""
+import hashlib
+import json
+import os
+import threading
+
+import pandas as pd
+
+
+MANIFEST_FILENAME = "grapher-import-manifest.json"
+
+# Datasets can be imported concurrently, and share the manifest file
+_lock = threading.Lock()
+
+
+def hash_file(path: str) -> str:
+    """Hash of the content of a file."""
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def hash_variables(df: pd.DataFrame, id_names: list) -> dict:
+    """Hash of the data of each variable (values with their entity and year).
+
+    Args:
+        df (pd.DataFrame): Grapher table, with columns `id_names` and one column per variable.
+        id_names (list): Entity and year columns.
+
+    Returns:
+        dict: Variable name -> hash.
+    """
+    hashes = {}
+    for col in df.columns:
+        if col in id_names:
+            continue
+        df_var = df[list(id_names) + [col]].dropna(subset=[col])
+        h = hashlib.sha1(pd.util.hash_pandas_object(df_var, index=False).values.tobytes())
+        hashes[col] = h.hexdigest()
+    return hashes
+
+
+class ImportManifest:
+    """Manifest of imported grapher datasets.
+
+    Args:
+        path (str): Path to the manifest file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    @classmethod
+    def from_csv_path(cls, csv_path: str):
+        """Manifest stored in the directory of grapher file `csv_path`."""
+        return cls(os.path.join(os.path.dirname(os.path.abspath(csv_path)), MANIFEST_FILENAME))
+
+    def _load(self):
+        if os.path.isfile(self.path):
+            with open(self.path, "r") as f:
+                return json.load(f)
+        return {}
+
+    @staticmethod
+    def _key(dataset_name, namespace):
+        return f"{namespace}/{dataset_name}"
+
+    def get(self, dataset_name: str, namespace: str) -> dict:
+        """Entry of the dataset ({"hash": ..., "variables": {variable name: hash}}), or None if not imported yet."""
+        with _lock:
+            return self._load().get(self._key(dataset_name, namespace))
+
+    def update(self, dataset_name: str, namespace: str, file_hash: str, variable_hashes: dict):
+        """Record the hashes of an imported dataset."""
+        with _lock:
+            manifest = self._load()
+            manifest[self._key(dataset_name, namespace)] = {"hash": file_hash, "variables": variable_hashes}
+            with open(self.path, "w") as f:
+                json.dump(manifest, f, indent=2, sort_keys=True)
+
+
+def changed_variables(entry: dict, variable_hashes: dict) -> list:
+    """Variables whose hash differs from that in the manifest `entry` (all variables if `entry` is None)."""
+    if entry is None:
+        return list(variable_hashes)
+    return [name for name, h in variable_hashes.items() if entry["variables"].get(name) != h]
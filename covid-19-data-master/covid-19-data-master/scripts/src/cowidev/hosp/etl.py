@@ -3,9 +3,11 @@ from sys import modules
 import time
 import importlib
 import json
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date
 
 from joblib import Parallel, delayed
+import numpy as np
 import pandas as pd
 from pandas.api.types import is_string_dtype
 
@@ -15,6 +17,23 @@ from cowidev.utils.log import get_logger
 
 logger = get_logger()
 
+INDICATORS = [
+    "Daily hospital occupancy",
+    "Daily ICU occupancy",
+    "Weekly new hospital admissions",
+    "Weekly new ICU admissions",
+]
+# Data points known to be wrong, removed from the data (value None: any value)
+CORRECTIONS = pd.DataFrame.from_records(
+    [
+        ("Serbia", "2020-03-09", "Daily hospital occupancy", 2),
+        ("Malta", "2022-10-09", "Weekly new hospital admissions", None),
+        ("Malta", "2022-10-16", "Weekly new hospital admissions", None),
+        ("Malta", "2022-10-23", "Weekly new hospital admissions", None),
+    ],
+    columns=["entity", "date", "indicator", "value"],
+)
+
 
 class HospETL:
     def extract(
@@ -38,10 +57,13 @@ class HospETL:
         # Get data
         modules_execution_results = self.extract_collect(parallel, n_jobs, modules=modules)
         self._execution_summary(t0, modules_execution_results)
-        # Export data (checkpoint)
-        self.extract_export_checkpoint(modules_execution_results)
+        data = self._build_entities_data(modules_execution_results)
+        # Export data (checkpoint), in the background
+        executor = ThreadPoolExecutor(max_workers=1)
+        self._checkpoint = executor.submit(self.extract_export_checkpoint, data)
+        executor.shutdown(wait=False)
         # Process output
-        df, df_meta = self.extract_process()
+        df, df_meta = self.extract_process(data)
         return {"df": df, "meta": df_meta}
 
     def extract_collect(self, parallel, n_jobs, modules):
@@ -58,52 +80,36 @@ class HospETL:
             modules_execution_results = [self._extract_entity(m) for m in modules]
         return modules_execution_results
 
-    def extract_export_checkpoint(self, modules_execution_results):
-        """Exports downloaded data and metadata."""
+    def extract_export_checkpoint(self, data):
+        """Exports downloaded data and metadata (per entity)."""
         logger.info("HOSP - Saving checkpoint data...")
-        for m in modules_execution_results:
-            if m is not None:
-                df = m[0]
-                metadata = m[1]
-                if isinstance(metadata, list):
-                    for metadata_ in metadata:
-                        df_ = df[df.entity == metadata_["entity"]]
-                        df_.to_csv(
-                            os.path.join(PATHS.INTERNAL_OUTPUT_HOSP_MAIN_DIR, f"{metadata_['entity']}.csv"),
-                            index=False,
-                        )
-                        with open(
-                            os.path.join(PATHS.INTERNAL_OUTPUT_HOSP_META_DIR, f"{metadata_['entity']}.json"), "w"
-                        ) as outfile:
-                            json.dump(metadata_, outfile)
-                else:
-                    df.to_csv(
-                        os.path.join(PATHS.INTERNAL_OUTPUT_HOSP_MAIN_DIR, f"{metadata['entity']}.csv"), index=False
-                    )
-                    with open(
-                        os.path.join(PATHS.INTERNAL_OUTPUT_HOSP_META_DIR, f"{metadata['entity']}.json"), "w"
-                    ) as outfile:
-                        json.dump(metadata, outfile)
-
-    def extract_process(self):
-        """Load checkpointed data."""
+        for entity, (df, metadata) in data.items():
+            path_data, path_meta = _checkpoint_paths(entity)
+            df.to_csv(path_data, index=False)
+            with open(path_meta, "w") as outfile:
+                json.dump(metadata, outfile)
+
+    def extract_process(self, data):
+        """Build data from the entities collected in this run, and checkpointed data of the remaining ones."""
         logger.info("HOSP - Loading checkpoint data...")
-        # Load & build data
-        data_paths = [
-            os.path.join(PATHS.INTERNAL_OUTPUT_HOSP_MAIN_DIR, p)
-            for p in os.listdir(PATHS.INTERNAL_OUTPUT_HOSP_MAIN_DIR)
-            if p[-3:] == "csv"
+        # Entities not collected in this run (skipped or failed) are taken from the last checkpoint
+        entities_checkpoint = [
+            p[:-4] for p in os.listdir(PATHS.INTERNAL_OUTPUT_HOSP_MAIN_DIR) if p[-3:] == "csv" and p[:-4] not in data
         ]
-        df = pd.concat([pd.read_csv(p) for p in data_paths])
-        # Load & buildmetadata
-        metadata_paths = [
-            os.path.join(PATHS.INTERNAL_OUTPUT_HOSP_META_DIR, p)
-            for p in os.listdir(PATHS.INTERNAL_OUTPUT_HOSP_META_DIR)
+        metadata_checkpoint = [
+            p[:-5] for p in os.listdir(PATHS.INTERNAL_OUTPUT_HOSP_META_DIR) if p[-4:] == "json" and p[:-5] not in data
         ]
-        metadata = []
-        for p in metadata_paths:
-            with open(p, "r") as infile:
+        dfs = [df for df, _ in data.values()]
+        metadata = [metadata for _, metadata in data.values()]
+        for entity in entities_checkpoint:
+            dfs.append(pd.read_csv(_checkpoint_paths(entity)[0]))
+        for entity in metadata_checkpoint:
+            with open(_checkpoint_paths(entity)[1], "r") as infile:
                 metadata.append(json.load(infile))
+        # Load & build data
+        df = pd.concat(dfs, ignore_index=True)
+        df["value"] = pd.to_numeric(df["value"])
+        # Load & buildmetadata
         df_meta = self._build_metadata(metadata)
         # Process output
         df = df.dropna(subset=["value"])
@@ -111,32 +117,8 @@ class HospETL:
         # Remove duplicates
         df = df.drop_duplicates()  # subset=["date", "indicator", "entity"])
 
-        # Weird things
-        df = df[
-            ~(
-                (
-                    (df.entity == "Serbia")
-                    & (df.date == "2020-03-09")
-                    & (df.indicator == "Daily hospital occupancy")
-                    & (df.value == 2)
-                )
-                | (
-                    (df.entity == "Malta")
-                    & (df.date == "2022-10-09")
-                    & (df.indicator == "Weekly new hospital admissions")
-                )
-                | (
-                    (df.entity == "Malta")
-                    & (df.date == "2022-10-16")
-                    & (df.indicator == "Weekly new hospital admissions")
-                )
-                | (
-                    (df.entity == "Malta")
-                    & (df.date == "2022-10-23")
-                    & (df.indicator == "Weekly new hospital admissions")
-                )
-            )
-        ]
+        # Remove known wrong data points
+        df = df.pipe(self.pipe_corrections)
         # Check
         duplicates = df[df.duplicated(subset=["date", "entity", "indicator"], keep=False)]
         if len(duplicates) > 0:
@@ -144,6 +126,20 @@ class HospETL:
 
         return df, df_meta
 
+    def _build_entities_data(self, modules_execution_results):
+        """Data and metadata of each entity collected, as {entity: (df, metadata)}."""
+        data = {}
+        for m in modules_execution_results:
+            if m is not None:
+                df = m[0]
+                metadata = m[1]
+                if isinstance(metadata, list):
+                    for metadata_ in metadata:
+                        data[metadata_["entity"]] = (df[df.entity == metadata_["entity"]], metadata_)
+                else:
+                    data[metadata["entity"]] = (df, metadata)
+        return data
+
     def _build_metadata(self, metadata):
         """Build metadata dataframe (to be exported later to locations.csv)."""
         # Flatten list
@@ -181,14 +177,7 @@ class HospETL:
 
     def _check_fields_df(self, df):
         """Check format of the data collected for a certain location."""
-        assert df.indicator.isin(
-            {
-                "Daily hospital occupancy",
-                "Daily ICU occupancy",
-                "Weekly new hospital admissions",
-                "Weekly new ICU admissions",
-            }
-        ).all(), "One of the indicators for this country is not recognized!"
+        assert df.indicator.isin(INDICATORS).all(), "One of the indicators for this country is not recognized!"
         # check date
         assert is_string_dtype(df.date), "The date column is not a string!"
         dt = date.today().strftime("%Y-%m-%d")
@@ -229,26 +218,63 @@ class HospETL:
             raise ValueError(f"Dimension 0 after merge is different: {shape_og[0]} --> {df.shape[0]}")
         return df
 
+    def pipe_corrections(self, df):
+        """Remove the data points listed in `CORRECTIONS` (anti-join on entity, date and indicator)."""
+        keys = ["entity", "date", "indicator"]
+        corrections = CORRECTIONS.rename(columns={"value": "_value"}).assign(_wrong=True)
+        merged = df[keys].merge(corrections, on=keys, how="left", validate="many_to_one")
+        wrong = (merged._wrong.notna() & (merged._value.isna() | (merged._value == df.value.values))).values
+        return df[~wrong]
+
+    def pipe_indicator_category(self, df):
+        return df.assign(indicator=pd.Categorical(df.indicator, categories=INDICATORS))
+
     def pipe_per_million(self, df):
         print("Adding per-capita metrics…")
-        per_million = df.copy()
-        per_million.loc[:, "value"] = per_million["value"].div(per_million["population"]).mul(1000000).round(3)
-        per_million.loc[:, "indicator"] = per_million["indicator"] + " per million"
-        df = pd.concat([df, per_million], ignore_index=True).drop(columns="population")
-        return df
+        df["value_per_million"] = df["value"].div(df["population"]).mul(1000000).round(3)
+        return df.drop(columns="population")
 
     def pipe_round_values(self, df):
-        df.loc[-df.indicator.str.contains("per million"), "value"] = df.value.round()
+        df["value"] = df.value.round()
         return df
 
     def transform(self, df: pd.DataFrame):
+        """Clean data, with per-capita values as a parallel column (`value_per_million`).
+
+        Long format (one row per indicator, including "... per million" indicators) is built by `to_long`, on export.
+        """
         return (
-            df.pipe(self.pipe_metadata)
+            df.pipe(self.pipe_indicator_category)
+            .pipe(self.pipe_metadata)
             .pipe(self.pipe_per_million)
-            .pipe(self.pipe_round_values)[["entity", "iso_code", "date", "indicator", "value"]]
+            .pipe(self.pipe_round_values)[["entity", "iso_code", "date", "indicator", "value", "value_per_million"]]
             .sort_values(["entity", "date", "indicator"])
         )
 
+    def to_long(self, df: pd.DataFrame):
+        """Long format of the transformed data, with per-capita values as indicators "... per million"."""
+        indicators = df.indicator.cat.categories
+        categories = pd.Index(sorted([*indicators, *(indicators + " per million")]))
+        codes = df.indicator.cat.codes.values
+        df_long = pd.DataFrame(
+            {
+                "entity": np.tile(df.entity.values, 2),
+                "iso_code": np.tile(df.iso_code.values, 2),
+                "date": np.tile(df.date.values, 2),
+                "indicator": pd.Categorical.from_codes(
+                    np.concatenate(
+                        [
+                            categories.get_indexer(indicators)[codes],
+                            categories.get_indexer(indicators + " per million")[codes],
+                        ]
+                    ),
+                    categories=categories,
+                ),
+                "value": np.concatenate([df.value.values, df.value_per_million.values]),
+            }
+        )
+        return df_long.sort_values(["entity", "date", "indicator"])
+
     def transform_meta(self, df_meta: pd.DataFrame, df: pd.DataFrame, locations_path: str):
         # Get most recent date of data update
         df_ = (
@@ -280,8 +306,17 @@ class HospETL:
         if data is not None:
             df = self.transform(data["df"])
             df_meta = self.transform_meta(data["meta"], df, PATHS.DATA_HOSP_META_FILE)
-            self.load(df, PATHS.DATA_HOSP_MAIN_FILE)
+            self.load(self.to_long(df), PATHS.DATA_HOSP_MAIN_FILE)
             self.load(df_meta, PATHS.DATA_HOSP_META_FILE)
+            # Wait for the checkpoint
+            self._checkpoint.result()
+
+
+def _checkpoint_paths(entity):
+    return (
+        os.path.join(PATHS.INTERNAL_OUTPUT_HOSP_MAIN_DIR, f"{entity}.csv"),
+        os.path.join(PATHS.INTERNAL_OUTPUT_HOSP_META_DIR, f"{entity}.json"),
+    )
 
 
 def _load_population():
@@ -0,0 +1,84 @@
+"""HTTP layer shared by the hospitalization sources.
+
+Sources are collected concurrently (see `HospETL.extract_collect`). All of them go through one pooled session, and
+downloaded files are kept in a local cache (`PATHS.INTERNAL_TMP_HOSP_CACHE_DIR`). A file is only downloaded again if it
+changed upstream (ETag/Last-Modified).
+"""
+import hashlib
+import json
+import os
+from urllib.parse import urlparse
+
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+from requests.packages.urllib3.util.retry import Retry
+
+from cowidev import PATHS
+from cowidev.utils.web.download import download_file_cached
+
+
+POOL_SIZE = 32
+RETRY = Retry(total=3, backoff_factor=1, status_forcelist=[429, 500, 502, 503, 504])
+
+
+def _build_session() -> requests.Session:
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE, max_retries=RETRY)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+SESSION = _build_session()
+
+
+def cache_path(url: str) -> str:
+    """Local path of the cached copy of `url` (keeps the extension of the URL, e.g. for compression inference)."""
+    key = hashlib.sha1(url.encode()).hexdigest()
+    ext = os.path.splitext(urlparse(url).path)[1]
+    return os.path.join(PATHS.INTERNAL_TMP_HOSP_CACHE_DIR, f"{key}{ext}")
+
+
+def download(url: str, timeout: int = 30, headers: dict = None) -> str:
+    """Download `url` into the cache (if it changed upstream).
+
+    Args:
+        url (str): File URL.
+        timeout (int, optional): Request timeout, in seconds. Defaults to 30.
+        headers (dict, optional): Additional request headers. Defaults to None.
+
+    Returns:
+        str: Path to the cached file.
+    """
+    path = cache_path(url)
+    download_file_cached(
+        url,
+        path,
+        timeout=timeout,
+        session=SESSION,
+        headers=headers,
+        path_meta=f"{os.path.splitext(path)[0]}.meta.json",
+    )
+    return path
+
+
+def read_csv(url: str, timeout: int = 30, headers: dict = None, **kwargs) -> pd.DataFrame:
+    """Load CSV file from `url` (through the cache).
+
+    Args:
+        url (str): File URL.
+        timeout (int, optional): Request timeout, in seconds. Defaults to 30.
+        headers (dict, optional): Additional request headers. Defaults to None.
+        kwargs: Arguments for pandas.read_csv.
+
+    Returns:
+        pandas.DataFrame: Data loaded.
+    """
+    return pd.read_csv(download(url, timeout=timeout, headers=headers), **kwargs)
+
+
+def read_json(url: str, timeout: int = 30, headers: dict = None) -> dict:
+    """Load JSON document from `url` (through the cache)."""
+    with open(download(url, timeout=timeout, headers=headers), "r") as f:
+        return json.load(f)
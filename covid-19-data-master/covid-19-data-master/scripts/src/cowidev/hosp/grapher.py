@@ -8,6 +8,7 @@ from cowidev.megafile.generate import generate_megafile
 from cowidev.grapher.db.base import GrapherBaseUpdater
 from cowidev.utils.utils import time_str_grapher, get_filename, export_timestamp
 from cowidev.utils.clean.dates import DATE_FORMAT
+from cowidev.utils.io import export_parquet
 from cowidev.utils.log import get_logger
 
 ZERO_DAY = "2020-01-21"
@@ -46,6 +47,8 @@ def run_grapheriser():
     df = df.pipe(_owid_format).pipe(_date_to_owid_year)
     df = df.drop_duplicates(keep=False, subset=["Country", "Year"])
     df.to_csv(DATA_HOSP_GRAPHER_FILE, index=False)
+    # Typed copy, read by the megafile
+    export_parquet(df, DATA_HOSP_GRAPHER_FILE)
     export_timestamp(PATHS.DATA_TIMESTAMP_HOSP_FILE)
 
 
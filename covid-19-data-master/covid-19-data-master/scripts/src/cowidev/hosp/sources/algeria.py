@@ -1,4 +1,4 @@
-import pandas as pd
+from cowidev.hosp.fetch import read_csv
 
 
 METADATA = {
@@ -12,7 +12,7 @@ METADATA = {
 
 
 def main():
-    df = pd.read_csv(METADATA["source_url"], usecols=["date", "in_icu"])
+    df = read_csv(METADATA["source_url"], usecols=["date", "in_icu"])
     df = df.melt("date", ["in_icu"], "indicator")
     df = df.assign(
         indicator=df.indicator.replace({"in_icu": "Daily ICU occupancy"}),
@@ -1,5 +1,6 @@
 import pandas as pd
 
+from cowidev.hosp.fetch import read_csv
 from cowidev.utils.clean import clean_date_series
 
 METADATA = {
@@ -11,7 +12,7 @@ METADATA = {
 
 
 def main() -> pd.DataFrame:
-    df = pd.read_csv(METADATA["source_url"], usecols=["Fecha", "Total UTI"])
+    df = read_csv(METADATA["source_url"], usecols=["Fecha", "Total UTI"])
 
     df = (
         df.assign(Fecha=clean_date_series(df.Fecha, "%d/%m/%Y"))
@@ -1,7 +1,4 @@
-import io
-import requests
-
-import pandas as pd
+from cowidev.hosp.fetch import read_csv
 
 METADATA = {
     "source_url": "https://covidbaseau.com/hospital-patients.csv",
@@ -12,8 +9,7 @@ METADATA = {
 
 
 def main():
-    response = requests.get(METADATA["source_url"])
-    df = pd.read_csv(io.StringIO(response.content.decode()))
+    df = read_csv(METADATA["source_url"])
 
     df = df.melt(id_vars="date", var_name="indicator").assign(entity=METADATA["entity"])
     df["indicator"] = df.indicator.replace(
@@ -1,5 +1,7 @@
 import pandas as pd
 
+from cowidev.hosp.fetch import read_csv
+
 METADATA = {
     "source_url": "https://epistat.sciensano.be/Data/COVID19BE_HOSP.csv",
     "source_url_ref": "https://epistat.sciensano.be/",
@@ -9,7 +11,7 @@ METADATA = {
 
 
 def main() -> pd.DataFrame:
-    df = pd.read_csv(METADATA["source_url"], usecols=["DATE", "TOTAL_IN", "TOTAL_IN_ICU", "NEW_IN"])
+    df = read_csv(METADATA["source_url"], usecols=["DATE", "TOTAL_IN", "TOTAL_IN_ICU", "NEW_IN"])
 
     df = df.rename(columns={"DATE": "date"}).groupby("date", as_index=False).sum().sort_values("date")
 
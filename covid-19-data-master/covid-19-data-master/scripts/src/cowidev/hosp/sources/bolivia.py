@@ -1,6 +1,8 @@
 import numpy as np
 import pandas as pd
 
+from cowidev.hosp.fetch import read_csv
+
 METADATA = {
     "source_url": "https://github.com/sociedatos/bo-hospitalizados_por_departamento/raw/master/hospitalizados_por_departamento.csv",
     "source_url_ref": "https://github.com/sociedatos/bo-hospitalizados_por_departamento",
@@ -11,7 +13,7 @@ METADATA = {
 
 def main() -> pd.DataFrame:
 
-    data = pd.read_csv(METADATA["source_url"])
+    data = read_csv(METADATA["source_url"])
 
     stock_cols = list(data.columns[data.iloc[0] == "hospitalizados"].values)
     keep_cols = ["Unnamed: 0"] + stock_cols
@@ -1,4 +1,4 @@
-import pandas as pd
+from cowidev.hosp.fetch import read_csv
 
 METADATA = {
     "source_url": "https://health-infobase.canada.ca/src/data/covidLive/covid19-epiSummary-hospVentICU.csv",
@@ -10,7 +10,7 @@ METADATA = {
 
 def main():
     df = (
-        pd.read_csv(
+        read_csv(
             METADATA["source_url"],
             usecols=[
                 "Date",
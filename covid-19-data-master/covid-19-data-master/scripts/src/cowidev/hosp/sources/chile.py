@@ -1,5 +1,7 @@
 import pandas as pd
 
+from cowidev.hosp.fetch import read_csv
+
 METADATA = {
     "source_url": {
         "icu_stock": "https://github.com/MinCiencia/Datos-COVID19/raw/master/output/producto8/UCI_std.csv",
@@ -15,18 +17,18 @@ METADATA = {
 def main():
 
     icu_stock = (
-        pd.read_csv(METADATA["source_url"]["icu_stock"], usecols=["fecha", "numero"])
+        read_csv(METADATA["source_url"]["icu_stock"], usecols=["fecha", "numero"])
         .rename(columns={"fecha": "date", "numero": "icu_stock"})
         .groupby("date", as_index=False)
         .sum()
     )
 
-    icu_flow = pd.read_csv(METADATA["source_url"]["icu_flow"], usecols=["Fecha", "Casos"]).rename(
+    icu_flow = read_csv(METADATA["source_url"]["icu_flow"], usecols=["Fecha", "Casos"]).rename(
         columns={"Fecha": "date", "Casos": "icu_flow"}
     )
     icu_flow["icu_flow"] = icu_flow.icu_flow.mul(7).round()
 
-    hosp_flow = pd.read_csv(METADATA["source_url"]["hosp_flow"], usecols=["Fecha", "Casos"]).rename(
+    hosp_flow = read_csv(METADATA["source_url"]["hosp_flow"], usecols=["Fecha", "Casos"]).rename(
         columns={"Fecha": "date", "Casos": "hosp_flow"}
     )
     hosp_flow["hosp_flow"] = hosp_flow.hosp_flow.mul(7).round()
@@ -1,5 +1,7 @@
 import pandas as pd
 
+from cowidev.hosp.fetch import read_csv
+
 
 METADATA = {
     "source_url": {
@@ -13,10 +15,10 @@ METADATA = {
 
 
 def main() -> pd.DataFrame:
-    stock = pd.read_csv(METADATA["source_url"]["stock"], usecols=["datum", "pocet_hosp", "jip"])
+    stock = read_csv(METADATA["source_url"]["stock"], usecols=["datum", "pocet_hosp", "jip"])
     stock = stock.rename(columns={"datum": "date"}).sort_values("date")
 
-    flow = pd.read_csv(METADATA["source_url"]["flow"], usecols=["datum", "nove_hospitalizace", "nove_jip"])
+    flow = read_csv(METADATA["source_url"]["flow"], usecols=["datum", "nove_hospitalizace", "nove_jip"])
     flow = flow.rename(columns={"datum": "date"}).groupby("date", as_index=False).sum().sort_values("date")
     flow["nove_hospitalizace"] = flow.nove_hospitalizace.rolling(7).sum()
     flow["nove_jip"] = flow.nove_jip.rolling(7).sum()
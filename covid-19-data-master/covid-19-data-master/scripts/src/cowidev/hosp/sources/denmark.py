@@ -1,11 +1,10 @@
-import io
 import os
-import requests
 import tempfile
 import zipfile
 
 import pandas as pd
 
+from cowidev.hosp.fetch import download, read_csv
 from cowidev.utils.web.scraping import get_soup
 
 METADATA = {
@@ -22,9 +21,8 @@ def read() -> pd.DataFrame:
     zip_url = soup.find("accordions").find("a").get("href")
 
     with tempfile.TemporaryDirectory() as tf:
-        r = requests.get(zip_url)
-        z = zipfile.ZipFile(io.BytesIO(r.content))
-        z.extractall(tf)
+        with zipfile.ZipFile(download(zip_url)) as z:
+            z.extractall(tf)
         flow = pd.read_csv(
             os.path.join(tf, "Regionalt_DB", "06_nye_indlaeggelser_pr_region_pr_dag.csv"),
             encoding="ISO 8859-1",
@@ -50,7 +48,7 @@ def main() -> pd.DataFrame:
 
     df = pd.merge(flow, stock, how="outer", on="date", validate="one_to_one")
 
-    icu = pd.read_csv(METADATA["source_url_icu"], usecols=["date", "icu_now"])
+    icu = read_csv(METADATA["source_url_icu"], usecols=["date", "icu_now"])
     df = pd.merge(df, icu, on="date", how="outer", validate="one_to_one")
 
     df = df.melt("date", var_name="indicator").dropna(subset=["value"]).sort_values(["indicator", "date"])
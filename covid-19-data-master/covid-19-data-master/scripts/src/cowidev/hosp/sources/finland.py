@@ -1,6 +1,6 @@
-import requests
-
 import pandas as pd
+
+from cowidev.hosp.fetch import read_json
 from cowidev.utils.clean import clean_date_series
 
 METADATA = {
@@ -12,7 +12,7 @@ METADATA = {
 
 
 def main() -> pd.DataFrame:
-    data = requests.get(METADATA["source_url"]).json()
+    data = read_json(METADATA["source_url"])
     df = pd.DataFrame.from_records(data["hospitalised"])
 
     df = df[df.area == "Finland"][["date", "totalHospitalised", "inIcu"]]
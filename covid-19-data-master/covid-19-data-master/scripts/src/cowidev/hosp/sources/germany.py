@@ -1,4 +1,6 @@
 import pandas as pd
+
+from cowidev.hosp.fetch import read_csv
 import numpy as np
 
 METADATA = {
@@ -14,7 +16,7 @@ METADATA = {
 
 def main() -> pd.DataFrame:
     # Hospital admissions
-    hosp_flow = pd.read_csv(
+    hosp_flow = read_csv(
         METADATA["source_url"]["hosp"], usecols=["Datum", "Bundesland", "Altersgruppe", "7T_Hospitalisierung_Faelle"]
     )
     hosp_flow = (
@@ -27,7 +29,7 @@ def main() -> pd.DataFrame:
 
     # ICU admissions and patients
     icu = (
-        pd.read_csv(
+        read_csv(
             METADATA["source_url"]["icu"], usecols=["Datum", "Aktuelle_COVID_Faelle_ITS", "faelle_covid_erstaufnahmen"]
         )
         .rename(columns={"Datum": "date"})
@@ -1,5 +1,6 @@
 import pandas as pd
 
+from cowidev.hosp.fetch import read_csv
 from cowidev.utils.clean import clean_date_series
 
 
@@ -16,7 +17,7 @@ METADATA = {
 
 def main() -> pd.DataFrame:
     hosp_flow = (
-        pd.read_csv(METADATA["source_url"]["flow"], usecols=["data", "casi"])
+        read_csv(METADATA["source_url"]["flow"], usecols=["data", "casi"])
         .rename(columns={"data": "date"})
         .sort_values("date")
         .head(-5)
@@ -24,7 +25,7 @@ def main() -> pd.DataFrame:
     hosp_flow["casi"] = hosp_flow.casi.rolling(7).sum()
 
     df = (
-        pd.read_csv(
+        read_csv(
             METADATA["source_url"]["main"],
             usecols=["data", "totale_ospedalizzati", "terapia_intensiva", "ingressi_terapia_intensiva"],
         )
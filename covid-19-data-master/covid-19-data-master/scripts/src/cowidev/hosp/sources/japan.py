@@ -1,4 +1,4 @@
-import pandas as pd
+from cowidev.hosp.fetch import read_csv
 
 METADATA = {
     "source_url": "https://raw.githubusercontent.com/fqj1994/covid-19-dataflow-jp/main/data/mhlw_hospitalization.csv",
@@ -9,7 +9,7 @@ METADATA = {
 
 
 def main():
-    df = pd.read_csv(METADATA["source_url"])
+    df = read_csv(METADATA["source_url"])
 
     df = df.melt("date", var_name="indicator", value_vars=["hospitalized", "require_ventilator_or_in_icu"]).dropna()
     df["indicator"] = df.indicator.replace(
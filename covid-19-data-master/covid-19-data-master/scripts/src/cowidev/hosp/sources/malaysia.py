@@ -1,5 +1,7 @@
 import pandas as pd
 
+from cowidev.hosp.fetch import read_csv
+
 METADATA = {
     "source_url": {
         "hosp": "https://raw.githubusercontent.com/MoH-Malaysia/covid19-public/main/epidemic/hospital.csv",
@@ -13,16 +15,14 @@ METADATA = {
 
 def main():
     hosp = (
-        pd.read_csv(METADATA["source_url"]["hosp"], usecols=["date", "hosp_covid", "admitted_covid"])
+        read_csv(METADATA["source_url"]["hosp"], usecols=["date", "hosp_covid", "admitted_covid"])
         .groupby("date", as_index=False)
         .sum()
         .sort_values("date")
     )
     hosp["admitted_covid"] = hosp.admitted_covid.rolling(7).sum()
 
-    icu = (
-        pd.read_csv(METADATA["source_url"]["icu"], usecols=["date", "icu_covid"]).groupby("date", as_index=False).sum()
-    )
+    icu = read_csv(METADATA["source_url"]["icu"], usecols=["date", "icu_covid"]).groupby("date", as_index=False).sum()
 
     df = (
         pd.merge(hosp, icu, on="date", how="outer", validate="one_to_one")
@@ -1,7 +1,7 @@
 import pandas as pd
 
+from cowidev.hosp.fetch import read_csv
 from cowidev.utils.clean import clean_date_series
-from cowidev.utils.web.download import read_csv_from_url
 
 
 METADATA = {
@@ -14,7 +14,7 @@ METADATA = {
 
 
 def main() -> pd.DataFrame:
-    df = pd.read_csv(
+    df = read_csv(
         METADATA["source_url"],
         usecols=[
             "datum",
@@ -1,6 +1,5 @@
-import requests
-
 import pandas as pd
+from cowidev.hosp.fetch import read_csv
 from cowidev.utils.clean import clean_date_series
 
 METADATA = {
@@ -12,7 +11,7 @@ METADATA = {
 
 
 def main() -> pd.DataFrame:
-    df = pd.read_csv(METADATA["source_url"], usecols=["data", "internados", "internados_uci"]).rename(
+    df = read_csv(METADATA["source_url"], usecols=["data", "internados", "internados_uci"]).rename(
         columns={"data": "date"}
     )
 
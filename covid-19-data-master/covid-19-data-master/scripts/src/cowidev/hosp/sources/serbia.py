@@ -1,5 +1,4 @@
-import pandas as pd
-
+from cowidev.hosp.fetch import read_csv
 from cowidev.utils.clean import clean_date_series
 
 
@@ -13,7 +12,7 @@ METADATA = {
 
 def main():
     df = (
-        pd.read_csv(METADATA["source_url"], usecols=["ts", "hospitalized", "ventilated"])
+        read_csv(METADATA["source_url"], usecols=["ts", "hospitalized", "ventilated"])
         .rename(
             columns={"ts": "date", "hospitalized": "Daily hospital occupancy", "ventilated": "Daily ICU occupancy"}
         )
@@ -1,8 +1,6 @@
-import requests
-
 import pandas as pd
 
-from cowidev.utils.web.download import read_csv_from_url
+from cowidev.hosp.fetch import read_csv, read_json
 
 
 METADATA = {
@@ -14,13 +12,13 @@ METADATA = {
 
 
 def import_flow():
-    metadata = requests.get(METADATA["source_url_flow"]).json()
+    metadata = read_json(METADATA["source_url_flow"])
 
     for resource in metadata["result"]["resources"]:
         if resource["name"] == "New COVID-19 Hospital Admissions":
-            hosp_flow = read_csv_from_url(resource["url"]).sort_values("date")
+            hosp_flow = read_csv(resource["url"]).sort_values("date")
         if resource["name"] == "New COVID-19 ICU Admissions":
-            icu_flow = read_csv_from_url(resource["url"]).sort_values("date")
+            icu_flow = read_csv(resource["url"]).sort_values("date")
 
     hosp_flow["new_hospital_admissions"] = hosp_flow.new_hospital_admissions.rolling(7).sum()
     icu_flow["new_icu_admissions"] = icu_flow.new_icu_admissions.rolling(7).sum()
@@ -1,5 +1,6 @@
 import pandas as pd
 
+from cowidev.hosp.fetch import read_csv
 from cowidev.utils.clean import clean_date_series
 
 
@@ -18,10 +19,10 @@ METADATA = {
 
 def main() -> pd.DataFrame:
 
-    flow = pd.read_csv(METADATA["source_url_flow"], usecols=["Week ending:", "National"]).rename(
+    flow = read_csv(METADATA["source_url_flow"], usecols=["Week ending:", "National"]).rename(
         columns={"Week ending:": "date"}
     )
-    stock = pd.read_csv(METADATA["source_url_stock"], usecols=["Dates", "Hospitalised", "ICU"]).rename(
+    stock = read_csv(METADATA["source_url_stock"], usecols=["Dates", "Hospitalised", "ICU"]).rename(
         columns={"Dates": "date"}
     )
 
@@ -1,4 +1,4 @@
-import pandas as pd
+from cowidev.hosp.fetch import read_csv
 
 
 METADATA = {
@@ -16,7 +16,7 @@ METADATA = {
 def main():
 
     hosp_flow_icu_stock = (
-        pd.read_csv(
+        read_csv(
             METADATA["source_url_hosp_flow_icu_stock"],
             usecols=[
                 "Date",
@@ -33,7 +33,7 @@ def main():
     )
 
     icu_flow = (
-        pd.read_csv(
+        read_csv(
             METADATA["source_url_icu_flow"],
             usecols=["Date", "Hospital admissions with moderate to severe symptoms (weekly)"],
             na_values="NA",
@@ -43,7 +43,7 @@ def main():
     )
 
     hosp_stock = (
-        pd.read_csv(METADATA["source_url_hosp_stock"])
+        read_csv(METADATA["source_url_hosp_stock"])
         .drop_duplicates()
         .rename(columns={"Date": "date"})
         .sort_values("date")
@@ -1,5 +1,6 @@
 import pandas as pd
 
+from cowidev.hosp.fetch import read_csv
 from cowidev.utils.web.scraping import get_soup
 from cowidev.utils.clean import clean_date_series
 
@@ -17,7 +18,7 @@ def main() -> pd.DataFrame:
     soup = get_soup(METADATA["source_url_ref"])
     url = soup.find(class_="informacion").find("a")["href"]
     url = "https://www.sanidad.gob.es/profesionales/saludPublica/ccayes/alertasActual/nCov/" + url
-    df = pd.read_csv(
+    df = read_csv(
         url,
         usecols=["Fecha", "Unidad", "OCUPADAS_COVID19", "INGRESOS_COVID19", "Provincia", "CCAA"],
         encoding="Latin-1",
@@ -1,5 +1,5 @@
 import pandas as pd
-from cowidev.utils.web.download import read_csv_from_url
+from cowidev.hosp.fetch import read_csv
 
 METADATA = {
     "source_url_ref": "https://www.socialstyrelsen.se/statistik-och-data/statistik/statistik-om-covid-19/",
@@ -13,13 +13,13 @@ URL_ICU = "https://static.dwcdn.net/data/16JTc.csv"
 
 def main() -> pd.DataFrame:
     # Load hospitalization data
-    df_hosp = read_csv_from_url(URL_HOSP).rename(
+    df_hosp = read_csv(URL_HOSP).rename(
         columns={
             "ReportDate": "date",
             "Uppskattad total": "Daily hospital occupancy",
         }
     )
-    df_icu = read_csv_from_url(URL_ICU).rename(
+    df_icu = read_csv(URL_ICU).rename(
         columns={
             "ReportDate": "date",
             "Uppskattad total": "Daily ICU occupancy",
@@ -1,8 +1,9 @@
 import datetime
-import requests
 
 import pandas as pd
 
+from cowidev.hosp.fetch import read_csv, read_json
+
 METADATA = {
     "source_url": "https://www.covid19.admin.ch/api/data/context",
     "source_url_ref": "https://www.covid19.admin.ch/",
@@ -12,11 +13,11 @@ METADATA = {
 
 
 def main() -> pd.DataFrame:
-    context = requests.get(METADATA["source_url"]).json()
+    context = read_json(METADATA["source_url"])
 
     # Hospital & ICU patients
     url = context["sources"]["individual"]["csv"]["daily"]["hospCapacity"]
-    stock = pd.read_csv(
+    stock = read_csv(
         url,
         usecols=[
             "date",
@@ -32,7 +33,7 @@ def main() -> pd.DataFrame:
 
     # Hospital admissions
     url = context["sources"]["individual"]["csv"]["daily"]["hosp"]
-    flow = pd.read_csv(url, usecols=["datum", "geoRegion", "entries"])
+    flow = read_csv(url, usecols=["datum", "geoRegion", "entries"])
     flow = (
         flow[flow.geoRegion == "CH"].drop(columns=["geoRegion"]).rename(columns={"datum": "date"}).sort_values("date")
     )
@@ -1,4 +1,4 @@
-import pandas as pd
+from cowidev.hosp.fetch import read_csv
 from cowidev.utils.clean import clean_date_series
 
 METADATA = {
@@ -10,7 +10,7 @@ METADATA = {
 
 
 def main():
-    df = pd.read_csv(
+    df = read_csv(
         METADATA["source_url"],
         usecols=[
             "date",
@@ -70,7 +70,7 @@ def check_data_correctness(df, logger, server):
         raise ValueError("Data correctness check failed. Read the logs (run `cowid jhu generate`)")
 
 
-def export(df, logger):
+def export(df, logger, bundle=None):
     # Export locations
     df_loc = df[["Country/Region", "location"]].drop_duplicates()
     df_loc = df_loc.merge(load_owid_continents(), on="location", how="left")
@@ -82,7 +82,7 @@ def export(df, logger):
     # Process/standardise data
     df = standardize_data(df)
     # The rest of the CSVs
-    succeed = standard_export(df, PATHS.DATA_JHU_DIR, DATASET_NAME)
+    succeed = standard_export(df, PATHS.DATA_JHU_DIR, DATASET_NAME, bundle=bundle)
     if succeed:
         logger.info("Successfully exported CSVs to %s\n" % colored(os.path.abspath(PATHS.DATA_JHU_DIR), "magenta"))
     else:
@@ -90,7 +90,7 @@ def export(df, logger):
         raise ValueError("JHU export failed.")
 
 
-def generate_dataset(logger, server_mode, skip_download=False):
+def generate_dataset(logger, server_mode, skip_download=False, bundle=None):
 
     if not skip_download:
         logger.info("\nAttempting to download latest CSV files...")
@@ -100,7 +100,7 @@ def generate_dataset(logger, server_mode, skip_download=False):
 
     check_data_correctness(df, logger, server_mode)
 
-    export(df, logger)
+    export(df, logger, bundle=bundle)
 
     logger.info("Generating subnational file…")
     create_subnational()
@@ -4,6 +4,10 @@ import os
 from datetime import datetime
 
 from cowidev.megafile.steps.test import get_testing
+from cowidev.utils.aggregates import aggregate_regions, region_members
+from cowidev.utils.io import days_since, export_wide
+from cowidev.utils.quality import mask_corrections, mask_recent_zeros
+from cowidev.utils.timeseries import inject_rolling_windows
 from cowidev.jhu.load import (
     load_population,
     load_eu_country_names,
@@ -57,14 +61,11 @@ def standardize_data(df):
         df[["date", "location", "new_cases", "new_deaths", "total_cases", "total_deaths"]]
         .pipe(discard_rows)
         .pipe(inject_owid_aggregates)
-        .pipe(inject_weekly_growth)
-        .pipe(inject_biweekly_growth)
-        .pipe(inject_doubling_days)
+        .pipe(inject_per_million, ["new_cases", "new_deaths"])
+        .pipe(inject_rolling_windows, doubling_days_spec=doubling_days_spec, rolling_avg_spec=rolling_avg_spec)
         .pipe(
             inject_per_million,
             [
-                "new_cases",
-                "new_deaths",
                 "total_cases",
                 "total_deaths",
                 "weekly_cases",
@@ -73,7 +74,6 @@ def standardize_data(df):
                 "biweekly_deaths",
             ],
         )
-        .pipe(inject_rolling_avg)
         .pipe(inject_cfr)
         .pipe(inject_days_since)
         .pipe(inject_exemplars)
@@ -123,26 +123,12 @@ aggregates_spec = {
 }
 
 
-def _sum_aggregate(df, name, include=None, exclude=None):
-    df = df.copy()
-    if include:
-        df = df[df["location"].isin(include)]
-    if exclude:
-        df = df[~df["location"].isin(exclude)]
-    df = df.groupby("date").sum().reset_index()
-    df["location"] = name
-    return df
-
-
 def inject_owid_aggregates(df):
-    return pd.concat(
-        [
-            df,
-            *[_sum_aggregate(df, name, **params) for name, params in aggregates_spec.items()],
-        ],
-        sort=True,
-        ignore_index=True,
-    )
+    locations = df["location"].unique()
+    regions = {name: region_members(locations, **params) for name, params in aggregates_spec.items()}
+    columns = [col for col in df.columns if col not in ["location", "date"]]
+    aggregates = aggregate_regions(df, regions, columns_0fill=columns)
+    return pd.concat([df, aggregates], sort=True, ignore_index=True)
 
 
 # =======================
@@ -276,24 +262,6 @@ rolling_avg_spec = {
 }
 
 
-def inject_rolling_avg(df):
-    df = df.copy().sort_values(by="date")
-    for col, spec in rolling_avg_spec.items():
-        df[col] = df[spec["col"]].astype("float")
-        df[col] = (
-            df.groupby("location")[col]
-            .rolling(
-                window=spec["window"],
-                min_periods=spec["min_periods"],
-                center=spec["center"],
-            )
-            .mean()
-            .round(decimals=3)
-            .reset_index(level=0, drop=True)
-        )
-    return df
-
-
 # ===========================
 # Variables to find exemplars
 # ===========================
@@ -354,67 +322,6 @@ doubling_days_spec = {
 }
 
 
-def pct_change_to_doubling_days(pct_change, periods):
-    if pd.notnull(pct_change) and pct_change != 0:
-        doubling_days = periods * np.log(2) / np.log(1 + pct_change)
-        return np.round(doubling_days, decimals=2)
-    return pd.NA
-
-
-def inject_doubling_days(df):
-    for col, spec in doubling_days_spec.items():
-        value_col = spec["value_col"]
-        periods = spec["periods"]
-        df.loc[df[value_col] == 0, value_col] = np.nan
-        df[col] = (
-            df.groupby("location", as_index=False)[value_col]
-            .pct_change(periods=periods, fill_method=None)[value_col]
-            .map(lambda pct: pct_change_to_doubling_days(pct, periods))
-        )
-    return df
-
-
-# ====================================
-# Weekly & biweekly growth calculation
-# ====================================
-
-
-def _inject_growth(df, prefix, periods):
-    cases_colname = "%s_cases" % prefix
-    deaths_colname = "%s_deaths" % prefix
-    cases_growth_colname = "%s_pct_growth_cases" % prefix
-    deaths_growth_colname = "%s_pct_growth_deaths" % prefix
-
-    df[[cases_colname, deaths_colname]] = (
-        df[["location", "new_cases", "new_deaths"]]
-        .groupby("location")[["new_cases", "new_deaths"]]
-        .rolling(window=periods, min_periods=periods - 1, center=False)
-        .sum()
-        .reset_index(level=0, drop=True)
-    )
-    df[[cases_growth_colname, deaths_growth_colname]] = (
-        df[["location", cases_colname, deaths_colname]]
-        .groupby("location")[[cases_colname, deaths_colname]]
-        .pct_change(periods=periods, fill_method=None)
-        .round(3)
-        .replace([np.inf, -np.inf], pd.NA)
-        * 100
-    )
-
-    df.loc[df.new_cases.isnull(), cases_colname] = np.nan
-    df.loc[df.new_deaths.isnull(), deaths_colname] = np.nan
-
-    return df
-
-
-def inject_weekly_growth(df):
-    return _inject_growth(df, "weekly", 7)
-
-
-def inject_biweekly_growth(df):
-    return _inject_growth(df, "biweekly", 14)
-
-
 # ============
 # Export logic
 # ============
@@ -504,12 +411,11 @@ def existsin(l1, l2):
     return [x for x in l1 if x in l2]
 
 
-def standard_export(df, output_path, grapher_name):
+def standard_export(df, output_path, grapher_name, bundle=None):
     # Grapher
-    df_grapher = df.copy()
-    df_grapher["date"] = pd.to_datetime(df_grapher["date"]).map(lambda date: (date - zero_day).days)
-    df_grapher = (
-        df_grapher[GRAPHER_COL_NAMES.keys()]
+    (
+        df[GRAPHER_COL_NAMES.keys()]
+        .assign(date=days_since(df["date"], zero_day))
         .rename(columns=GRAPHER_COL_NAMES)
         .to_csv(os.path.join(output_path, "%s.csv" % grapher_name), index=False)
     )
@@ -541,39 +447,20 @@ def standard_export(df, output_path, grapher_name):
     df_table[full_data_cols].dropna(subset=BASE_MEASURES, how="all").to_csv(
         os.path.join(output_path, "full_data.csv"), index=False
     )
-    # Pivot variables (wide format)
-    for col_name in [*BASE_MEASURES, *PER_MILLION_MEASURES]:
-        df_pivot = df_table.pivot(index="date", columns="location", values=col_name)
-        # move World to first column
-        cols = df_pivot.columns.tolist()
-        cols.insert(0, cols.pop(cols.index("World")))
-        df_pivot[cols].to_csv(os.path.join(output_path, "%s.csv" % col_name))
+    # Pivot variables (wide format), with World as first column
+    export_wide(
+        df_table,
+        [*BASE_MEASURES, *PER_MILLION_MEASURES],
+        output_path,
+        first_columns=["World"],
+        bundle=bundle,
+        bundle_name="wide_data",
+        parquet=True,
+    )
     return True
 
 
 # Other
-def hide_recent_zeros(df: pd.DataFrame) -> pd.DataFrame:
-    last_reported_date = df.date.max()
-
-    last_positive_cases_date = df.loc[df.new_cases > 0, "date"].max()
-    if pd.isnull(last_positive_cases_date):
-        return df
-    if last_positive_cases_date != last_reported_date:
-        last_known_cases = df.loc[df.date == last_positive_cases_date, "new_cases"].item()
-        if last_known_cases >= 100 and (last_reported_date - last_positive_cases_date).days < 7:
-            df.loc[df.date > last_positive_cases_date, "new_cases"] = np.nan
-
-    last_positive_deaths_date = df.loc[df.new_deaths > 0, "date"].max()
-    if pd.isnull(last_positive_deaths_date):
-        return df
-    if last_positive_deaths_date != last_reported_date:
-        last_known_deaths = df.loc[df.date == last_positive_deaths_date, "new_deaths"].item()
-        if last_known_deaths >= 10 and (last_reported_date - last_positive_deaths_date).days < 7:
-            df.loc[df.date > last_positive_deaths_date, "new_deaths"] = np.nan
-
-    return df
-
-
 def discard_rows(df):
     # For all rows where new_cases or new_deaths is negative, we keep the cumulative value but set
     # the daily change to NA. This also sets the 7-day rolling average to NA for the next 7 days.
@@ -581,11 +468,10 @@ def discard_rows(df):
     df.loc[df.new_deaths < 0, "new_deaths"] = np.nan
 
     # Custom data corrections
-    for ldc in LARGE_DATA_CORRECTIONS:
-        df.loc[(df.location == ldc[0]) & (df.date.astype(str) == ldc[1]), f"new_{ldc[2]}"] = np.nan
+    df = mask_corrections(df, LARGE_DATA_CORRECTIONS)
 
-    # If the last known value is above 1000 cases or 100 deaths but the latest reported value is 0
+    # If the last known value is above 100 cases or 10 deaths but the latest reported value is 0
     # then set that value to NA in case it's a temporary reporting error. (Up to 7 days in the past)
-    df = df.sort_values(["location", "date"]).groupby("location").apply(hide_recent_zeros)
+    df = mask_recent_zeros(df, thresholds={"new_cases": 100, "new_deaths": 10}, max_days=7)
 
     return df
@@ -1,89 +1,180 @@
+"""Subnational cases and deaths from JHU (provinces/states of countries, and counties of the US).
+
+JHU publishes wide time series (one row per region, one column per date). These are kept in a local cache and only
+downloaded again when they change upstream. Daily and smoothed metrics are computed on the wide matrices, and long
+format is only built one partition (country, or state for the US) at a time.
+"""
+import os
+import shutil
+import tempfile
+import zipfile
+
+import numpy as np
 import pandas as pd
-from cowidev.utils.s3 import obj_to_s3
 
+from cowidev import PATHS
+from cowidev.utils.s3 import S3
+from cowidev.utils.web.download import download_file_cached
 
-def clean_global_subnational(metric):
-    url = f"https://raw.githubusercontent.com/CSSEGISandData/COVID-19/master/csse_covid_19_data/csse_covid_19_time_series/time_series_covid19_{metric}_global.csv"
-    metric = "cases" if metric == "confirmed" else "deaths"
 
-    df = (
-        pd.read_csv(url, na_values="")
-        .drop(columns=["Lat", "Long"])
-        .dropna(subset=["Province/State"])
-        .melt(id_vars=["Country/Region", "Province/State"], var_name="date", value_name=f"total_{metric}")
-        .rename(columns={"Country/Region": "location1", "Province/State": "location2"})
-    )
-    df["date"] = pd.to_datetime(df.date).dt.date.astype(str)
-    df = df.sort_values(["location1", "location2", "date"])
-    df[f"new_{metric}"] = df[f"total_{metric}"] - df.groupby(["location1", "location2"])[f"total_{metric}"].shift(1)
-    df[f"new_{metric}_smoothed"] = (
-        df.groupby(["location1", "location2"]).rolling(7)[f"new_{metric}"].mean().droplevel(level=[0, 1]).round(2)
-    )
-    df["location3"] = pd.NA
-    return df
-
-
-def clean_us_subnational(metric):
-    url = f"https://raw.githubusercontent.com/CSSEGISandData/COVID-19/master/csse_covid_19_data/csse_covid_19_time_series/time_series_covid19_{metric}_US.csv"
-    metric = "cases" if metric == "confirmed" else "deaths"
-
-    df = (
-        pd.read_csv(url)
-        .drop(
-            columns=[
-                "UID",
-                "iso2",
-                "iso3",
-                "code3",
-                "FIPS",
-                "Country_Region",
-                "Lat",
-                "Long_",
-                "Combined_Key",
-                "Population",
-            ],
-            errors="ignore",
-        )
-        .melt(id_vars=["Province_State", "Admin2"], var_name="date", value_name=f"total_{metric}")
-        .rename(columns={"Province_State": "location2", "Admin2": "location3"})
+URL_BASE = (
+    "https://raw.githubusercontent.com/CSSEGISandData/COVID-19/master/csse_covid_19_data/csse_covid_19_time_series"
+)
+KEYS = ["location1", "location2", "location3"]
+COLUMNS_OUTPUT = [
+    *KEYS,
+    "date",
+    "total_cases",
+    "new_cases",
+    "new_cases_smoothed",
+    "total_deaths",
+    "new_deaths",
+    "new_deaths_smoothed",
+]
+SUBNATIONAL_DIR = os.path.join(PATHS.INTERNAL_TMP_JHU_CACHE_DIR, "subnational")
+
+
+def load_time_series(metric, scope):
+    """Load JHU time series in wide format.
+
+    Args:
+        metric (str): "confirmed" or "deaths".
+        scope (str): "global" (provinces/states) or "US" (counties).
+
+    Returns:
+        Tuple[pd.DataFrame, np.ndarray, np.ndarray]: Regions (columns `KEYS`), dates (YYYY-MM-DD, sorted) and values
+            (regions x dates).
+    """
+    filename = f"time_series_covid19_{metric}_{scope}.csv"
+    path = os.path.join(PATHS.INTERNAL_TMP_JHU_CACHE_DIR, filename)
+    download_file_cached(f"{URL_BASE}/{filename}", path)
+
+    if scope == "global":
+        id_cols = {"Country/Region": "location1", "Province/State": "location2"}
+    else:
+        id_cols = {"Province_State": "location2", "Admin2": "location3"}
+    header = pd.read_csv(path, nrows=0).columns
+    dates = pd.to_datetime(pd.Series(header), format="%m/%d/%y", errors="coerce")
+    date_cols = header[dates.notna().values]
+    dates = dates.dropna().dt.strftime("%Y-%m-%d").values
+
+    df = pd.read_csv(
+        path,
+        usecols=[*id_cols, *date_cols],
+        dtype={col: float for col in date_cols},
+        na_values="",
     )
-    df["date"] = pd.to_datetime(df.date).dt.date.astype(str)
-    df = df.sort_values(["location2", "location3", "date"])
-    df[f"new_{metric}"] = df[f"total_{metric}"] - df.groupby(["location2", "location3"])[f"total_{metric}"].shift(1)
-    df[f"new_{metric}_smoothed"] = (
-        df.groupby(["location2", "location3"]).rolling(7)[f"new_{metric}"].mean().droplevel(level=[0, 1]).round(2)
+    if scope == "global":
+        df = df.dropna(subset=["Province/State"])
+    regions = df[list(id_cols)].rename(columns=id_cols).reset_index(drop=True)
+    if scope == "global":
+        regions["location3"] = pd.NA
+    else:
+        regions["location1"] = "United States"
+
+    order = np.argsort(dates, kind="stable")
+    values = df[date_cols].to_numpy()[:, order]
+    return regions[KEYS], dates[order], values
+
+
+def _new(total):
+    new = np.full(total.shape, np.nan)
+    new[:, 1:] = np.diff(total, axis=1)
+    return new
+
+
+def _rolling_mean(values, window):
+    """Rolling mean over the last `window` columns, NaN unless all of them are valid."""
+    valid = ~np.isnan(values)
+    csum = np.pad(np.cumsum(np.where(valid, values, 0), axis=1), ((0, 0), (1, 0)))
+    count = np.pad(np.cumsum(valid, axis=1), ((0, 0), (1, 0)))
+    mean = np.full(values.shape, np.nan)
+    window_sum = csum[:, window:] - csum[:, :-window]
+    window_count = count[:, window:] - count[:, :-window]
+    mean[:, window - 1 :] = np.where(window_count == window, window_sum / window, np.nan)
+    return mean
+
+
+def build_metrics(metric, scope):
+    """Total, daily and smoothed (7-day average) metrics for JHU time series `metric`, in wide format."""
+    regions, dates, total = load_time_series(metric, scope)
+    name = "cases" if metric == "confirmed" else "deaths"
+    new = _new(total)
+    metrics = {
+        f"total_{name}": total,
+        f"new_{name}": new,
+        f"new_{name}_smoothed": _rolling_mean(new, 7).round(2),
+    }
+    return regions, dates, metrics
+
+
+def build_scope(scope):
+    """Metrics of cases and deaths of `scope`, on the union of their regions and dates (as an outer merge)."""
+    regions_c, dates_c, metrics_c = build_metrics("confirmed", scope)
+    regions_d, dates_d, metrics_d = build_metrics("deaths", scope)
+
+    regions = (
+        regions_c.assign(_idx_c=np.arange(len(regions_c)))
+        .merge(regions_d.assign(_idx_d=np.arange(len(regions_d))), on=KEYS, how="outer")
+        .sort_values(KEYS)
+        .reset_index(drop=True)
     )
-    df["location1"] = "United States"
-    return df
+    dates = np.union1d(dates_c, dates_d)
+
+    metrics = {}
+    for dates_x, metrics_x, idx_x in ((dates_c, metrics_c, regions._idx_c), (dates_d, metrics_d, regions._idx_d)):
+        rows = idx_x.fillna(-1).astype(int).values
+        cols = pd.Index(dates).get_indexer(dates_x)
+        for col, values in metrics_x.items():
+            aligned = np.full((len(regions), len(dates)), np.nan)
+            aligned[np.ix_(rows >= 0, cols)] = values[rows[rows >= 0]]
+            metrics[col] = aligned
+    return regions[KEYS], dates, metrics
+
+
+def iter_partitions(regions, dates, metrics, partition_keys):
+    """Yield (partition, long-format data) for each group of `partition_keys` (in sorted order)."""
+    groups = regions.groupby(partition_keys, sort=True, dropna=False).indices
+    for partition, rows in groups.items():
+        n_dates = len(dates)
+        df = pd.DataFrame(
+            {
+                **{key: np.repeat(regions[key].values[rows], n_dates) for key in KEYS},
+                "date": np.tile(dates, len(rows)),
+                **{col: values[rows].ravel() for col, values in metrics.items()},
+            }
+        )[COLUMNS_OUTPUT]
+        # Totals are counts: keep them as integers in the output (values are NaN-padded floats in the wide matrices)
+        df = df.astype({"total_cases": "Int64", "total_deaths": "Int64"})
+        yield partition, df[df.total_cases > 0]
+
+
+def _partition_path(partition):
+    parts = [str(p).replace(os.sep, "_") for p in np.atleast_1d(partition)]
+    return os.path.join(SUBNATIONAL_DIR, *parts[:-1], f"{parts[-1]}.csv")
 
 
 def create_subnational():
-    global_cases = clean_global_subnational("confirmed")
-    global_deaths = clean_global_subnational("deaths")
-    us_cases = clean_us_subnational("confirmed")
-    us_deaths = clean_us_subnational("deaths")
-
-    df = pd.concat(
-        [
-            pd.merge(global_cases, global_deaths, on=["location1", "location2", "location3", "date"], how="outer"),
-            pd.merge(us_cases, us_deaths, on=["location1", "location2", "location3", "date"], how="outer"),
-        ]
-    ).sort_values(["location1", "location2", "location3", "date"])[
-        [
-            "location1",
-            "location2",
-            "location3",
-            "date",
-            "total_cases",
-            "new_cases",
-            "new_cases_smoothed",
-            "total_deaths",
-            "new_deaths",
-            "new_deaths_smoothed",
-        ]
-    ]
-    df = df[df.total_cases > 0]
     filename = "subnational_cases_deaths"
-    compression = {"method": "zip", "archive_name": f"{filename}.csv"}
-    # df.to_csv(os.path.join(OUTPUT_PATH, f"{filename}.zip"), index=False, compression=compression)
-    obj_to_s3(df, s3_path="s3://covid-19/public/jhu/{filename}.zip", compression=compression, public=True)
+    # Write partitions as they are built (global: by country, US: by state)
+    paths = []
+    for scope, partition_keys in (("global", ["location1"]), ("US", ["location1", "location2"])):
+        for partition, df in iter_partitions(*build_scope(scope), partition_keys=partition_keys):
+            path = _partition_path(partition)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            df.to_csv(path, index=False)
+            paths.append((tuple(np.atleast_1d(partition).astype(str)), path))
+    paths.sort()
+
+    # Concatenate partitions (sorted by location) into the zipped CSV, without loading them
+    with tempfile.TemporaryDirectory() as tmp:
+        output_path = os.path.join(tmp, f"{filename}.zip")
+        with zipfile.ZipFile(output_path, "w", zipfile.ZIP_DEFLATED) as z:
+            with z.open(f"{filename}.csv", "w", force_zip64=True) as f:
+                for i, (_, path) in enumerate(paths):
+                    with open(path, "rb") as partition:
+                        header = partition.readline()
+                        if i == 0:
+                            f.write(header)
+                        shutil.copyfileobj(partition, f)
+        S3().upload_to_s3(output_path, s3_path=f"s3://covid-19/public/jhu/{filename}.zip", public=True)
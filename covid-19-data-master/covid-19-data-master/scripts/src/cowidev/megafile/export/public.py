@@ -1,68 +1,82 @@
+import io
+import json
 import os
-from datetime import date, timedelta
+import tempfile
+from datetime import timedelta
 
+import numpy as np
 import pandas as pd
 
 from cowidev import PATHS
-from cowidev.utils.s3 import S3, obj_to_s3
-from cowidev.utils.utils import dict_to_compact_json
+from cowidev.utils.latest import get_latest
+from cowidev.utils.s3 import S3Uploader
 
 
 DATA_DIR = PATHS.DATA_DIR
+# Columns stored as categoricals in the Parquet export
+COLUMNS_CATEGORICAL = ["iso_code", "continent", "location", "tests_units"]
 
 
 def create_dataset(df, macro_variables, logger, filename=None):
     """Export dataset as CSV, XLSX and JSON (complete time series)."""
     if filename is None:
         filename = "owid-covid-data"
-    logger.info("Writing to CSV…")
-    filename_local = os.path.join(DATA_DIR, f"{filename}.csv")
-    df.to_csv(filename_local, index=False)
-    S3().upload_to_s3(filename_local, f"s3://covid-19/public/{filename}.csv", public=True)
-
-    logger.info("Writing to XLSX…")
-    # filename = os.path.join(DATA_DIR, "owid-covid-data.xlsx")
-    # all_covid.to_excel(os.path.join(DATA_DIR, "owid-covid-data.xlsx"), index=False, engine="xlsxwriter")
-    # upload_to_s3(filename, "public/owid-covid-data.xlsx", public=True)
-    obj_to_s3(df, s3_path=f"s3://covid-19/public/{filename}.xlsx", public=True)
-
-    logger.info("Writing to JSON…")
-    data = df_to_dict(
-        df,
-        macro_variables.keys(),
-        valid_json=True,
-    )
-    obj_to_s3(data, f"s3://covid-19/public/{filename}.json", public=True)
+    with tempfile.TemporaryDirectory() as tmp, S3Uploader() as uploader:
+        logger.info("Writing to CSV…")
+        filename_local = os.path.join(DATA_DIR, f"{filename}.csv")
+        df.to_csv(filename_local, index=False)
+        uploader.upload(filename_local, f"s3://covid-19/public/{filename}.csv", public=True)
+
+        logger.info("Writing to Parquet…")
+        filename_local = os.path.join(DATA_DIR, f"{filename}.parquet")
+        df_to_parquet(df, filename_local)
+        uploader.upload(filename_local, f"s3://covid-19/public/{filename}.parquet", public=True)
+
+        logger.info("Writing to XLSX…")
+        # Serialized in the uploader's worker thread, while the JSON is written
+        uploader.upload_obj(df, s3_path=f"s3://covid-19/public/{filename}.xlsx", public=True)
+
+        logger.info("Writing to JSON…")
+        filename_local = os.path.join(tmp, f"{filename}.json")
+        df_to_json(df, filename_local, macro_variables.keys())
+        uploader.upload(filename_local, f"s3://covid-19/public/{filename}.json", public=True)
+
+
+def df_to_parquet(df, output_path):
+    """Write a typed version of the dataset as Parquet.
+
+    Labels are stored as categoricals, `date` as a date and all other columns as floats.
+    """
+    dtypes = {col: "category" if col in COLUMNS_CATEGORICAL else "float64" for col in df.columns if col != "date"}
+    df = df.astype(dtypes).assign(date=pd.to_datetime(df.date, format="%Y-%m-%d"))
+    df.to_parquet(output_path, index=False)
 
 
 def create_latest(df, logger):
     """Export dataset as CSV, XLSX and JSON (latest data points)."""
-    df = df[df.date >= str(date.today() - timedelta(weeks=2))]
-    df = df.sort_values("date")
-
-    latest = [df[df.location == loc].ffill().tail(1).round(3) for loc in set(df.location)]
-    latest = pd.concat(latest)
-    latest = latest.sort_values("location").rename(columns={"date": "last_updated_date"})
+    latest = get_latest(df, lookback=timedelta(weeks=2)).round(3)
+    latest = latest.rename(columns={"date": "last_updated_date"})
 
     logger.info("Writing latest version…")
-    # CSV
-    latest.to_csv(os.path.join(DATA_DIR, "latest", "owid-covid-latest.csv"), index=False)
-    S3().upload_to_s3(
-        os.path.join(DATA_DIR, "latest", "owid-covid-latest.csv"),
-        "s3://covid-19/public/latest/owid-covid-latest.csv",
-        public=True,
-    )
-    # XLSX
-    obj_to_s3(latest, s3_path="s3://covid-19/public/latest/owid-covid-latest.xlsx", public=True)
-    # JSON
-    latest.dropna(subset=["iso_code"]).set_index("iso_code").to_json(
-        os.path.join(DATA_DIR, "latest", "owid-covid-latest.json"), orient="index"
-    )
-    S3().upload_to_s3(
-        os.path.join(DATA_DIR, "latest", "owid-covid-latest.json"),
-        "s3://covid-19/public/latest/owid-covid-latest.json",
-        public=True,
-    )
+    with S3Uploader() as uploader:
+        # CSV
+        latest.to_csv(os.path.join(DATA_DIR, "latest", "owid-covid-latest.csv"), index=False)
+        uploader.upload(
+            os.path.join(DATA_DIR, "latest", "owid-covid-latest.csv"),
+            "s3://covid-19/public/latest/owid-covid-latest.csv",
+            public=True,
+        )
+        # XLSX
+        uploader.upload_obj(latest, s3_path="s3://covid-19/public/latest/owid-covid-latest.xlsx", public=True)
+        # JSON
+        latest.dropna(subset=["iso_code"]).set_index("iso_code").to_json(
+            os.path.join(DATA_DIR, "latest", "owid-covid-latest.json"), orient="index"
+        )
+        uploader.upload(
+            os.path.join(DATA_DIR, "latest", "owid-covid-latest.json"),
+            "s3://covid-19/public/latest/owid-covid-latest.json",
+            public=True,
+        )
 
 
 def df_to_dict(complete_dataset, static_columns, valid_json=False):
@@ -71,23 +85,11 @@ def df_to_dict(complete_dataset, static_columns, valid_json=False):
     NA values are dropped from the output.
     Macro variables are normalized by appearing only once, at the root of each ISO code.
     """
-    megajson = {}
-
-    static_columns = ["continent", "location"] + list(static_columns)
-
-    complete_dataset = complete_dataset.dropna(axis="rows", subset=["iso_code"])
-
-    for iso in complete_dataset.iso_code.unique():
-        country_df = complete_dataset[complete_dataset.iso_code == iso].drop(columns=["iso_code"])
-        static_data = country_df.head(1)[static_columns].to_dict("records")[0]
-        megajson[iso] = {k: v for k, v in static_data.items() if pd.notnull(v)}
-        megajson[iso]["data"] = [
-            {k: v for k, v in r.items() if pd.notnull(v)}
-            for r in country_df.drop(columns=static_columns).to_dict("records")
-        ]
+    buffer = io.StringIO()
+    write_json(complete_dataset, buffer, static_columns)
     if valid_json:
-        megajson = dict_to_compact_json(megajson)
-    return megajson
+        return buffer.getvalue()
+    return json.loads(buffer.getvalue())
 
 
 def df_to_json(complete_dataset, output_path, static_columns):
@@ -96,6 +98,56 @@ def df_to_json(complete_dataset, output_path, static_columns):
     NA values are dropped from the output.
     Macro variables are normalized by appearing only once, at the root of each ISO code.
     """
-    megajson = df_to_dict(complete_dataset, static_columns, valid_json=True)
     with open(output_path, "w") as file:
-        file.write(megajson)
+        write_json(complete_dataset, file, static_columns)
+
+
+def write_json(complete_dataset, file, static_columns, chunk_size=50000):
+    """Stream the JSON version of the complete dataset (see `df_to_json`) to a file object.
+
+    Data is processed in a single pass over the locations, in chunks of ~`chunk_size` rows. Rows are encoded to
+    compact JSON column-wise, skipping NA cells. The output is the same as encoding the nested dictionary with
+    `dict_to_compact_json`.
+    """
+    static_columns = ["continent", "location"] + list(static_columns)
+
+    df = complete_dataset.dropna(axis="rows", subset=["iso_code"])
+    # Group rows by ISO code, keeping the order of appearance
+    codes, isos = pd.factorize(df.iso_code)
+    order = np.argsort(codes, kind="stable")
+    df = df.iloc[order].drop(columns=["iso_code"])
+    bounds = np.searchsorted(codes[order], np.arange(len(isos) + 1))
+    columns_data = [col for col in df.columns if col not in static_columns]
+
+    file.write("{")
+    i = 0
+    while i < len(isos):
+        # Chunk of consecutive locations
+        j = max(int(np.searchsorted(bounds, bounds[i] + chunk_size, side="right")) - 1, i + 1)
+        df_chunk = df.iloc[bounds[i] : bounds[j]]
+        offsets = bounds[i : j + 1] - bounds[i]
+        rows = _encode_json_rows(df_chunk[columns_data])
+        # Static data is taken from the first row of each location
+        statics = _encode_json_rows(df_chunk.iloc[offsets[:-1]][static_columns])
+        for k, static in enumerate(statics):
+            static = static[:-1] + ("," if static != "{}" else "")
+            data = ",".join(rows[offsets[k] : offsets[k + 1]])
+            file.write(f"{',' if i + k > 0 else ''}{json.dumps(isos[i + k])}:{static}\"data\":[{data}]}}")
+        i = j
+    file.write("}")
+
+
+def _encode_json_rows(df):
+    """Encode each row of `df` as a compact JSON object, skipping NA cells."""
+    rows = np.full(len(df), "", dtype=object)
+    for col in df.columns:
+        values = df[col]
+        mask = values.notna().values
+        if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+            if np.isinf(values[mask].astype(float)).any():
+                raise ValueError(f"Out of range float values are not JSON compliant (column {col})")
+            encoded = values[mask].astype(str).values
+        else:
+            encoded = values[mask].map(json.dumps).values
+        rows[mask] = rows[mask] + f",{json.dumps(col)}:" + encoded
+    return [f"{{{row[1:]}}}" for row in rows]
@@ -6,7 +6,8 @@ import pandas as pd
 from cowidev.utils.utils import export_timestamp
 from cowidev import PATHS
 from cowidev.megafile.steps import (
-    get_base_dataset,
+    get_base_inputs,
+    merge_base_inputs,
     add_macro_variables,
     add_excess_mortality,
     add_rolling_vaccinations,
@@ -20,6 +21,7 @@ from cowidev.megafile.export import (
     generate_status,
     generate_htmls,
 )
+from cowidev.megafile.incremental import MegafilePartitions, fingerprint_inputs, fingerprint_files
 
 
 INPUT_DIR = PATHS.INTERNAL_INPUT_DIR
@@ -51,10 +53,17 @@ MACRO_VARIABLES = {
 }
 
 
-def generate_megafile(logger):
-    """Generate megafile data."""
+def generate_megafile(logger, incremental=False):
+    """Generate megafile data.
+
+    If `incremental` is True, only locations whose inputs changed since the last run are recomputed. The rest are
+    loaded from the partitions stored in the last run.
+    """
     # Load data
-    all_covid = load_data(logger)
+    if incremental:
+        all_covid = load_data_incremental(logger)
+    else:
+        all_covid = load_data(logger)
     # Create internal datasets
     export_internal(
         logger,
@@ -68,8 +77,64 @@ def generate_megafile(logger):
 
 
 def load_data(logger, old=False):
-    all_covid = get_base_dataset(logger, old)
+    inputs = get_base_inputs(logger, old)
+    return build_megafile(logger, merge_base_inputs(inputs))
+
+
+def load_data_incremental(logger, old=False):
+    inputs = get_base_inputs(logger, old)
+    # Reference date for last-12-month metrics: must be the same for all locations
+    date_ref = _get_date_ref(inputs)
+
+    logger.info("Fingerprinting inputs…")
+    fingerprints = fingerprint_inputs(inputs)
+    fingerprint_global = fingerprint_files(_static_input_files(), date.today(), date_ref)
+
+    partitions = MegafilePartitions()
+    locations_changed = partitions.changed_locations(fingerprints, fingerprint_global)
+    locations_removed = set(partitions.manifest["locations"]).difference(fingerprints)
+    logger.info(f"Recomputing {len(locations_changed)} out of {len(fingerprints)} locations…")
+
+    # Recompute changed locations
+    if locations_changed:
+        inputs_changed = {name: df[df.location.isin(locations_changed)] for name, df in inputs.items()}
+        all_covid_changed = build_megafile(logger, merge_base_inputs(inputs_changed), date_ref=date_ref)
+    else:
+        all_covid_changed = pd.DataFrame()
+    # Load unchanged locations from last run
+    all_covid_cached = partitions.read(set(fingerprints).difference(locations_changed))
+
+    # Update partitions
+    partitions.drop(locations_removed)
+    partitions.update(
+        all_covid_changed,
+        fingerprints={loc: fingerprints[loc] for loc in locations_changed},
+        global_fingerprint=fingerprint_global,
+    )
+
+    all_covid = pd.concat([all_covid_cached, all_covid_changed], ignore_index=True)
+    all_covid = all_covid.sort_values(["location", "date"])
+    return all_covid
+
+
+def _get_date_ref(inputs):
+    today = str(date.today())
+    return max(df.loc[df.date < today, "date"].max() for df in inputs.values())
+
+
+def _static_input_files():
+    """Input files shared by all locations. A change in any of these triggers a complete rebuild."""
+    return [
+        PATHS.INTERNAL_INPUT_ISO_FILE,
+        PATHS.INTERNAL_INPUT_OWID_CONT_FILE,
+        PATHS.INTERNAL_INPUT_OWID_POPULATION_SUB_FILE,
+        os.path.join(DATA_DIR, "excess_mortality", "excess_mortality.csv"),
+        os.path.join(DATA_DIR, "excess_mortality", "excess_mortality_economist_estimates.csv"),
+    ] + [os.path.join(INPUT_DIR, file) for file in MACRO_VARIABLES.values()]
+
 
+def build_megafile(logger, all_covid, date_ref=None):
+    """Build the megafile from the merged inputs (output of `merge_base_inputs`)."""
     # Remove today's datapoint
     all_covid = all_covid[all_covid["date"] < str(date.today())]
 
@@ -128,7 +193,7 @@ def load_data(logger, old=False):
     all_covid = add_rolling_vaccinations(all_covid)
 
     # Calculate cumulative deaths in the last 12 months
-    all_covid = add_cumulative_deaths_last12m(all_covid)
+    all_covid = add_cumulative_deaths_last12m(all_covid, date_ref=date_ref)
 
     # Sort by location and date
     all_covid = all_covid.sort_values(["location", "date"])
@@ -0,0 +1,143 @@
+"""Incremental build of the megafile.
+
+The previous megafile is kept as a partitioned artifact (one Parquet file per location), together with a manifest that
+stores a fingerprint of each input dataset per location. On a new run, only the locations whose inputs changed are
+recomputed.
+Inputs that are shared by all locations (macro variables, ISO codes, excess mortality files, etc.) and the reference
+dates are combined into a global fingerprint: if it changes, all locations are recomputed.
+"""
+import hashlib
+import json
+import os
+from urllib.parse import quote
+
+import numpy as np
+import pandas as pd
+
+from cowidev import PATHS
+
+
+# Bump this if the logic of the megafile changes, so that partitions built with the old logic are discarded
+PARTITIONS_VERSION = 1
+
+
+def fingerprint_inputs(inputs: dict) -> dict:
+    """Fingerprint each input dataset, per location.
+
+    Args:
+        inputs (dict): Input name -> dataframe, as returned by `get_base_inputs`.
+
+    Returns:
+        dict: Location -> {input name -> fingerprint}.
+    """
+    fingerprints = {}
+    for name, df in inputs.items():
+        for location, fp in _fingerprint_frame(df).items():
+            fingerprints.setdefault(location, {})[name] = fp
+    return fingerprints
+
+
+def _fingerprint_frame(df: pd.DataFrame) -> dict:
+    # Row hashes are combined with a (wrapping) sum, so the fingerprint does not depend on the order of the rows
+    df = df.dropna(subset=["location"])
+    hashes = pd.util.hash_pandas_object(df, index=False).values
+    codes, locations = pd.factorize(df.location)
+    sums = np.zeros(len(locations), dtype=np.uint64)
+    np.add.at(sums, codes, hashes)
+    counts = np.bincount(codes, minlength=len(locations))
+    return {loc: f"{s:016x}-{c}" for loc, s, c in zip(locations, sums, counts)}
+
+
+def fingerprint_files(paths: list, *extra) -> str:
+    """Fingerprint the content of a list of files, plus any extra values (e.g. reference dates)."""
+    h = hashlib.sha1(str(PARTITIONS_VERSION).encode())
+    for path in sorted(paths):
+        with open(path, "rb") as f:
+            h.update(f.read())
+    for value in extra:
+        h.update(str(value).encode())
+    return h.hexdigest()
+
+
+class MegafilePartitions:
+    """Megafile from the last run, partitioned by location.
+
+    Args:
+        path (str): Directory where partitions and manifest are stored.
+    """
+
+    def __init__(self, path: str = PATHS.INTERNAL_TMP_MEGAFILE_DIR):
+        self.path = path
+        self.path_manifest = os.path.join(path, "manifest.json")
+        self.manifest = self._load_manifest()
+
+    def _load_manifest(self):
+        if os.path.isfile(self.path_manifest):
+            with open(self.path_manifest, "r") as f:
+                return json.load(f)
+        return {"global": None, "locations": {}}
+
+    def _partition_path(self, location):
+        return os.path.join(self.path, f"{quote(location, safe='')}.parquet")
+
+    def changed_locations(self, fingerprints: dict, global_fingerprint: str) -> set:
+        """Get locations that need to be recomputed.
+
+        Args:
+            fingerprints (dict): Current per-location fingerprints, from `fingerprint_inputs`.
+            global_fingerprint (str): Current global fingerprint.
+
+        Returns:
+            set: Locations to recompute.
+        """
+        if global_fingerprint != self.manifest["global"]:
+            return set(fingerprints)
+        changed = set()
+        for location, fp in fingerprints.items():
+            previous = self.manifest["locations"].get(location)
+            if previous is None or previous["inputs"] != fp:
+                changed.add(location)
+            elif previous["rows"] > 0 and not os.path.isfile(self._partition_path(location)):
+                changed.add(location)
+        return changed
+
+    def read(self, locations) -> pd.DataFrame:
+        """Read the partitions of `locations` (locations without rows in the last megafile are skipped)."""
+        dfs = [
+            pd.read_parquet(self._partition_path(location))
+            for location in sorted(locations)
+            if self.manifest["locations"][location]["rows"] > 0
+        ]
+        if not dfs:
+            return pd.DataFrame()
+        return pd.concat(dfs, ignore_index=True)
+
+    def update(self, df: pd.DataFrame, fingerprints: dict, global_fingerprint: str):
+        """Write the partitions of the locations in `fingerprints` and update the manifest.
+
+        Args:
+            df (pd.DataFrame): Recomputed megafile rows. Must contain all rows of the locations in `fingerprints`.
+            fingerprints (dict): Fingerprints of the recomputed locations.
+            global_fingerprint (str): Current global fingerprint.
+        """
+        os.makedirs(self.path, exist_ok=True)
+        if global_fingerprint != self.manifest["global"]:
+            self.manifest = {"global": global_fingerprint, "locations": {}}
+        rows = {}
+        if not df.empty:
+            for location, df_loc in df.groupby("location"):
+                df_loc.to_parquet(self._partition_path(location), index=False)
+                rows[location] = len(df_loc)
+        for location, fp in fingerprints.items():
+            self.manifest["locations"][location] = {"inputs": fp, "rows": rows.get(location, 0)}
+        self.manifest["global"] = global_fingerprint
+        with open(self.path_manifest, "w") as f:
+            json.dump(self.manifest, f, indent=2)
+
+    def drop(self, locations):
+        """Remove locations that are no longer present in the inputs. Manifest is written on next `update`."""
+        for location in locations:
+            path = self._partition_path(location)
+            if os.path.isfile(path):
+                os.remove(path)
+            self.manifest["locations"].pop(location, None)
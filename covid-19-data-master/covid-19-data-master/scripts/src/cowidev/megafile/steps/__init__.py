@@ -1,4 +1,4 @@
-from cowidev.megafile.steps.core import get_base_dataset
+from cowidev.megafile.steps.core import get_base_dataset, get_base_inputs, merge_base_inputs
 from cowidev.megafile.steps.macro import add_macro_variables
 from cowidev.megafile.steps.xm import add_excess_mortality
 from cowidev.megafile.steps.vax import add_rolling_vaccinations
@@ -6,6 +6,8 @@ from cowidev.megafile.steps.cases_deaths import add_cumulative_deaths_last12m
 
 __all__ = [
     "get_base_dataset",
+    "get_base_inputs",
+    "merge_base_inputs",
     "add_macro_variables",
     "add_excess_mortality",
     "add_rolling_vaccinations",
@@ -1,8 +1,12 @@
 import datetime
 import os
 from functools import reduce
+import numpy as np
 import pandas as pd
 
+from cowidev.utils.io import read_csv_or_parquet
+from cowidev.utils.timeseries import window_change
+
 
 def get_casedeath(dataset_dir: str):
     """
@@ -33,7 +37,7 @@ def get_casedeath(dataset_dir: str):
 
     # Process each file and melt it to vertical format
     for varname in varnames:
-        tmp = pd.read_csv(os.path.join(dataset_dir, f"{varname}.csv"))
+        tmp = read_csv_or_parquet(os.path.join(dataset_dir, f"{varname}.csv"))
         country_cols = list(tmp.columns)
         country_cols.remove("date")
 
@@ -73,14 +77,18 @@ def get_casedeath(dataset_dir: str):
     return df
 
 
-def add_cumulative_deaths_last12m(df: pd.DataFrame) -> pd.DataFrame:
+def add_cumulative_deaths_last12m(df: pd.DataFrame, date_ref: str = None) -> pd.DataFrame:
+    # `date_ref` is the date the last 12 months are counted from. Defaults to the most recent date in `df`.
+    if date_ref is None:
+        date_ref = df.date.max()
 
-    df["daily_diff"] = df[["location", "total_deaths"]].groupby("location").fillna(0).diff()
-    date_cutoff = pd.to_datetime(df.date.max()) - datetime.timedelta(days=365.2425)
-    df.loc[pd.to_datetime(df.date) < date_cutoff, "daily_diff"] = 0
+    date_cutoff = pd.to_datetime(date_ref) - datetime.timedelta(days=365.2425)
 
-    df["total_deaths_last12m"] = df[["location", "daily_diff"]].groupby("location").cumsum()
-    df.loc[(pd.to_datetime(df.date) < date_cutoff) | (df.new_deaths.isnull()), "total_deaths_last12m"] = pd.NA
+    # Deaths since the last observation before the cutoff
+    total_deaths = df[["location", "date"]].assign(total_deaths=df.total_deaths.fillna(0))
+    values = window_change(total_deaths, ["total_deaths"], start=date_cutoff, baseline="previous")["total_deaths"]
+    values[df.new_deaths.isnull()] = np.nan
+    df["total_deaths_last12m"] = values
     df["total_deaths_last12m_per_million"] = df.total_deaths_last12m.mul(1000000).div(df.population)
 
-    return df.drop(columns="daily_diff")
+    return df
@@ -17,6 +17,16 @@ DATA_DIR = PATHS.DATA_DIR
 
 def get_base_dataset(logger, old=False):
     """Get owid datasets from: who, reproduction rate, hospitalizations, testing, vaccinations, CGRT."""
+    inputs = get_base_inputs(logger, old)
+    return merge_base_inputs(inputs)
+
+
+def get_base_inputs(logger, old=False):
+    """Load each of the input datasets of the megafile (one row per location & date).
+
+    Returns:
+        dict: Input name -> dataframe. Order of the dictionary is the order of the merge.
+    """
     if old:
         path = PATHS.DATA_JHU_DIR
     else:
@@ -60,13 +70,27 @@ def get_base_dataset(logger, old=False):
         cases_file=os.path.join(path, "full_data.csv"),
     )
 
+    return {
+        "cases_deaths": cases_deaths,
+        "reprod": reprod,
+        "hosp": hosp,
+        "testing": testing,
+        "vax": vax,
+        "cgrt": cgrt,
+        "variants": variants,
+    }
+
+
+def merge_base_inputs(inputs):
+    """Merge input datasets from `get_base_inputs` into one dataframe."""
     # Big merge
     return (
-        cases_deaths.merge(reprod, on=["date", "location"], how="outer")
-        .merge(hosp, on=["date", "location"], how="outer")
-        .merge(testing, on=["date", "location"], how="outer")
-        .merge(vax, on=["date", "location"], how="outer")
-        .merge(cgrt, on=["date", "location"], how="left")
-        .merge(variants, on=["date", "location"], how="left")
+        inputs["cases_deaths"]
+        .merge(inputs["reprod"], on=["date", "location"], how="outer")
+        .merge(inputs["hosp"], on=["date", "location"], how="outer")
+        .merge(inputs["testing"], on=["date", "location"], how="outer")
+        .merge(inputs["vax"], on=["date", "location"], how="outer")
+        .merge(inputs["cgrt"], on=["date", "location"], how="left")
+        .merge(inputs["variants"], on=["date", "location"], how="left")
         .sort_values(["location", "date"])
     )
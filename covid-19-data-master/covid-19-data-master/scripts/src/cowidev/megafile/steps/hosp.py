@@ -1,10 +1,12 @@
 "merge"
 import pandas as pd
 
+from cowidev.utils.io import read_csv_or_parquet
+
 
 def get_hosp(data_file: str):
     # TODO: Change input to be non-grapher file
-    hosp = pd.read_csv(data_file)
+    hosp = read_csv_or_parquet(data_file)
     hosp = hosp.rename(
         columns={
             "Country": "location",
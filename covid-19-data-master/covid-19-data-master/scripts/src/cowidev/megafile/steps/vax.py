@@ -1,9 +1,12 @@
 import numpy as np
 import pandas as pd
 
+from cowidev.utils.io import read_csv_or_parquet
+from cowidev.utils.timeseries import window_change
+
 
 def get_vax(data_file):
-    vax = pd.read_csv(
+    vax = read_csv_or_parquet(
         data_file,
         usecols=[
             "location",
@@ -42,19 +45,34 @@ def get_vax(data_file):
     return vax
 
 
-def _add_rolling(df: pd.DataFrame) -> pd.DataFrame:
-    last_known_date = df.loc[df.total_vaccinations.notnull(), "date"].max()
+def add_rolling_vaccinations(df: pd.DataFrame) -> pd.DataFrame:
+    df = df.sort_values(["location", "date"]).reset_index(drop=True)
+    codes = pd.factorize(df.location)[0]
+
+    # Linear interpolation of total_vaccinations within each location (NaNs after the last value are forward filled)
+    values = df.total_vaccinations.to_numpy(dtype=float, na_value=np.nan)
+    valid = ~np.isnan(values)
+    positions = np.arange(len(df))
+    bounds = pd.Series(positions[valid]).groupby(codes[valid]).agg(["min", "max"])
+    first = np.full(codes.max() + 1, len(df))
+    last = np.full(codes.max() + 1, -1)
+    first[bounds.index] = bounds["min"]
+    last[bounds.index] = bounds["max"]
+    in_range = (positions >= first[codes]) & (positions <= last[codes])
+    interpolated = np.full(len(df), np.nan)
+    interpolated[in_range] = np.interp(positions[in_range], positions[valid], values[valid])
+    df_interp = df[["location", "date"]].assign(
+        total_vaccinations=pd.Series(interpolated).groupby(codes).ffill().values
+    )
+
+    last_known_date = pd.Series(df.date.values[valid]).groupby(codes[valid]).max()
+    last_known_date = last_known_date.reindex(range(codes.max() + 1)).fillna("").values[codes]
     for n_months in (6, 9, 12):
         n_days = round(365.2425 * n_months / 12)
-        df[f"rolling_vaccinations_{n_months}m"] = (
-            df.total_vaccinations.interpolate(method="linear").diff().rolling(n_days, min_periods=1).sum().round()
-        )
-        df.loc[df.date > last_known_date, f"rolling_vaccinations_{n_months}m"] = np.NaN
-        df[f"rolling_vaccinations_{n_months}m_per_hundred"] = (
-            df[f"rolling_vaccinations_{n_months}m"] * 100 / df.population
-        ).round(2)
+        rolling = window_change(df_interp, ["total_vaccinations"], periods=n_days)["total_vaccinations"].round()
+        # No change can be computed on the first day with data
+        rolling[positions == first[codes]] = np.NaN
+        rolling[df.date > last_known_date] = np.NaN
+        df[f"rolling_vaccinations_{n_months}m"] = rolling
+        df[f"rolling_vaccinations_{n_months}m_per_hundred"] = (rolling * 100 / df.population).round(2)
     return df
-
-
-def add_rolling_vaccinations(df: pd.DataFrame) -> pd.DataFrame:
-    return df.groupby("location").apply(_add_rolling).reset_index(drop=True)
@@ -1,10 +1,11 @@
-import pandas as pd
-import numpy as np
 import datetime
 
+import pandas as pd
+
+from cowidev.utils.timeseries import window_change
 
-def add_excess_mortality(df: pd.DataFrame, wmd_hmd_file: str, economist_file: str) -> pd.DataFrame:
 
+def add_excess_mortality(df: pd.DataFrame, wmd_hmd_file: str, economist_file: str) -> pd.DataFrame:
     # XM data from HMD & WMD
     column_mapping = {
         "p_proj_all_ages": "excess_mortality",  # excess_mortality_perc_weekly
@@ -40,49 +41,34 @@ def add_excess_mortality(df: pd.DataFrame, wmd_hmd_file: str, economist_file: st
     df = df.merge(econ, how="left", on=["location", "date"])
 
     # Add last 12m
-    df = _add_last12m_to_metric(df, "excess_mortality_cumulative_absolute", "location", 1000000, "per_million")
-    df = _add_last12m_to_metric(df, "cumulative_estimated_daily_excess_deaths", "location", 100000, "per_100k")
-    df = _add_last12m_to_metric(
-        df, "cumulative_estimated_daily_excess_deaths_ci_95_top", "location", 100000, "per_100k"
-    )
-    df = _add_last12m_to_metric(
-        df, "cumulative_estimated_daily_excess_deaths_ci_95_bot", "location", 100000, "per_100k"
-    )
-    # print(df.columns)
-    return df
-
-
-def _add_last12m_to_metric(
-    df: pd.DataFrame, column_metric: str, column_location: str, scaling: int, scaling_slug: str
-) -> pd.DataFrame:
-    column_metric_12m = f"{column_metric}_last12m"
-
-    # Get only last 12 month of data
     date_cutoff = datetime.datetime.now() - datetime.timedelta(days=365.2425)
-    # df = df[pd.to_datetime(df.date) > date_cutoff]
-
-    # Get metric value 12 months ago
-    df_tmp = (
-        df[pd.to_datetime(df.date) > date_cutoff]
-        .dropna(subset=[column_metric])
-        .sort_values([column_location, "date"])
-        .drop_duplicates(column_location)[[column_location, column_metric]]
-        .rename(columns={column_metric: column_metric_12m})
+    df = _add_last12m_to_metrics(
+        df,
+        {
+            "excess_mortality_cumulative_absolute": (1000000, "per_million"),
+            "cumulative_estimated_daily_excess_deaths": (100000, "per_100k"),
+            "cumulative_estimated_daily_excess_deaths_ci_95_top": (100000, "per_100k"),
+            "cumulative_estimated_daily_excess_deaths_ci_95_bot": (100000, "per_100k"),
+        },
+        date_cutoff,
     )
+    return df
 
-    # Compute the difference, obtain last12m metric
-    df = df.merge(df_tmp, on=[column_location], how="left")
-    values = df[column_metric] - df[column_metric_12m]
 
-    # Assign NaN to >1 year old data
-    values[pd.to_datetime(df.date) < date_cutoff] = np.nan
+def _add_last12m_to_metrics(df: pd.DataFrame, metrics: dict, date_cutoff) -> pd.DataFrame:
+    """Add the change of each metric since `date_cutoff` (and its scaled version).
 
-    # Assign to df
-    df = df.assign(
-        **{
-            column_metric_12m: values,
-            f"{column_metric_12m}_{scaling_slug}": values.mul(scaling).div(df.population),
-        }
-    )
+    The baseline is the first value of each location after `date_cutoff`. Older data is assigned NaN.
 
-    return df
+    Args:
+        df (pd.DataFrame): Data.
+        metrics (dict): Metric -> (scaling, scaling slug), e.g. {"metric": (1000000, "per_million")}.
+        date_cutoff: Start of the 12-month window.
+    """
+    changes = window_change(df, list(metrics), start=date_cutoff)
+    columns = {}
+    for column_metric, (scaling, scaling_slug) in metrics.items():
+        column_metric_12m = f"{column_metric}_last12m"
+        columns[column_metric_12m] = changes[column_metric]
+        columns[f"{column_metric_12m}_{scaling_slug}"] = changes[column_metric].mul(scaling).div(df.population)
+    return df.assign(**columns)
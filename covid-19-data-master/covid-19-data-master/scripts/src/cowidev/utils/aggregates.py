@@ -0,0 +1,110 @@
+"""Aggregate regions (World, continents, income groups, etc.) from location-level data.
+
+Data is laid out once as dense date x location matrices (one per metric). Region membership is an indicator matrix
+(location x region), so that all regions are computed with one matrix product per metric.
+"""
+import numpy as np
+import pandas as pd
+
+
+def region_members(locations: list, include: list = None, exclude: list = None) -> list:
+    """Members of a region defined by the locations it includes and/or excludes.
+
+    Args:
+        locations (list): All available locations.
+        include (list, optional): Locations in the region. Defaults to None (all locations).
+        exclude (list, optional): Locations not in the region. Defaults to None.
+
+    Returns:
+        list: Members of the region, in the order of `locations`.
+    """
+    members = list(locations)
+    if include:
+        include = set(include)
+        members = [loc for loc in members if loc in include]
+    if exclude:
+        exclude = set(exclude)
+        members = [loc for loc in members if loc not in exclude]
+    return members
+
+
+def membership_matrix(locations: list, regions: dict) -> np.ndarray:
+    """Build the indicator matrix of region membership.
+
+    Regions can be built from other regions: a member that is the name of a region defined before it in `regions`
+    stands for all the locations of that region (e.g. World from the continents).
+
+    Args:
+        locations (list): Locations (rows of the matrix).
+        regions (dict): Region name -> list of member locations or regions (columns of the matrix, in the order of the
+            dict). Members not in `locations` nor in the previous regions are ignored.
+
+    Returns:
+        np.ndarray: Matrix of shape (len(locations), len(regions)), with 1 if the location belongs to the region, 0
+            otherwise.
+    """
+    locations = pd.Index(locations)
+    membership = np.zeros((len(locations), len(regions)))
+    region_idx = {}
+    for j, (region, members) in enumerate(regions.items()):
+        members = list(members)
+        idx = locations.get_indexer(members)
+        membership[idx[idx >= 0], j] = 1
+        for member in members:
+            if member in region_idx:
+                np.maximum(membership[:, j], membership[:, region_idx[member]], out=membership[:, j])
+        region_idx[region] = j
+    return membership
+
+
+def aggregate_regions(
+    df: pd.DataFrame,
+    regions: dict,
+    columns_ffill: list = None,
+    columns_0fill: list = None,
+    column_location: str = "location",
+    column_date: str = "date",
+) -> pd.DataFrame:
+    """Sum metrics over the locations of each region.
+
+    For each region, a row is generated for each date where at least one of its members has data. Before summing, the
+    time series of each location are filled:
+
+    - `columns_ffill` (cumulative metrics): forward filled. Missing values before the first value count as 0.
+    - `columns_0fill` (daily metrics): missing values count as 0.
+
+    Args:
+        df (pd.DataFrame): Location-level data (one row per location and date). Must not contain the regions.
+        regions (dict): Region name -> list of member locations or previously defined regions (see
+            `membership_matrix`).
+        columns_ffill (list, optional): Cumulative metrics to aggregate. Defaults to None.
+        columns_0fill (list, optional): Daily metrics to aggregate. Defaults to None.
+        column_location (str, optional): Location column. Defaults to "location".
+        column_date (str, optional): Date column. Defaults to "date".
+
+    Returns:
+        pd.DataFrame: Aggregates, in long format, sorted by region and date.
+    """
+    columns_ffill = [] if columns_ffill is None else columns_ffill
+    columns_0fill = [] if columns_0fill is None else columns_0fill
+    idx_loc, locations = pd.factorize(df[column_location], sort=True)
+    idx_date, dates = pd.factorize(df[column_date], sort=True)
+    membership = membership_matrix(locations, regions)
+
+    # Dates with data, for each region
+    presence = np.zeros((len(dates), len(locations)))
+    presence[idx_date, idx_loc] = 1
+    idx_region_out, idx_date_out = np.nonzero((presence @ membership).T > 0)
+
+    aggregates = {
+        column_location: np.array(list(regions.keys()), dtype=object)[idx_region_out],
+        column_date: dates[idx_date_out],
+    }
+    for col in columns_ffill + columns_0fill:
+        values = np.full((len(dates), len(locations)), np.nan)
+        values[idx_date, idx_loc] = df[col].to_numpy(dtype=float, na_value=np.nan)
+        if col in columns_ffill:
+            values = pd.DataFrame(values).ffill().values
+        values = np.nan_to_num(values, nan=0)
+        aggregates[col] = (values @ membership)[idx_date_out, idx_region_out]
+    return pd.DataFrame(aggregates)
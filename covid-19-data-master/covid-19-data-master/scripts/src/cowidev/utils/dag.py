@@ -0,0 +1,218 @@
+"""Run pipeline steps as a DAG.
+
+Each step declares the steps it depends on and the local files (or directories) it reads and writes. Steps run as soon
+as all their dependencies have finished, so that independent steps (e.g. different domains) run concurrently. A step
+is skipped if all its outputs are newer than all its inputs.
+"""
+import os
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from dataclasses import dataclass, field
+from typing import Callable, List, Union
+
+from cowidev.utils.log import get_logger
+
+
+logger = get_logger()
+
+STATUS_RUN = "run"
+STATUS_SKIP = "skip"
+STATUS_FAIL = "fail"
+STATUS_BLOCK = "blocked"
+
+
+@dataclass
+class Step:
+    """Pipeline step.
+
+    Args:
+        name (str): Step name (unique in the DAG).
+        run (list or callable): Command to run in a separate process (list of arguments), or function to run.
+        depends_on (list): Names of the steps that must finish before this one.
+        inputs (list): Files or directories read by the step. Steps without inputs (e.g. downloads) always run.
+        outputs (list): Files or directories written by the step.
+    """
+
+    name: str
+    run: Union[List[str], Callable]
+    depends_on: list = field(default_factory=list)
+    inputs: list = field(default_factory=list)
+    outputs: list = field(default_factory=list)
+
+    def is_fresh(self) -> bool:
+        """True if all outputs exist and are newer than all inputs."""
+        if not self.inputs or not self.outputs:
+            return False
+        outputs = [_last_modified(path) for path in self.outputs]
+        if None in outputs:
+            return False
+        inputs = [_last_modified(path) for path in self.inputs]
+        inputs = [mtime for mtime in inputs if mtime is not None]
+        return not inputs or min(outputs) >= max(inputs)
+
+    def execute(self):
+        if callable(self.run):
+            self.run()
+        else:
+            subprocess.run(self.run, check=True)
+
+
+@dataclass
+class StepResult:
+    name: str
+    status: str
+    start: float = 0
+    end: float = 0
+
+    @property
+    def duration(self):
+        return self.end - self.start
+
+
+class DAG:
+    """Set of steps and their dependencies.
+
+    Args:
+        steps (list): Steps of the DAG.
+    """
+
+    def __init__(self, steps: list):
+        self.steps = {step.name: step for step in steps}
+        if len(self.steps) != len(steps):
+            raise ValueError("Step names must be unique!")
+        for step in steps:
+            missing = set(step.depends_on).difference(self.steps)
+            if missing:
+                raise ValueError(f"Step {step.name} depends on unknown steps {missing}")
+        self._check_acyclic()
+
+    def _check_acyclic(self):
+        visited, stack = set(), set()
+
+        def _visit(name):
+            if name in stack:
+                raise ValueError(f"Cycle found in DAG, involving step {name}")
+            if name not in visited:
+                stack.add(name)
+                for dep in self.steps[name].depends_on:
+                    _visit(dep)
+                stack.remove(name)
+                visited.add(name)
+
+        for name in self.steps:
+            _visit(name)
+
+    def subset(self, targets: list) -> "DAG":
+        """Get the DAG with only the steps needed to build `targets` (i.e. the targets and their ancestors)."""
+        names = set()
+        pending = list(targets)
+        while pending:
+            name = pending.pop()
+            if name not in self.steps:
+                raise ValueError(f"Unknown step {name}. Valid steps are: {list(self.steps)}")
+            if name not in names:
+                names.add(name)
+                pending.extend(self.steps[name].depends_on)
+        return DAG([step for name, step in self.steps.items() if name in names])
+
+    def run(self, max_workers: int = 4, force: bool = False, dry_run: bool = False) -> dict:
+        """Run all steps, in dependency order.
+
+        Steps whose dependencies failed are not run.
+
+        Args:
+            max_workers (int, optional): Maximum number of steps running at the same time. Defaults to 4.
+            force (bool, optional): Run steps even if their outputs are up to date. Defaults to False.
+            dry_run (bool, optional): Only log the steps that would be run. Defaults to False.
+
+        Returns:
+            dict: Step name -> StepResult.
+        """
+        results = {}
+        running = {}
+        t0 = time.time()
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            while len(results) < len(self.steps):
+                for name, step in self.steps.items():
+                    if name in results or name in running:
+                        continue
+                    deps = [results.get(dep) for dep in step.depends_on]
+                    if None in deps:
+                        continue
+                    now = time.time() - t0
+                    if any(dep.status in (STATUS_FAIL, STATUS_BLOCK) for dep in deps):
+                        logger.error(f"DAG: {name} not run, dependencies failed")
+                        results[name] = StepResult(name, STATUS_BLOCK, now, now)
+                    elif not force and step.is_fresh():
+                        logger.info(f"DAG: {name} is up to date, skipping")
+                        results[name] = StepResult(name, STATUS_SKIP, now, now)
+                    elif dry_run:
+                        logger.info(f"DAG: {name} would run")
+                        results[name] = StepResult(name, STATUS_SKIP, now, now)
+                    else:
+                        logger.info(f"DAG: {name} started")
+                        running[name] = (executor.submit(step.execute), now)
+                if not running:
+                    continue
+                done, _ = wait([future for future, _ in running.values()], return_when=FIRST_COMPLETED)
+                for name in [name for name, (future, _) in running.items() if future in done]:
+                    future, start = running.pop(name)
+                    end = time.time() - t0
+                    if future.exception() is not None:
+                        logger.error(f"DAG: {name} failed after {end - start:.1f}s: {future.exception()}")
+                        results[name] = StepResult(name, STATUS_FAIL, start, end)
+                    else:
+                        logger.info(f"DAG: {name} finished in {end - start:.1f}s")
+                        results[name] = StepResult(name, STATUS_RUN, start, end)
+        return results
+
+    def critical_path(self, results: dict) -> list:
+        """Chain of dependent steps with the largest total duration.
+
+        Args:
+            results (dict): Output of `run`.
+
+        Returns:
+            list: Names of the steps in the critical path, in execution order.
+        """
+        length, previous = {}, {}
+
+        def _length(name):
+            if name not in length:
+                deps = self.steps[name].depends_on
+                previous[name] = max(deps, key=_length) if deps else None
+                length[name] = results[name].duration + (_length(previous[name]) if deps else 0)
+            return length[name]
+
+        name = max(self.steps, key=_length)
+        path = []
+        while name is not None:
+            path.append(name)
+            name = previous[name]
+        return path[::-1]
+
+    def report(self, results: dict) -> str:
+        """Timing report of a run, with the critical path."""
+        width = max(len(name) for name in self.steps)
+        lines = [f"{'step':<{width}}  {'status':<7}  {'start':>7}  {'duration':>8}"]
+        for result in sorted(results.values(), key=lambda r: (r.start, r.name)):
+            lines.append(
+                f"{result.name:<{width}}  {result.status:<7}  {result.start:>6.1f}s  {result.duration:>7.1f}s"
+            )
+        path = self.critical_path(results)
+        total = sum(results[name].duration for name in path)
+        lines.append(f"Critical path ({total:.1f}s): {' -> '.join(path)}")
+        return "\n".join(lines)
+
+
+def _last_modified(path):
+    """Modification time of a file, or of the most recently modified file in a directory. None if there is none."""
+    if os.path.isfile(path):
+        return os.path.getmtime(path)
+    mtimes = [
+        os.path.getmtime(os.path.join(root, filename))
+        for root, _, filenames in os.walk(path)
+        for filename in filenames
+    ]
+    return max(mtimes) if mtimes else None
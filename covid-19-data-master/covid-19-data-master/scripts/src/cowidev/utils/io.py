@@ -1,6 +1,11 @@
+import json
+import os
 import zipfile
 import tempfile
 
+import pandas as pd
+from joblib import Parallel, delayed
+
 from cowidev.utils.web.download import download_file_from_url
 
 
@@ -12,3 +17,193 @@ def extract_zip(input_path, output_folder, **kwargs):
     else:
         z = zipfile.ZipFile(input_path)
     z.extractall(output_folder)
+
+
+def parquet_path(path: str) -> str:
+    """Path of the Parquet version of file `path` (same path, extension .parquet)."""
+    return os.path.splitext(path)[0] + ".parquet"
+
+
+def export_parquet(df: pd.DataFrame, path: str, index: bool = False):
+    """Export the typed Parquet version of CSV file `path` (see `parquet_path`), to be read by `read_csv_or_parquet`.
+
+    String columns are stored as categories.
+
+    Args:
+        df (pd.DataFrame): Data, as exported to `path`.
+        path (str): Path to CSV file.
+        index (bool, optional): Export the index as column(s), as `df.to_csv` does by default. Defaults to False.
+    """
+    if index:
+        df = df.reset_index()
+    df = df.rename_axis(columns=None)
+    columns_str = [col for col in df.select_dtypes("object").columns if pd.api.types.infer_dtype(df[col]) == "string"]
+    df.astype({col: "category" for col in columns_str}).to_parquet(parquet_path(path), index=False)
+
+
+def read_csv_or_parquet(path: str, usecols: list = None, **kwargs) -> pd.DataFrame:
+    """Read CSV file `path`, or its Parquet version if it exists and is not older than the CSV.
+
+    Categorical columns from the Parquet file are returned as strings and datetime `date` columns as "YYYY-MM-DD"
+    strings, so that the output matches that of `pd.read_csv`.
+
+    Args:
+        path (str): Path to CSV file.
+        usecols (list, optional): Columns to load. Defaults to None (all columns).
+        kwargs: Passed to `pd.read_csv` if the CSV file is read.
+    """
+    path_pq = parquet_path(path)
+    if os.path.isfile(path_pq) and (not os.path.isfile(path) or os.path.getmtime(path_pq) >= os.path.getmtime(path)):
+        df = pd.read_parquet(path_pq, columns=usecols)
+        for col in df.select_dtypes("category").columns:
+            df[col] = df[col].astype(str).where(df[col].notna())
+        if "date" in df.columns and pd.api.types.is_datetime64_any_dtype(df["date"]):
+            df["date"] = df["date"].dt.strftime("%Y-%m-%d")
+        return df
+    return pd.read_csv(path, usecols=usecols, **kwargs)
+
+
+def read_csv_files(
+    paths: list, cache_path: str = None, n_jobs: int = -2, column_file: str = "_file", **kwargs
+) -> pd.DataFrame:
+    """Read and concatenate multiple CSV files, in parallel.
+
+    If `cache_path` is given, the concatenated data is cached as a Parquet file, along with a manifest (same path,
+    extension .json) with the modification time and size of each source file. On the next call, only files that were
+    added or modified since are read again; rows from deleted files are dropped.
+
+    Args:
+        paths (list): Paths to CSV files.
+        cache_path (str, optional): Path to the Parquet cache file. Defaults to None (no cache).
+        n_jobs (int, optional): Number of files read concurrently. Defaults to -2.
+        column_file (str, optional): Column used in the cache to store the source file of each row. Defaults to
+            "_file".
+        kwargs: Passed to `pd.read_csv`. Explicit `dtype` and `parse_dates` are recommended, so that all files (and the
+            cache) share the same types. Changing them invalidates the cache.
+
+    Returns:
+        pd.DataFrame: Data from all files, in the order of `paths`.
+    """
+    paths = list(paths)
+    stats = {os.path.basename(path): _file_stat(path) for path in paths}
+    options = repr(sorted(kwargs.items()))
+
+    df_cached = None
+    if cache_path is not None:
+        df_cached = _read_cache(cache_path, stats, options, column_file)
+    files_cached = set() if df_cached is None else set(df_cached[column_file].unique())
+    paths_new = [path for path in paths if os.path.basename(path) not in files_cached]
+
+    dfs = Parallel(n_jobs=n_jobs, backend="threading")(
+        delayed(_read_csv_file)(path, column_file, **kwargs) for path in paths_new
+    )
+    if df_cached is not None:
+        dfs = [df_cached] + dfs
+    if not dfs:
+        raise ValueError("No files to read!")
+    df = pd.concat(dfs, ignore_index=True)
+
+    if cache_path is not None and paths_new:
+        _write_cache(df, cache_path, stats, options, column_file)
+
+    # Sort by file, in the order of `paths`
+    order = pd.Categorical(df[column_file], categories=list(stats))
+    df = df.iloc[order.argsort(kind="stable")]
+    return df.drop(columns=[column_file]).reset_index(drop=True)
+
+
+def _file_stat(path):
+    stat = os.stat(path)
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def _read_csv_file(path, column_file, **kwargs):
+    df = pd.read_csv(path, **kwargs)
+    return df.assign(**{column_file: os.path.basename(path)})
+
+
+def _read_cache(cache_path, stats, options, column_file):
+    """Load cached rows of files that have not changed since they were cached."""
+    path_manifest = os.path.splitext(cache_path)[0] + ".json"
+    if not (os.path.isfile(cache_path) and os.path.isfile(path_manifest)):
+        return None
+    with open(path_manifest, "r") as f:
+        manifest = json.load(f)
+    if manifest.get("options") != options:
+        return None
+    files_valid = [file for file, stat in manifest["files"].items() if stats.get(file) == stat]
+    if not files_valid:
+        return None
+    df = pd.read_parquet(cache_path)
+    df[column_file] = df[column_file].astype(str)
+    return df[df[column_file].isin(files_valid)]
+
+
+def _write_cache(df, cache_path, stats, options, column_file):
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    df.astype({column_file: "category"}).to_parquet(cache_path, index=False)
+    with open(os.path.splitext(cache_path)[0] + ".json", "w") as f:
+        json.dump({"options": options, "files": stats}, f, indent=2)
+
+
+def days_since(dates: pd.Series, zero_day) -> pd.Series:
+    """Number of days between `zero_day` and each date (Grapher "Year" column for daily data)."""
+    return (pd.to_datetime(dates) - pd.Timestamp(zero_day)).dt.days
+
+
+def export_wide(
+    df: pd.DataFrame,
+    metrics: list,
+    output_path: str,
+    first_columns: list = None,
+    bundle: str = None,
+    bundle_name: str = "wide",
+    parquet: bool = False,
+    n_jobs: int = -2,
+    column_location: str = "location",
+    column_date: str = "date",
+):
+    """Export metrics in wide format (date x location), one CSV file per metric (`output_path/<metric>.csv`).
+
+    All metrics are pivoted with a single reshape, and the CSV files are written concurrently.
+
+    Args:
+        df (pd.DataFrame): Data in long format (one row per location and date).
+        metrics (list): Metrics to export.
+        output_path (str): Output directory.
+        first_columns (list, optional): Locations moved to the first columns (e.g. World). Defaults to None.
+        bundle (str, optional): Also export all metrics in one compressed file: "parquet" (long format,
+            `<bundle_name>.parquet`) or "zip" (all CSV files, `<bundle_name>.zip`). Defaults to None.
+        bundle_name (str, optional): Name of the bundle file, without extension. Defaults to "wide".
+        parquet (bool, optional): Also export each metric as a typed Parquet file (`output_path/<metric>.parquet`),
+            read by `read_csv_or_parquet`. Defaults to False.
+        n_jobs (int, optional): Number of files written concurrently. Defaults to -2.
+        column_location (str, optional): Location column. Defaults to "location".
+        column_date (str, optional): Date column. Defaults to "date".
+    """
+    if bundle not in [None, "parquet", "zip"]:
+        raise ValueError(f"Invalid bundle format {bundle}. Should be one of None, 'parquet' or 'zip'.")
+    df_wide = df.set_index([column_date, column_location])[metrics].unstack(column_location)
+    columns = df_wide[metrics[0]].columns.tolist()
+    for location in reversed(first_columns or []):
+        if location in columns:
+            columns.insert(0, columns.pop(columns.index(location)))
+
+    def _to_csv(metric, path_or_buf=None):
+        return df_wide[metric][columns].to_csv(path_or_buf)
+
+    def _export(metric):
+        path = os.path.join(output_path, f"{metric}.csv")
+        _to_csv(metric, path)
+        if parquet:
+            export_parquet(df_wide[metric][columns], path, index=True)
+
+    Parallel(n_jobs=n_jobs, backend="threading")(delayed(_export)(metric) for metric in metrics)
+    if bundle == "parquet":
+        df[[column_date, column_location, *metrics]].astype({column_location: "category"}).to_parquet(
+            os.path.join(output_path, f"{bundle_name}.parquet"), index=False
+        )
+    elif bundle == "zip":
+        with zipfile.ZipFile(os.path.join(output_path, f"{bundle_name}.zip"), "w", zipfile.ZIP_DEFLATED) as z:
+            for metric in metrics:
+                z.writestr(f"{metric}.csv", _to_csv(metric))
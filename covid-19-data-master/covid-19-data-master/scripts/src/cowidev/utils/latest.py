@@ -0,0 +1,53 @@
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+
+def get_latest(
+    df: pd.DataFrame,
+    lookback: timedelta = None,
+    date_ref=None,
+    column_location: str = "location",
+    column_date: str = "date",
+    return_dates: bool = False,
+):
+    """Get the latest valid value of each column, for each location.
+
+    Equivalent to forward-filling each location's time series and keeping its last row, but done in one grouped pass.
+
+    Args:
+        df (pd.DataFrame): Data, in long format (one row per location and date). Dates should be "YYYY-MM-DD" strings
+            or datetimes.
+        lookback (timedelta, optional): Only consider observations within `lookback` of `date_ref`. Defaults to None
+            (all observations).
+        date_ref (optional): Reference date for `lookback`. Defaults to today.
+        column_location (str, optional): Location column. Defaults to "location".
+        column_date (str, optional): Date column. Defaults to "date".
+        return_dates (bool, optional): Set to True to also return the date each latest value comes from.
+
+    Returns:
+        pd.DataFrame: One row per location, with the same columns as `df`. `column_date` is the date of the most
+            recent observation of the location. If `return_dates` is True, a second dataframe is returned, with the
+            same shape, with the date of each value.
+    """
+    if lookback is not None:
+        date_ref = pd.Timestamp.today().normalize() if date_ref is None else pd.to_datetime(date_ref)
+        df = df[pd.to_datetime(df[column_date]) >= date_ref - lookback]
+    df = df.sort_values(column_date)
+    columns = list(df.columns)
+    grouped = df.groupby(column_location, as_index=False, sort=True)
+
+    latest = grouped.last()[columns]
+    if not return_dates:
+        return latest
+
+    columns_values = [col for col in columns if col not in (column_location, column_date)]
+    dates = pd.DataFrame(
+        np.where(df[columns_values].notna(), df[[column_date]].values, None),
+        columns=columns_values,
+        index=df.index,
+    )
+    dates = dates.assign(**{column_location: df[column_location], column_date: df[column_date]})
+    dates = dates.groupby(column_location, as_index=False, sort=True).last()[columns]
+    return latest, dates
@@ -86,6 +86,10 @@ INTERNAL_DIR = os.path.join(PROJECT_DIR, "scripts")
 
 ## Output
 INTERNAL_TMP_DIR = os.path.join(INTERNAL_DIR, "tmp")
+INTERNAL_TMP_MEGAFILE_DIR = os.path.join(INTERNAL_TMP_DIR, "megafile")
+INTERNAL_TMP_VAX_CACHE_DIR = os.path.join(INTERNAL_TMP_DIR, "vaccinations")
+INTERNAL_TMP_JHU_CACHE_DIR = os.path.join(INTERNAL_TMP_DIR, "jhu")
+INTERNAL_TMP_HOSP_CACHE_DIR = os.path.join(INTERNAL_TMP_DIR, "hospitalizations")
 ## Output
 INTERNAL_OUTPUT_DIR = os.path.join(INTERNAL_DIR, "output")
 ### Output vax
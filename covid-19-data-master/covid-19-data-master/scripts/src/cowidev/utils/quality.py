@@ -0,0 +1,77 @@
+"""Data-quality masks for daily metrics of multiple locations, in long format (one row per location and date).
+
+Used by the cases/deaths pipelines (WHO and JHU) to hide daily values that are known to be wrong or likely to be
+temporary reporting errors. Masks are computed for all locations at once.
+"""
+import numpy as np
+import pandas as pd
+
+
+def mask_corrections(
+    df: pd.DataFrame,
+    corrections: list,
+    column_template: str = "new_{}",
+    column_location: str = "location",
+    column_date: str = "date",
+) -> pd.DataFrame:
+    """Set to NaN the values listed in `corrections`.
+
+    Args:
+        df (pd.DataFrame): Input data.
+        corrections (list): Tuples (location, date, metric), with dates as "YYYY-MM-DD" strings.
+        column_template (str, optional): Column of a metric, as a template. Defaults to "new_{}".
+        column_location (str, optional): Location column. Defaults to "location".
+        column_date (str, optional): Date column (datetime, date or string). Defaults to "date".
+
+    Returns:
+        pd.DataFrame: Data with corrected values.
+    """
+    if not corrections:
+        return df
+    corrections = pd.DataFrame(corrections, columns=[column_location, column_date, "metric"])
+    corrections[column_date] = pd.to_datetime(corrections[column_date])
+    keys = pd.MultiIndex.from_arrays([df[column_location], pd.to_datetime(df[column_date])])
+    for metric, df_metric in corrections.groupby("metric"):
+        msk = keys.isin(pd.MultiIndex.from_frame(df_metric[[column_location, column_date]]))
+        df.loc[msk, column_template.format(metric)] = np.nan
+    return df
+
+
+def mask_recent_zeros(
+    df: pd.DataFrame,
+    thresholds: dict,
+    max_days: int = 7,
+    column_location: str = "location",
+    column_date: str = "date",
+) -> pd.DataFrame:
+    """Set to NaN the latest values of a metric if they follow a large value, in case they are a temporary reporting
+    error.
+
+    For each location and metric, values after the last positive value are hidden if the last positive value is at
+    least the metric threshold and was reported less than `max_days` days before the last date of the location.
+
+    Args:
+        df (pd.DataFrame): Input data.
+        thresholds (dict): Metric column -> minimum last positive value.
+        max_days (int, optional): Maximum number of days since the last positive value. Defaults to 7.
+        column_location (str, optional): Location column. Defaults to "location".
+        column_date (str, optional): Date column (datetime, date or string). Defaults to "date".
+
+    Returns:
+        pd.DataFrame: Data with hidden values, sorted by location and date.
+    """
+    df = df.sort_values([column_location, column_date])
+    dates = pd.to_datetime(df[column_date])
+    groups = df[column_location]
+    last_reported_date = dates.groupby(groups).transform("max")
+    for col, threshold in thresholds.items():
+        positive = df[col] > 0
+        last_positive_date = dates.where(positive).groupby(groups).transform("max")
+        last_positive_value = df[col].where(positive).groupby(groups).transform("last")
+        msk = (
+            (dates > last_positive_date)
+            & (last_positive_value >= threshold)
+            & ((last_reported_date - last_positive_date).dt.days < max_days)
+        )
+        df.loc[msk, col] = np.nan
+    return df
@@ -5,12 +5,15 @@ https://github.com/owid/walden/blob/master/owid/walden/owid_cache.py
 import os
 import re
 import json
+import hashlib
 import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from os import path
 from typing import Optional, Union
 
 import pandas as pd
 import boto3
+from boto3.s3.transfer import TransferConfig
 from botocore.exceptions import ClientError
 
 from cowidev.utils.log import get_logger
@@ -53,6 +56,8 @@ class S3:
         local_path: Union[str, list],
         s3_path: Union[str, list],
         public: bool = False,
+        metadata: dict = None,
+        config: TransferConfig = None,
     ) -> Optional[str]:
         """Upload file to Walden.
 
@@ -62,6 +67,9 @@ class S3:
             s3_path (Union[str, list]): File location to load object from. It can be a list of paths, should match
                                         `local_path`'s length.
             public (bool): Set to True to expose the file to the public (read only). Defaults to False.
+            metadata (dict): User metadata to attach to the object. Defaults to None.
+            config (TransferConfig): Transfer configuration (e.g. multipart threshold). Defaults to None (boto3's
+                                     default).
         """
         # print("Uploading to S3…")
         # Checks
@@ -70,8 +78,10 @@ class S3:
         bucket_name, s3_file = _url_to_path_and_bucket_mult(s3_path)
         # Upload
         extra_args = {"ACL": "public-read"} if public else {}
+        if metadata:
+            extra_args["Metadata"] = metadata
         try:
-            self.client.upload_file(local_path, bucket_name, s3_file, ExtraArgs=extra_args)
+            self.client.upload_file(local_path, bucket_name, s3_file, ExtraArgs=extra_args, Config=config)
         except ClientError as e:
             logger.error(e)
             raise UploadError(e)
@@ -113,23 +123,7 @@ class S3:
         """
         with tempfile.TemporaryDirectory() as f:
             output_path = os.path.join(f, f"file")
-            if isinstance(obj, dict):
-                with open(output_path, "w") as f:
-                    json.dump(obj, f)
-            elif isinstance(obj, str):
-                with open(output_path, "w") as file:
-                    file.write(obj)
-            elif isinstance(obj, pd.DataFrame):
-                if s3_path.endswith(".csv") or s3_path.endswith(".zip"):
-                    obj.to_csv(output_path, index=False, **kwargs)
-                elif s3_path.endswith(".xls") or s3_path.endswith(".xlsx"):
-                    obj.to_excel(output_path, index=False, engine="xlsxwriter", **kwargs)
-                else:
-                    raise ValueError(f"pd.DataFrame must be exported to either CSV or XLS/XLSX!")
-            else:
-                raise ValueError(
-                    f"Type of `obj` is not supported ({type(obj).__name__}). Supported are json, str and pd.DataFrame"
-                )
+            _obj_to_file(obj, output_path, s3_path, **kwargs)
             self.upload_to_s3(local_path=output_path, s3_path=s3_path, public=public)
 
     def obj_from_s3(self, s3_path, **kwargs):
@@ -169,6 +163,126 @@ class S3:
         return response
 
 
+class S3Uploader:
+    """Upload files to S3 concurrently, skipping those that did not change.
+
+    Uploads run on a bounded thread pool. Large files are uploaded in parts (multipart upload). Before uploading, the
+    MD5 of the local file is compared with that of the object in S3 (stored in the object's metadata, or its ETag for
+    objects uploaded in one part). If they match, the upload is skipped. XLS/XLSX files embed their creation time, so
+    for DataFrames exported to XLS/XLSX the MD5 of the data (as CSV) is used instead.
+
+    Use it as a context manager, which waits for all uploads to finish on exit:
+
+        with S3Uploader() as uploader:
+            uploader.upload("data.csv", "s3://covid-19/public/data.csv", public=True)
+            uploader.upload_obj(df, "s3://covid-19/public/data.xlsx", public=True)
+
+    Args:
+        s3 (S3, optional): S3 connection. Defaults to None (new connection).
+        max_workers (int, optional): Maximum number of concurrent uploads. Defaults to 4.
+        multipart_threshold (int, optional): Size (bytes) from which files are uploaded in parts. Defaults to 64MB.
+        skip_unchanged (bool, optional): Set to False to always upload. Defaults to True.
+    """
+
+    def __init__(self, s3=None, max_workers=4, multipart_threshold=64 * 1024**2, skip_unchanged=True):
+        self.s3 = S3() if s3 is None else s3
+        self.skip_unchanged = skip_unchanged
+        self.config = TransferConfig(
+            multipart_threshold=multipart_threshold,
+            multipart_chunksize=multipart_threshold // 4,
+        )
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._futures = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            if exc_type is None:
+                self.wait()
+        finally:
+            self._executor.shutdown(wait=True)
+
+    def upload(self, local_path: str, s3_path: str, public: bool = False):
+        """Schedule the upload of file `local_path` to `s3_path`. The file must exist until the upload finishes."""
+        self._futures.append(self._executor.submit(self._upload, local_path, s3_path, public))
+
+    def upload_obj(self, obj, s3_path: str, public: bool = False, **kwargs):
+        """Schedule the upload of an object to `s3_path`. See `S3.obj_to_s3` for supported objects."""
+        self._futures.append(self._executor.submit(self._upload_obj, obj, s3_path, public, **kwargs))
+
+    def wait(self) -> dict:
+        """Wait for scheduled uploads to finish.
+
+        Returns:
+            dict: S3 path -> True if file was uploaded, False if upload was skipped (unchanged file).
+        """
+        futures, self._futures = self._futures, []
+        results = dict(future.result() for future in futures)
+        num_skipped = sum(not uploaded for uploaded in results.values())
+        logger.info(f"S3: {len(results) - num_skipped} files uploaded, {num_skipped} unchanged files skipped.")
+        return results
+
+    def _upload_obj(self, obj, s3_path, public, **kwargs):
+        md5 = None
+        if isinstance(obj, pd.DataFrame) and (s3_path.endswith(".xls") or s3_path.endswith(".xlsx")):
+            data = obj.to_csv(index=False) + repr(sorted(kwargs.items()))
+            md5 = hashlib.md5(data.encode()).hexdigest()
+        with tempfile.TemporaryDirectory() as f:
+            output_path = os.path.join(f, "file")
+            _obj_to_file(obj, output_path, s3_path, **kwargs)
+            return self._upload(output_path, s3_path, public, md5=md5)
+
+    def _upload(self, local_path, s3_path, public, md5=None):
+        md5 = _file_md5(local_path) if md5 is None else md5
+        if self.skip_unchanged and self._remote_md5(s3_path) == md5:
+            return s3_path, False
+        self.s3.upload_to_s3(local_path, s3_path, public=public, metadata={"md5": md5}, config=self.config)
+        return s3_path, True
+
+    def _remote_md5(self, s3_path):
+        try:
+            metadata = self.s3.get_metadata(s3_path)
+        except ClientError:
+            return None
+        if "md5" in metadata.get("Metadata", {}):
+            return metadata["Metadata"]["md5"]
+        etag = metadata.get("ETag", "").strip('"')
+        # ETags of multipart uploads are not the MD5 of the file
+        if "-" not in etag:
+            return etag
+        return None
+
+
+def _file_md5(local_path, chunk_size=8 * 1024**2):
+    md5 = hashlib.md5()
+    with open(local_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            md5.update(chunk)
+    return md5.hexdigest()
+
+
+def _obj_to_file(obj, output_path, s3_path, **kwargs):
+    if isinstance(obj, dict):
+        with open(output_path, "w") as f:
+            json.dump(obj, f)
+    elif isinstance(obj, str):
+        with open(output_path, "w") as file:
+            file.write(obj)
+    elif isinstance(obj, pd.DataFrame):
+        if s3_path.endswith(".csv") or s3_path.endswith(".zip"):
+            obj.to_csv(output_path, index=False, **kwargs)
+        elif s3_path.endswith(".xls") or s3_path.endswith(".xlsx"):
+            obj.to_excel(output_path, index=False, engine="xlsxwriter", **kwargs)
+        else:
+            raise ValueError(f"pd.DataFrame must be exported to either CSV or XLS/XLSX!")
+    else:
+        raise ValueError(
+            f"Type of `obj` is not supported ({type(obj).__name__}). Supported are json, str and pd.DataFrame"
+        )
+
+
 def _url_to_path_and_bucket(s3_path):
     """Check if S3 path format is correct"""
     r = "^s3:\/\/([^\/]+)\/((:?(.+)\/)?[^\/]+)$"
@@ -0,0 +1,308 @@
+"""Vectorized operations on time series of multiple locations, in long format (one row per location and date).
+
+Functions work on all locations at once, instead of grouping by location and applying a function to each group.
+"""
+import numpy as np
+import pandas as pd
+
+
+def daily_grid(
+    df: pd.DataFrame, columns: list, column_location: str = "location", column_date: str = "date"
+) -> pd.DataFrame:
+    """Add missing dates, so that each location has one row per day between the first and last valid value of each
+    column in `columns`.
+
+    Added rows have NaN values. Existing rows (also those outside these date ranges) are kept.
+
+    Args:
+        df (pd.DataFrame): Input data. `column_date` must be of datetime type.
+        columns (list): Columns used to define the date ranges.
+        column_location (str, optional): Location column. Defaults to "location".
+        column_date (str, optional): Date column. Defaults to "date".
+
+    Returns:
+        pd.DataFrame: Data with added rows, sorted by location and date.
+    """
+    grids = [df[[column_location, column_date]]]
+    for col in columns:
+        bounds = df.dropna(subset=[col]).groupby(column_location)[column_date].agg(["min", "max"])
+        num_days = (bounds["max"] - bounds["min"]).dt.days.values + 1
+        offsets = np.arange(num_days.sum()) - np.repeat(np.cumsum(num_days) - num_days, num_days)
+        grids.append(
+            pd.DataFrame(
+                {
+                    column_location: np.repeat(bounds.index.values, num_days),
+                    column_date: np.repeat(bounds["min"].values, num_days) + offsets.astype("timedelta64[D]"),
+                }
+            )
+        )
+    grid = pd.concat(grids, ignore_index=True).drop_duplicates()
+    df = grid.merge(df, on=[column_location, column_date], how="left")[df.columns]
+    return df.sort_values([column_location, column_date]).reset_index(drop=True)
+
+
+def interpolated_diff(
+    df: pd.DataFrame, column: str, column_location: str = "location", column_date: str = "date"
+) -> np.ndarray:
+    """Daily change of `column`, after linearly interpolating it.
+
+    Values are only estimated between the first and last valid value of each location (NaN elsewhere). The first of
+    these days has NaN change.
+
+    Args:
+        df (pd.DataFrame): Input data. Must be sorted by location and date, and have one row per day within the ranges
+            defined above (see `daily_grid`).
+        column (str): Cumulative metric.
+        column_location (str, optional): Location column. Defaults to "location".
+        column_date (str, optional): Date column. Defaults to "date".
+
+    Returns:
+        np.ndarray: Daily changes.
+    """
+    codes = pd.factorize(df[column_location])[0]
+    days = df[column_date].values.astype("datetime64[D]").astype(np.int64)
+    # Shift each location to its own range of x values, so that interpolation never mixes locations
+    x = codes * (days.max() - days.min() + 1) + (days - days.min())
+    y = df[column].to_numpy(dtype=float, na_value=np.nan)
+    valid = ~np.isnan(y)
+    if not valid.any():
+        return np.full(len(df), np.nan)
+
+    dates_valid = df[column_date].where(valid).groupby(codes)
+    in_range = (
+        (df[column_date] >= dates_valid.transform("min")) & (df[column_date] <= dates_valid.transform("max"))
+    ).values
+
+    values = np.full(len(df), np.nan)
+    values[in_range] = np.interp(x[in_range], x[valid], y[valid])
+    diff = np.full(len(df), np.nan)
+    diff[1:] = values[1:] - values[:-1]
+    diff[1:][codes[1:] != codes[:-1]] = np.nan
+    return diff
+
+
+def rolling_mean(df: pd.DataFrame, column: str, window: int, column_location: str = "location") -> np.ndarray:
+    """Rolling mean of `column` over the last `window` rows of each location, ignoring NaNs (i.e. `min_periods=1`).
+
+    Args:
+        df (pd.DataFrame): Input data. Must be sorted by location and date.
+        column (str): Metric.
+        window (int): Window size, in rows.
+        column_location (str, optional): Location column. Defaults to "location".
+
+    Returns:
+        np.ndarray: Rolling mean.
+    """
+    codes = pd.factorize(df[column_location])[0]
+    values = df[column].to_numpy(dtype=float, na_value=np.nan)
+    total = np.zeros(len(df))
+    count = np.zeros(len(df))
+    for lag in range(window):
+        lagged = np.full(len(df), np.nan)
+        lagged[lag:] = values[: len(df) - lag]
+        lagged[lag:][codes[lag:] != codes[: len(df) - lag]] = np.nan
+        valid = ~np.isnan(lagged)
+        total += np.where(valid, lagged, 0)
+        count += valid
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(count > 0, total / count, np.nan)
+
+
+def window_change(
+    df: pd.DataFrame,
+    columns: list,
+    start=None,
+    periods: int = None,
+    baseline: str = "first",
+    column_location: str = "location",
+    column_date: str = "date",
+) -> pd.DataFrame:
+    """Change of each column in `columns` over a trailing window (value minus the value at the start of the window).
+
+    The window is either:
+
+    - Fixed (`start`): All dates from `start` onwards (e.g. the last 12 months). Rows before `start` get NaN.
+    - Sliding (`periods`): The last `periods` rows of each location, i.e. the change is the difference with the value
+        `periods` rows before. Windows are clipped to start at the first valid value of the location.
+
+    The baseline (value at the start of the window) is, for each location:
+
+    - "first": First valid value within the window.
+    - "previous": Last valid value before the window, or 0 if there is none (only for fixed windows).
+
+    Args:
+        df (pd.DataFrame): Input data. Rows are processed in date order, they do not need to be sorted.
+        columns (list): Metrics (usually cumulative).
+        start (optional): Start date of the fixed window.
+        periods (int, optional): Size of the sliding window, in rows.
+        baseline (str, optional): Baseline, "first" or "previous". Defaults to "first".
+        column_location (str, optional): Location column. Defaults to "location".
+        column_date (str, optional): Date column. Defaults to "date".
+
+    Returns:
+        pd.DataFrame: Changes, with the same index as `df` and one column per metric.
+    """
+    if (start is None) == (periods is None):
+        raise ValueError("Exactly one of `start` and `periods` must be given!")
+    if baseline not in ("first", "previous") or (baseline == "previous" and periods is not None):
+        raise ValueError(f"Invalid baseline {baseline}")
+
+    # Work on rows sorted by location and date, then map back to the original order
+    codes = pd.factorize(df[column_location])[0]
+    dates = pd.to_datetime(df[column_date]).values
+    order = np.lexsort((dates, codes))
+    codes = codes[order]
+    num_locations = codes.max() + 1 if len(codes) else 0
+    positions = np.arange(len(df))
+    if start is not None:
+        in_window = dates[order] >= np.datetime64(pd.to_datetime(start))
+
+    changes = {}
+    for col in columns:
+        values = df[col].to_numpy(dtype=float, na_value=np.nan)[order]
+        valid = ~np.isnan(values)
+        if start is None:
+            # First valid position of each location
+            first = np.full(num_locations, len(df))
+            np.minimum.at(first, codes[valid], positions[valid])
+            idx_base = np.maximum(positions - periods, first[codes])
+            change = np.full(len(df), np.nan)
+            has_base = idx_base < len(df)
+            change[has_base] = values[has_base] - values[idx_base[has_base]]
+        else:
+            base = np.full(num_locations, np.nan)
+            if baseline == "first":
+                mask = valid & in_window
+                # Positions are sorted by date within each location: keep the first of each location
+                idx, idx_loc = np.unique(codes[mask], return_index=True)
+                base[idx] = values[mask][idx_loc]
+            else:
+                base[:] = 0
+                mask = valid & ~in_window
+                # Keep the last of each location
+                idx, idx_loc = np.unique(codes[mask][::-1], return_index=True)
+                base[idx] = values[mask][::-1][idx_loc]
+            change = np.where(in_window, values - base[codes], np.nan)
+        changes[col] = np.empty(len(df))
+        changes[col][order] = change
+    return pd.DataFrame(changes, index=df.index)
+
+
+class RollingWindows:
+    """Rolling-window operations on the time series of all locations at once.
+
+    Rows are sorted once by location and date, and each metric is laid out as a contiguous (location x position)
+    matrix, padded with NaN after the last row of each location. Windows are over consecutive rows of a location, as
+    with `df.groupby(location).rolling(window)`. Kernels ignore NaNs.
+
+    Args:
+        df (pd.DataFrame): Input data. Rows do not need to be sorted.
+        column_location (str, optional): Location column. Defaults to "location".
+        column_date (str, optional): Date column. Defaults to "date".
+    """
+
+    def __init__(self, df: pd.DataFrame, column_location: str = "location", column_date: str = "date"):
+        codes = pd.factorize(df[column_location])[0]
+        dates = pd.to_datetime(df[column_date]).values
+        # lexsort is stable: rows with the same location and date keep their order
+        order = np.lexsort((dates, codes))
+        counts = np.bincount(codes) if len(codes) else np.zeros(0, dtype=int)
+        starts = np.cumsum(counts) - counts
+        self._idx_loc = codes[order]
+        self._idx_pos = np.arange(len(df)) - starts[self._idx_loc]
+        self._order = order
+        self.shape = (len(counts), counts.max() if len(counts) else 0)
+
+    def matrix(self, values) -> np.ndarray:
+        """Lay out `values` (one per row of the input data, in its order) as a (location x position) matrix."""
+        values = pd.Series(values).to_numpy(dtype=float, na_value=np.nan)
+        m = np.full(self.shape, np.nan)
+        m[self._idx_loc, self._idx_pos] = values[self._order]
+        return m
+
+    def series(self, m: np.ndarray) -> np.ndarray:
+        """Inverse of `matrix`: values of the matrix, in the order of the rows of the input data."""
+        values = np.empty(len(self._order))
+        values[self._order] = m[self._idx_loc, self._idx_pos]
+        return values
+
+    @staticmethod
+    def _windows(m, window, center):
+        # Window of each position: the last `window` positions, or `window` positions around it if centered (same
+        # alignment as pandas)
+        offset = (window - 1) // 2 if center else 0
+        padded = np.pad(m, ((0, 0), (window - 1 - offset, offset)), constant_values=np.nan)
+        return np.lib.stride_tricks.sliding_window_view(padded, window, axis=1)
+
+    def sum(self, m: np.ndarray, window: int, min_periods: int = None, center: bool = False) -> np.ndarray:
+        """Rolling sum, NaN if there are less than `min_periods` (defaults to `window`) valid values in the window."""
+        windows = self._windows(m, window, center)
+        count = (~np.isnan(windows)).sum(axis=2)
+        total = np.nansum(windows, axis=2)
+        return np.where(count >= (window if min_periods is None else min_periods), total, np.nan)
+
+    def mean(self, m: np.ndarray, window: int, min_periods: int = None, center: bool = False) -> np.ndarray:
+        """Rolling mean, NaN if there are less than `min_periods` (defaults to `window`) valid values in the window."""
+        windows = self._windows(m, window, center)
+        count = (~np.isnan(windows)).sum(axis=2)
+        total = np.nansum(windows, axis=2)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(count >= max(window if min_periods is None else min_periods, 1), total / count, np.nan)
+
+    @staticmethod
+    def pct_change(m: np.ndarray, periods: int) -> np.ndarray:
+        """Relative change with the value `periods` positions before (no filling of missing values)."""
+        previous = np.full(m.shape, np.nan)
+        previous[:, periods:] = m[:, :-periods]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return m / previous - 1
+
+
+def inject_rolling_windows(df: pd.DataFrame, doubling_days_spec: dict, rolling_avg_spec: dict) -> pd.DataFrame:
+    """Add weekly and biweekly sums and growth, doubling days and rolling averages.
+
+    All metrics are computed with the same `RollingWindows` layout. Used by the cases/deaths pipelines (WHO and JHU).
+
+    Args:
+        df (pd.DataFrame): Data, with columns location, date, new_cases, new_deaths and the columns in the specs.
+            Per-million columns used in `rolling_avg_spec` must be added before.
+        doubling_days_spec (dict): Doubling days columns: {column: {"value_col": ..., "periods": ...}}.
+        rolling_avg_spec (dict): Rolling average columns: {column: {"col": ..., "window": ..., "min_periods": ...,
+            "center": ...}}.
+    """
+    print("Adding rolling-window metrics…")
+    windows = RollingWindows(df)
+    new_cases = windows.matrix(df["new_cases"])
+    new_deaths = windows.matrix(df["new_deaths"])
+
+    # Weekly & biweekly growth
+    for prefix, periods in (("weekly", 7), ("biweekly", 14)):
+        for metric, values in (("cases", new_cases), ("deaths", new_deaths)):
+            sums = windows.sum(values, window=periods, min_periods=periods - 1)
+            growth = np.round(windows.pct_change(sums, periods), 3)
+            growth[np.isinf(growth)] = np.nan
+            df[f"{prefix}_{metric}"] = windows.series(np.where(np.isnan(values), np.nan, sums))
+            df[f"{prefix}_pct_growth_{metric}"] = windows.series(growth * 100)
+
+    # Doubling days
+    for col, spec in doubling_days_spec.items():
+        value_col = spec["value_col"]
+        periods = spec["periods"]
+        df.loc[df[value_col] == 0, value_col] = np.nan
+        pct_change = windows.pct_change(windows.matrix(df[value_col]), periods)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            doubling_days = np.round(periods * np.log(2) / np.log(1 + pct_change), decimals=2)
+        doubling_days[np.isnan(pct_change) | (pct_change == 0)] = np.nan
+        df[col] = windows.series(doubling_days)
+
+    # Rolling averages
+    for col, spec in rolling_avg_spec.items():
+        df[col] = windows.series(
+            windows.mean(
+                windows.matrix(df[spec["col"]]),
+                window=spec["window"],
+                min_periods=spec["min_periods"],
+                center=spec["center"],
+            ).round(decimals=3)
+        )
+    return df
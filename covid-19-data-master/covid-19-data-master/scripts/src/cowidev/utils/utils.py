@@ -5,49 +5,134 @@ import ntpath
 import os
 import pytz
 import tempfile
+from typing import Tuple
 
 from xlsx2csv import Xlsx2csv
+import numpy as np
 import pandas as pd
 
 from cowidev import PATHS
 from cowidev.utils.web.download import download_file_from_url
 
 
+def repair_monotonic(
+    df: pd.DataFrame,
+    column_date: str,
+    column_metrics: list,
+    group_cols: list = None,
+    how: str = "drop",
+    strict: bool = False,
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Force cumulative metrics to become monotonic (non-decreasing) over time.
+
+    Most recent values are assumed to be the correct ones: a value is removed if any later value of its group is lower
+    (or equal, if `strict`). This is computed with a reverse cumulative minimum per group, in a single pass per metric.
+
+    Args:
+        df (pd.DataFrame): Input data.
+        column_date (str): Date column.
+        column_metrics (list): Metrics to repair.
+        group_cols (list, optional): Columns identifying each time series (e.g. vaccine, age group). Defaults to None
+            (one time series).
+        how (str, optional): "drop" to remove rows with wrong values, or "nan" to set wrong values to NaN. With "drop",
+            metrics are repaired in order, each on the rows kept by the previous ones, and rows without a value are
+            removed along with the previous row that has one. Defaults to "drop".
+        strict (bool, optional): Remove values equal to a later value too. Defaults to False.
+
+    Returns:
+        Tuple[pd.DataFrame, pd.DataFrame]: Repaired data (sorted by group and date) and removed cells. The latter has
+            one row per removed cell (index of `df`), with the group columns, the date, `metric`, `value` and `chunk`
+            (id of the run of consecutive removed cells of the same metric and group).
+    """
+    if how not in ["drop", "nan"]:
+        raise ValueError(f"Invalid value for `how`: {how}. Should be 'drop' or 'nan'.")
+    group_cols = [] if group_cols is None else list(group_cols)
+    df = df.sort_values([*group_cols, column_date] if group_cols else column_date)
+    if group_cols:
+        groups = df.groupby(group_cols, sort=False, dropna=False).ngroup().to_numpy()
+    else:
+        groups = np.zeros(len(df), dtype=int)
+
+    keep = np.ones(len(df), dtype=bool)
+    removed = []
+    for metric in column_metrics:
+        idx = np.flatnonzero(keep)
+        values = df[metric].to_numpy(dtype=float, na_value=np.nan)[idx]
+        valid = _monotonic_mask(values, groups[idx], strict)
+        if how == "drop":
+            # Rows without value follow the previous row with a value
+            valid = (
+                pd.Series(np.where(np.isnan(values), np.nan, valid))
+                .groupby(groups[idx])
+                .ffill()
+                .fillna(1)
+                .to_numpy(dtype=bool)
+            )
+            keep[idx[~valid]] = False
+        idx_removed = idx[~valid]
+        removed.append((metric, idx_removed, df[metric].iloc[idx_removed].to_numpy()))
+
+    report = _removed_report(df, removed, groups, [*group_cols, column_date])
+    if how == "drop":
+        df = df[keep]
+    else:
+        for metric, idx_removed, _ in removed:
+            mask = np.zeros(len(df), dtype=bool)
+            mask[idx_removed] = True
+            df[metric] = df[metric].mask(mask)
+    return df, report
+
+
+def _monotonic_mask(values, groups, strict):
+    """True for values not greater than (or equal to, if strict) any later value of the group, or NaN."""
+    values_rev = pd.Series(values[::-1]).fillna(np.inf)
+    groups_rev = groups[::-1]
+    later_min = (
+        values_rev.groupby(groups_rev).cummin().groupby(groups_rev).shift(1, fill_value=np.inf).to_numpy()[::-1]
+    )
+    with np.errstate(invalid="ignore"):
+        return np.isnan(values) | ((values < later_min) if strict else (values <= later_min))
+
+
+def _removed_report(df, removed, groups, columns):
+    reports = []
+    n_chunks = 0
+    for metric, idx, values in removed:
+        # Consecutive rows of the same group belong to the same chunk
+        new_chunk = np.ones(len(idx), dtype=bool)
+        new_chunk[1:] = (np.diff(idx) != 1) | (groups[idx][1:] != groups[idx][:-1])
+        chunks = n_chunks + np.cumsum(new_chunk) - 1
+        n_chunks += new_chunk.sum()
+        reports.append(df[columns].iloc[idx].assign(metric=metric, value=values, chunk=chunks))
+    if not reports:
+        return pd.DataFrame(columns=[*columns, "metric", "value", "chunk"])
+    return pd.concat(reports)
+
+
 def make_monotonic(
-    df: pd.DataFrame, column_date: str, column_metrics: list, max_removed_rows=10, strict=False, new=False
+    df: pd.DataFrame,
+    column_date: str,
+    column_metrics: list,
+    max_removed_rows=10,
+    strict=False,
+    new=False,
+    group_cols: list = None,
 ) -> pd.DataFrame:
     # Forces vaccination time series to become monotonic.
     # The algorithm assumes that the most recent values are the correct ones,
     # and therefore removes previous higher values.
     if new:
-        return make_monotonic_new(df, column_date, column_metrics, max_removed_rows)
-    n_rows_before = len(df)
-    dates_before = set(df.date)
-    df_before = df.copy()
-
-    df = df.sort_values(column_date)
-    for metric in column_metrics:
-        print(metric)
-        while not (err := df[metric].ffill().fillna(0).is_monotonic):
-            print(err)
-            diff = df[metric].ffill().shift(-1) - df[metric].ffill()
-            if strict:
-                df = df[(diff > 0) | (diff.isna())]
-            else:
-                df = df[(diff >= 0) | (diff.isna())]
-    dates_now = set(df.date)
+        return make_monotonic_new(df, column_date, column_metrics, max_removed_rows, group_cols=group_cols)
+    df_before = df
+    df, removed = repair_monotonic(df, column_date, column_metrics, group_cols=group_cols, how="drop", strict=strict)
 
     if max_removed_rows is not None:
-        num_removed_rows = n_rows_before - len(df)
+        num_removed_rows = len(removed)
         if num_removed_rows > max_removed_rows:
-            dates_wrong = dates_before.difference(dates_now)
-            df_wrong = df_before[df_before.date.isin(dates_wrong)]
-            # pd.set_option("expand_frame_repr", False)
-            df_wrong = df_wrong[["date"] + column_metrics]
-            # df_wrong = df_before[["date"] + column_metrics]
+            df_wrong = df_before.loc[removed.index, [column_date] + column_metrics].sort_values(column_date)
             raise Exception(
                 f"{num_removed_rows} rows have been removed. That is more than maximum allowed ({max_removed_rows})"
-                f" by make_monotonic() - check the data. Check \n{df_wrong}"  # {', '.join(sorted(dates_wrong))}"
+                f" by make_monotonic() - check the data. Check \n{df_wrong}"
             )
 
     return df
@@ -58,43 +143,24 @@ def make_monotonic_new(
     column_date: str,
     column_metrics: list,
     max_removed_rows_per_chunk=10,
+    group_cols: list = None,
 ) -> pd.DataFrame:
     # Forces vaccination time series to become monotonic.
     # The algorithm assumes that the most recent values are the correct ones,
     # and therefore removes previous higher values.
-    df = df.sort_values(column_date)
-    df_before = df.copy()
-
-    # Build and apply mask
-    # diff = df[column_metrics].ffill().fillna(0).diff()
-    for metric in column_metrics:
-        # print(metric)
-        while not (err := df[metric].dropna().is_monotonic):
-            # print(err)
-            diff = df[metric].bfill().shift(-1) - df[metric].bfill()
-            msk = diff < 0
-            df.loc[msk, metric] = None
-    # if strict:
-    #     msk = diff.isna() | (diff > 0)
-    # else:
-    #     msk = diff.isna() | (diff >= 0)
-    # Assign Nones to invalid cells
-    # df.loc[:, column_metrics] = df[column_metrics].where(msk, other=None)
+    df, removed = repair_monotonic(df, column_date, column_metrics, group_cols=group_cols, how="nan")
 
     # Check consecutive NaN within allowed range
-    x = df[column_metrics].isna() & ~df_before[column_metrics].isna()
     for metric in column_metrics:
-        y = x[metric]
-        y = y * (y.groupby((y != y.shift()).cumsum()).cumcount() + 1)
-        y[y.diff(-1) == -1] = 0
-        if (exceed := y > max_removed_rows_per_chunk).any():
+        chunks = removed[removed.metric == metric].groupby("chunk")
+        length_chunks = chunks.size()
+        if (exceed := length_chunks > max_removed_rows_per_chunk).any():
             num_chunks = sum(exceed)
-            length_chunks = [str(yy) for yy in y[exceed].tolist()]
-            dates_chunks = sorted(df_before.loc[exceed, "date"].tolist())
+            dates_chunks = sorted(chunks[column_date].last()[exceed].tolist())
             raise Exception(
-                f"{num_chunks} chunks of lengths {', '.join(length_chunks)} have been NaNed for metric {metric}. That"
-                f" is more than maximum allowed ({max_removed_rows_per_chunk}) by make_monotonic() - check the data."
-                f" Check dates {dates_chunks}"
+                f"{num_chunks} chunks of lengths {', '.join(str(n) for n in length_chunks[exceed])} have been NaNed"
+                f" for metric {metric}. That is more than maximum allowed ({max_removed_rows_per_chunk}) by"
+                f" make_monotonic() - check the data. Check dates {dates_chunks}"
             )
     # Drop rows with all-None values
     df = df.dropna(subset=column_metrics, how="all")
@@ -1,3 +1,5 @@
+import json
+import os
 import tempfile
 from urllib.parse import urlparse
 import pandas as pd
@@ -86,6 +88,58 @@ def download_file_from_url(
             fd.write(chunk)
 
 
+def download_file_cached(
+    url, save_path, chunk_size=1024 * 1024, timeout=30, session=None, headers=None, path_meta=None
+) -> bool:
+    """Download file from URL to `save_path`, unless the local copy is still up to date.
+
+    The ETag and Last-Modified headers of the response are stored next to the file (same path, extension .json) and
+    sent back on the next request (If-None-Match, If-Modified-Since). If the server answers 304 Not Modified, the local
+    copy is kept.
+
+    Args:
+        url (str): File URL.
+        save_path (str): Local path of the file.
+        chunk_size (int, optional): Size of the chunks streamed to disk. Defaults to 1MB.
+        timeout (int, optional): Request timeout, in seconds. Defaults to 30.
+        session (requests.Session, optional): Session used for the request. Defaults to None (new connection).
+        headers (dict, optional): Additional request headers. Defaults to None.
+        path_meta (str, optional): Path of the file with the response headers. Defaults to None (`save_path` with
+            extension .json).
+
+    Returns:
+        bool: True if the file was downloaded, False if the local copy was up to date.
+    """
+    if path_meta is None:
+        path_meta = os.path.splitext(save_path)[0] + ".json"
+    headers = dict(headers or {})
+    if os.path.isfile(save_path) and os.path.isfile(path_meta):
+        with open(path_meta, "r") as f:
+            meta = json.load(f)
+        if meta.get("url") == url:
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+    r = (session or requests).get(url, stream=True, timeout=timeout, headers=headers)
+    if r.status_code == 304:
+        return False
+    r.raise_for_status()
+    dirname = os.path.dirname(save_path)
+    if dirname:
+        os.makedirs(dirname, exist_ok=True)
+    # Write to a temporary file first, so that an interrupted download does not leave a truncated file in the cache
+    with tempfile.NamedTemporaryFile(dir=dirname or None, delete=False) as tmp:
+        for chunk in r.iter_content(chunk_size=chunk_size):
+            tmp.write(chunk)
+    os.replace(tmp.name, save_path)
+    with open(path_meta, "w") as f:
+        json.dump(
+            {"url": url, "etag": r.headers.get("ETag"), "last_modified": r.headers.get("Last-Modified")}, f, indent=2
+        )
+    return True
+
+
 class DESAdapter(HTTPAdapter):
     """
     A TransportAdapter that re-enables 3DES support in Requests.
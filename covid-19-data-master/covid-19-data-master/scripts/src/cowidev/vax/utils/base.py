@@ -101,30 +101,18 @@ class CountryVaxBase:
         return df.date.max()
 
     def make_monotonic(self, df, group_cols=None, max_removed_rows=10, strict=False):
+        df = mkm(
+            df=df,
+            column_date="date",
+            column_metrics=[m for m in METRICS if m in df.columns],
+            max_removed_rows=max_removed_rows,
+            strict=strict,
+            new=True,
+            group_cols=group_cols,
+        )
         if group_cols:
-            dfg = df.groupby(group_cols)
-            dfg = list(dfg)
-            dfs = []
-            for df_vax in dfg:
-                _df = mkm(
-                    df=df_vax[1],
-                    column_date="date",
-                    column_metrics=[m for m in METRICS if m in df.columns],
-                    max_removed_rows=max_removed_rows,
-                    strict=strict,
-                    new=True,
-                )
-                dfs.append(_df)
-            return pd.concat(dfs, ignore_index=True)
-        else:
-            return mkm(
-                df=df,
-                column_date="date",
-                column_metrics=[m for m in METRICS if m in df.columns],
-                max_removed_rows=max_removed_rows,
-                strict=strict,
-                new=True,
-            )
+            df = df.reset_index(drop=True)
+        return df
 
     def _postprocessing(self, df, valid_cols_only):
         """Minor post processing after all transformations.
@@ -1,6 +1,6 @@
 from datetime import datetime
-from itertools import chain
 
+import numpy as np
 import pandas as pd
 
 
@@ -62,12 +62,14 @@ def country_df_sanity_checks(
     monotonic_check_skip: list = [],
     anomalies: bool = True,
     anomaly_check_skip: list = [],
+    metrics: bool = True,
 ) -> pd.DataFrame:
     checker = CountryChecker(
         df,
         monotonic_check_skip=monotonic_check_skip,
         anomalies=anomalies,
         anomaly_check_skip=anomaly_check_skip,
+        metrics=metrics,
     )
     checker.run()
 
@@ -80,13 +82,15 @@ class CountryChecker:
         monotonic_check_skip: list = [],
         anomalies: bool = True,
         anomaly_check_skip: list = [],
+        metrics: bool = True,
     ):
         self.location = self._get_location(df)
         self.df = df
         self.allow_extra_cols = allow_extra_cols
-        self.skip_monocheck_ids = self._skip_check_ids(monotonic_check_skip)
+        self.monotonic_check_skip = monotonic_check_skip
         self.anomalies = anomalies
-        self.skip_anomalcheck_ids = self._skip_check_ids(anomaly_check_skip)
+        self.anomaly_check_skip = anomaly_check_skip
+        self.metrics = metrics
 
     def _get_location(self, df):
         x = df.loc[:, "location"].unique()
@@ -95,16 +99,6 @@ class CountryChecker:
             raise ValueError(f"More than one location found: {locations}")
         return x[0]
 
-    def _skip_check_ids(self, check_skip):
-        def _f(x):
-            dt = x["date"].strftime("%Y%m%d")
-            if isinstance(x["metrics"], list):
-                return [dt + m for m in x["metrics"]]
-            return [x["date"].strftime("%Y%m%d") + x["metrics"]]
-
-        res = [_f(x) for x in check_skip]
-        return list(chain.from_iterable(res))
-
     @property
     def metrics_present(self):
         cols = ["total_vaccinations"]
@@ -164,78 +158,15 @@ class CountryChecker:
             )
 
     def check_metrics(self):
-        df = self.df.sort_values(by="date")  # [self.metrics_present]
-        # Monotonically
-        self._check_metrics_monotonic(df)
-        # Inequalities
-        self._check_metrics_inequalities(df)
-        # Anomalies
-        if self.anomalies:
-            self._check_metrics_anomalies(df)
-
-    def _check_metrics_monotonic(self, df: pd.DataFrame):
-        # Use info from monotonic_check_skip to raise exception or not
-        for col in self.metrics_present:
-            _x = df.dropna(subset=[col])
-            if not _x[col].is_monotonic:
-                idx_wrong = _x[col].diff() < 0
-                wrong_rows = _x.loc[idx_wrong]
-                wrong_ids = wrong_rows.date.dt.strftime("%Y%m%d") + col
-                if not wrong_ids.isin(self.skip_monocheck_ids).all():
-                    raise ValueError(
-                        f"{self.location} -- Column {col} must be monotonically increasing! Check:\n{wrong_rows}"
-                    )
-
-    def _check_metrics_inequalities(self, df: pd.DataFrame):
-        if ("total_vaccinations" in df.columns) and ("people_vaccinated" in df.columns):
-            df_ = df[["people_vaccinated", "total_vaccinations"]].dropna().copy()
-            msk = df_["total_vaccinations"] < df_["people_vaccinated"]
-            if (msk).any():
-                raise ValueError(
-                    f"{self.location} -- total_vaccinations can't be < people_vaccinated!\n{df.loc[msk[msk].index]}"
-                )
-        if ("total_vaccinations" in df.columns) and ("people_fully_vaccinated" in df.columns):
-            df_ = df[["people_fully_vaccinated", "total_vaccinations"]].dropna().copy()
-            if (df_["total_vaccinations"] < df_["people_fully_vaccinated"]).any():
-                raise ValueError(f"{self.location} -- total_vaccinations can't be < people_fully_vaccinated!")
-        if ("total_vaccinations" in df.columns) and ("total_boosters" in df.columns):
-            df_ = df[["total_boosters", "total_vaccinations"]].dropna().copy()
-            if (df_["total_vaccinations"] < df_["total_boosters"]).any():
-                raise ValueError(f"{self.location} -- total_vaccinations can't be < total_boosters!")
-        if ("people_vaccinated" in df.columns) and ("people_fully_vaccinated" in df.columns):
-            df_ = df[["people_vaccinated", "people_fully_vaccinated"]].dropna().copy()
-            msk = df_["people_vaccinated"] < df_["people_fully_vaccinated"]
-            if (msk).any():
-                raise ValueError(
-                    f"{self.location} -- people_vaccinated can't be <"
-                    f" people_fully_vaccinated!\n{df.loc[msk[msk].index]}"
-                )
-
-    def _check_metrics_anomalies(self, df):
-        for metric in self.metrics_present:
-            self._check_anomalies(df, metric)
-
-    def _check_anomalies(self, df, metric, th=6):
-        # Get metric values above 10,000
-        df_ = df.set_index("date")
-        df_metric = df_.loc[(df_[metric] > 10000), metric]
-        # Compute rolling average, 7 days. NaNs are filled with non-smoothed values
-        window_size = "7d"
-        m = df_metric.rolling(window_size, min_periods=2).mean().shift(1)
-        m.loc[m.isnull()] = df_metric[m.isnull()]
-        # Compute ratio between rolling average and value. Build Anomalies dataframe
-        t = df_metric / (m + 1e-9)
-        t = pd.DataFrame(
-            {
-                f"{metric}_{window_size}": m[t > th],
-                f"{metric}_ratio": t[t > th],
-            }
+        checker = BatchChecker(
+            self.df,
+            monotonic_check_skip={self.location: self.monotonic_check_skip},
+            anomalies=self.anomalies,
+            anomaly_check_skip={self.location: self.anomaly_check_skip},
         )
-        anomalies = df_.loc[t.index, [metric]].merge(t, on="date").reset_index()
-        if not anomalies.empty:
-            wrong_ids = anomalies.date.dt.strftime("%Y%m%d") + metric
-            if not wrong_ids.isin(self.skip_anomalcheck_ids).all():
-                raise ValueError(f"{self.location} -- Potential anomalies found ⚠️:\n{anomalies}")
+        errors = checker.errors()
+        if errors:
+            raise ValueError(errors[self.location])
 
     def run(self):
         # Ensure required columns are present
@@ -249,7 +180,174 @@ class CountryChecker:
         # Location consistency
         self.check_location()
         # Metrics checks
-        self.check_metrics()
+        if self.metrics:
+            self.check_metrics()
+
+
+class BatchChecker:
+    """Checks on the metrics of all locations at once.
+
+    Rules are evaluated for all locations with grouped vectorized passes:
+
+    - Monotonicity: metrics must not decrease over time.
+    - Inequalities: see `INEQUALITIES` (e.g. people_vaccinated ≥ people_fully_vaccinated).
+    - Anomalies: values above 10,000 must not be more than 6 times the average of the previous 7 days.
+
+    Args:
+        df (pd.DataFrame): Data of all locations (concatenated).
+        monotonic_check_skip (dict, optional): Location -> list of {"date", "metrics"} entries to skip in the
+            monotonicity check. Defaults to None.
+        anomalies (bool, optional): Set to False to skip the anomaly check. Defaults to True.
+        anomaly_check_skip (dict, optional): Location -> list of {"date", "metrics"} entries to skip in the anomaly
+            check. Defaults to None.
+    """
+
+    INEQUALITIES = [
+        ("total_vaccinations", "people_vaccinated"),
+        ("total_vaccinations", "people_fully_vaccinated"),
+        ("total_vaccinations", "total_boosters"),
+        ("people_vaccinated", "people_fully_vaccinated"),
+    ]
+    COLUMNS = ["location", "date", "check", "metric", "value", "reference", "ratio"]
+
+    def __init__(
+        self,
+        df: pd.DataFrame,
+        monotonic_check_skip: dict = None,
+        anomalies: bool = True,
+        anomaly_check_skip: dict = None,
+    ):
+        metrics = [m for m in METRICS if m in df.columns]
+        self.df = (
+            pd.DataFrame(
+                {
+                    "location": df["location"].values,
+                    "date": pd.to_datetime(df["date"]).values,
+                    **{m: df[m].to_numpy(dtype=float, na_value=np.nan) for m in metrics},
+                }
+            )
+            .sort_values(["location", "date"], kind="stable")
+            .reset_index(drop=True)
+        )
+        self.metrics = metrics
+        self.anomalies = anomalies
+        self.skip_monocheck_ids = self._skip_check_ids(monotonic_check_skip or {})
+        self.skip_anomalcheck_ids = self._skip_check_ids(anomaly_check_skip or {})
+        self._codes = pd.factorize(self.df["location"])[0]
+
+    @staticmethod
+    def _skip_check_ids(check_skip: dict) -> pd.MultiIndex:
+        """(location, date, metric) of the checks to skip, as a hashed index."""
+        ids = [
+            (location, pd.Timestamp(x["date"]).normalize(), metric)
+            for location, entries in check_skip.items()
+            for x in entries
+            for metric in (x["metrics"] if isinstance(x["metrics"], list) else [x["metrics"]])
+        ]
+        return pd.MultiIndex.from_tuples(ids, names=["location", "date", "metric"])
+
+    def _table(self, check, metric, idx, reference, ratio=np.nan):
+        return pd.DataFrame(
+            {
+                "location": self.df["location"].values[idx],
+                "date": self.df["date"].values[idx],
+                "check": check,
+                "metric": metric,
+                "value": self.df[metric].values[idx],
+                "reference": reference,
+                "ratio": ratio,
+            }
+        )
+
+    def _skipped(self, df, skip_ids):
+        if df.empty:
+            return np.zeros(0, dtype=bool)
+        ids = pd.MultiIndex.from_arrays([df["location"], df["date"].dt.normalize(), df["metric"]])
+        return ids.isin(skip_ids)
+
+    def check_monotonic(self) -> pd.DataFrame:
+        """Values lower than the previous value of the location."""
+        dfs = []
+        for metric in self.metrics:
+            idx = np.flatnonzero(self.df[metric].notna().values)
+            values = self.df[metric].values[idx]
+            codes = self._codes[idx]
+            previous = np.full(len(idx), np.nan)
+            previous[1:] = np.where(codes[1:] == codes[:-1], values[:-1], np.nan)
+            wrong = values < previous
+            dfs.append(self._table("monotonic", metric, idx[wrong], previous[wrong]))
+        df = pd.concat(dfs, ignore_index=True) if dfs else pd.DataFrame(columns=self.COLUMNS)
+        return df[~self._skipped(df, self.skip_monocheck_ids)]
+
+    def check_inequalities(self) -> pd.DataFrame:
+        """Values of `metric` lower than those of the metric given in `check` (see `INEQUALITIES`)."""
+        dfs = []
+        for metric, metric_lower in self.INEQUALITIES:
+            if metric in self.metrics and metric_lower in self.metrics:
+                values, values_lower = self.df[metric].values, self.df[metric_lower].values
+                idx = np.flatnonzero(values < values_lower)
+                dfs.append(self._table(f"{metric} >= {metric_lower}", metric, idx, values_lower[idx]))
+        return pd.concat(dfs, ignore_index=True) if dfs else pd.DataFrame(columns=self.COLUMNS)
+
+    def check_anomalies(self, th: float = 6, min_value: float = 10000, window_days: int = 7) -> pd.DataFrame:
+        """Values more than `th` times the average of the previous `window_days` days.
+
+        Only values above `min_value` are considered. The average of a value is that of the time window ending on the
+        previous value (needs two values, otherwise no anomaly is reported).
+        """
+        dfs = []
+        # Time of each row (seconds), offset by location so that windows do not span more than one location
+        seconds = self.df["date"].values.astype("datetime64[s]").astype(np.int64)
+        keys = self._codes.astype(np.int64) * 10**11 + seconds
+        for metric in self.metrics:
+            idx = np.flatnonzero(self.df[metric].values > min_value)
+            values = self.df[metric].values[idx]
+            codes = self._codes[idx]
+            # Rolling mean over the time window (t - window, t]
+            start = np.searchsorted(keys[idx], keys[idx] - window_days * 86400, side="right")
+            end = np.arange(len(idx))
+            count = end - start + 1
+            cumsum = np.concatenate([[0], np.cumsum(values)])
+            mean = np.where(count >= 2, (cumsum[end + 1] - cumsum[start]) / count, np.nan)
+            # Shift by one value within each location
+            mean_previous = np.full(len(idx), np.nan)
+            mean_previous[1:] = np.where(codes[1:] == codes[:-1], mean[:-1], np.nan)
+            mean_previous = np.where(np.isnan(mean_previous), values, mean_previous)
+            ratio = values / (mean_previous + 1e-9)
+            wrong = ratio > th
+            dfs.append(self._table("anomaly", metric, idx[wrong], mean_previous[wrong], ratio[wrong]))
+        df = pd.concat(dfs, ignore_index=True) if dfs else pd.DataFrame(columns=self.COLUMNS)
+        return df[~self._skipped(df, self.skip_anomalcheck_ids)]
+
+    def run(self) -> pd.DataFrame:
+        """Run all checks.
+
+        Returns:
+            pd.DataFrame: Anomalies table, with one row per location, date and failed check. Entries in the skip lists
+                are not reported.
+        """
+        checks = [self.check_monotonic(), self.check_inequalities()]
+        if self.anomalies:
+            checks.append(self.check_anomalies())
+        return pd.concat(checks, ignore_index=True)[self.COLUMNS]
+
+    def errors(self) -> dict:
+        """Error message of each location that failed a check (only the first failed check is reported)."""
+        anomalies = self.run()
+        errors = {}
+        for location, df in anomalies.groupby("location", sort=False):
+            check = df["check"].iloc[0]
+            df = df[df["check"] == check]
+            if check == "monotonic":
+                metric = df["metric"].iloc[0]
+                msg = f"Column {metric} must be monotonically increasing! Check:\n{df[df.metric == metric]}"
+            elif check == "anomaly":
+                msg = f"Potential anomalies found ⚠️:\n{df}"
+            else:
+                metric, metric_lower = check.split(" >= ")
+                msg = f"{metric} can't be < {metric_lower}!\n{df}"
+            errors[location] = f"{location} -- {msg}"
+        return errors
 
 
 def validate_vaccines(df, vaccines_accepted, vaccines_raw=None):
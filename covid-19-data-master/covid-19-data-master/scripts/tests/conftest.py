@@ -0,0 +1,8 @@
+import os
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Required by `cowidev.PATHS`. The secrets file does not exist, so that no credentials are used.
+os.environ.setdefault("OWID_COVID_PROJECT_DIR", os.path.dirname(os.path.dirname(TESTS_DIR)))
+os.environ.setdefault("OWID_COVID_CONFIG", os.path.join(TESTS_DIR, "config.yaml"))
+os.environ.setdefault("OWID_COVID_SECRETS", os.path.join(TESTS_DIR, "secrets.yaml"))
@@ -0,0 +1,145 @@
+import json
+import sys
+import threading
+import types
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+import pytest
+import requests
+
+from cowidev import PATHS
+from cowidev.hosp import fetch
+from cowidev.hosp.etl import HospETL
+from cowidev.utils.web.download import download_file_cached
+
+
+class RecordedServer:
+    """Local HTTP server with recorded responses (path -> (body, ETag)), answering conditional GETs."""
+
+    def __init__(self):
+        self.responses = {}
+        self.requests = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.requests.append((self.path, self.headers.get("If-None-Match")))
+                if self.path not in server.responses:
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                body, etag = server.responses[self.path]
+                if self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self._httpd.server_port}"
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+@pytest.fixture
+def server():
+    server = RecordedServer()
+    server.responses["/data.csv"] = (b"date,value\n2021-01-01,5\n", '"v1"')
+    server.responses["/data.json"] = (b'{"value": 5}', '"v1"')
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def hosp_dirs(tmp_path, monkeypatch):
+    dirs = {
+        "INTERNAL_TMP_HOSP_CACHE_DIR": tmp_path / "cache",
+        "INTERNAL_OUTPUT_HOSP_MAIN_DIR": tmp_path / "main_data",
+        "INTERNAL_OUTPUT_HOSP_META_DIR": tmp_path / "metadata",
+    }
+    for name, path in dirs.items():
+        path.mkdir()
+        monkeypatch.setattr(PATHS, name, str(path))
+    return dirs
+
+
+def test_download_file_cached(server, tmp_path):
+    path = str(tmp_path / "data.csv")
+    assert download_file_cached(f"{server.url}/data.csv", path)
+    assert not download_file_cached(f"{server.url}/data.csv", path)
+    assert server.requests == [("/data.csv", None), ("/data.csv", '"v1"')]
+    with open(path, "rb") as f:
+        assert f.read() == b"date,value\n2021-01-01,5\n"
+    # Changed upstream
+    server.responses["/data.csv"] = (b"date,value\n2021-01-01,6\n", '"v2"')
+    assert download_file_cached(f"{server.url}/data.csv", path)
+    with open(path, "rb") as f:
+        assert f.read() == b"date,value\n2021-01-01,6\n"
+
+
+def test_download_file_cached_error(server, tmp_path):
+    path = tmp_path / "missing.csv"
+    with pytest.raises(requests.HTTPError):
+        download_file_cached(f"{server.url}/missing.csv", str(path))
+    assert not path.exists()
+
+
+def test_fetch(server, hosp_dirs):
+    for _ in range(2):
+        df = fetch.read_csv(f"{server.url}/data.csv")
+        pd.testing.assert_frame_equal(df, pd.DataFrame({"date": ["2021-01-01"], "value": [5]}))
+        assert fetch.read_json(f"{server.url}/data.json") == {"value": 5}
+    assert [etag for _, etag in server.requests] == [None, None, '"v1"', '"v1"']
+    assert len(list(hosp_dirs["INTERNAL_TMP_HOSP_CACHE_DIR"].iterdir())) == 4
+
+
+def _checkpoint(dirs, entity, value):
+    pd.DataFrame(
+        {"entity": [entity], "date": ["2021-01-01"], "indicator": ["Daily ICU occupancy"], "value": [value]}
+    ).to_csv(dirs["INTERNAL_OUTPUT_HOSP_MAIN_DIR"] / f"{entity}.csv", index=False)
+    with open(dirs["INTERNAL_OUTPUT_HOSP_META_DIR"] / f"{entity}.json", "w") as f:
+        json.dump({"entity": entity, "source_name": "Old source", "source_url_ref": "old"}, f)
+
+
+def test_extract(hosp_dirs, monkeypatch):
+    source = types.ModuleType("hosp_source_test")
+    source.main = lambda: (
+        pd.DataFrame(
+            {
+                "entity": ["A", "B", "B"],
+                "date": ["2021-01-01", "2021-01-01", "2021-01-02"],
+                "indicator": ["Daily ICU occupancy"] * 3,
+                "value": [1, 2, None],
+            }
+        ),
+        [{"entity": entity, "source_name": "Source", "source_url_ref": "url"} for entity in ["A", "B"]],
+    )
+    monkeypatch.setitem(sys.modules, "hosp_source_test", source)
+    # Checkpoint of an entity collected in this run (outdated), and of one not collected
+    _checkpoint(hosp_dirs, "A", 100)
+    _checkpoint(hosp_dirs, "C", 3)
+
+    etl = HospETL()
+    data = etl.extract(["hosp_source_test"], parallel=True, n_jobs=2)
+    etl._checkpoint.result()
+
+    # Collected data is used from memory, other entities from the checkpoint
+    df = data["df"].sort_values("entity")
+    assert df.entity.tolist() == ["A", "B", "C"]
+    assert df.value.tolist() == [1, 2, 3]
+    assert sorted(data["meta"].location) == ["A", "B", "C"]
+    # Checkpoint is updated with the collected data
+    assert pd.read_csv(hosp_dirs["INTERNAL_OUTPUT_HOSP_MAIN_DIR"] / "A.csv").value.tolist() == [1]
+    assert sorted(p.name for p in hosp_dirs["INTERNAL_OUTPUT_HOSP_MAIN_DIR"].iterdir()) == ["A.csv", "B.csv", "C.csv"]
@@ -0,0 +1,102 @@
+import hashlib
+import os
+import shutil
+import time
+
+import pandas as pd
+import pytest
+from botocore.exceptions import ClientError
+
+from cowidev.utils.s3 import S3Uploader, _url_to_path_and_bucket
+
+
+class LocalS3:
+    """Stand-in for `cowidev.utils.s3.S3`, storing objects in a local directory."""
+
+    def __init__(self, root):
+        self.root = root
+        self.metadata = {}
+        self.uploads = []
+
+    def _path(self, s3_path):
+        return os.path.join(self.root, *_url_to_path_and_bucket(s3_path))
+
+    def upload_to_s3(self, local_path, s3_path, public=False, metadata=None, config=None):
+        path = self._path(s3_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        shutil.copyfile(local_path, path)
+        self.metadata[s3_path] = metadata or {}
+        self.uploads.append(s3_path)
+
+    def get_metadata(self, s3_path):
+        path = self._path(s3_path)
+        if not os.path.isfile(path):
+            raise ClientError({"Error": {"Code": "404", "Message": "Not Found"}}, "HeadObject")
+        with open(path, "rb") as f:
+            etag = hashlib.md5(f.read()).hexdigest()
+        return {"ETag": f'"{etag}"', "Metadata": self.metadata[s3_path]}
+
+
+@pytest.fixture
+def s3(tmp_path):
+    return LocalS3(str(tmp_path / "s3"))
+
+
+@pytest.fixture
+def df():
+    return pd.DataFrame({"location": ["France", "Spain"], "value": [1.5, 2]})
+
+
+def test_upload_skips_unchanged_files(s3, tmp_path):
+    local_path = tmp_path / "data.csv"
+    local_path.write_text("a,b\n1,2\n")
+    with S3Uploader(s3=s3) as uploader:
+        uploader.upload(str(local_path), "s3://covid-19/public/data.csv")
+    with S3Uploader(s3=s3) as uploader:
+        uploader.upload(str(local_path), "s3://covid-19/public/data.csv")
+        assert uploader.wait() == {"s3://covid-19/public/data.csv": False}
+    local_path.write_text("a,b\n1,3\n")
+    with S3Uploader(s3=s3) as uploader:
+        uploader.upload(str(local_path), "s3://covid-19/public/data.csv")
+        assert uploader.wait() == {"s3://covid-19/public/data.csv": True}
+    assert s3.uploads == ["s3://covid-19/public/data.csv"] * 2
+
+
+def test_upload_compares_etag_without_metadata(s3, tmp_path):
+    local_path = tmp_path / "data.csv"
+    local_path.write_text("a,b\n1,2\n")
+    s3.upload_to_s3(str(local_path), "s3://covid-19/public/data.csv")
+    with S3Uploader(s3=s3) as uploader:
+        uploader.upload(str(local_path), "s3://covid-19/public/data.csv")
+        assert uploader.wait() == {"s3://covid-19/public/data.csv": False}
+
+
+def test_upload_skip_unchanged_disabled(s3, tmp_path):
+    local_path = tmp_path / "data.csv"
+    local_path.write_text("a,b\n1,2\n")
+    for _ in range(2):
+        with S3Uploader(s3=s3, skip_unchanged=False) as uploader:
+            uploader.upload(str(local_path), "s3://covid-19/public/data.csv")
+    assert len(s3.uploads) == 2
+
+
+@pytest.mark.parametrize("s3_path", ["s3://covid-19/public/data.csv", "s3://covid-19/public/data.xlsx"])
+def test_upload_obj_skips_unchanged_dataframes(s3, df, s3_path):
+    pytest.importorskip("xlsxwriter")
+    with S3Uploader(s3=s3) as uploader:
+        uploader.upload_obj(df, s3_path)
+    # XLSX files embed their creation time (with a resolution of one second)
+    time.sleep(1)
+    with S3Uploader(s3=s3) as uploader:
+        uploader.upload_obj(df, s3_path)
+        uploader.upload_obj(df.assign(value=[1.5, 3]), s3_path.replace("data", "data_new"))
+        assert uploader.wait() == {s3_path: False, s3_path.replace("data", "data_new"): True}
+    with S3Uploader(s3=s3) as uploader:
+        uploader.upload_obj(df.assign(value=[1.5, 3]), s3_path)
+        assert uploader.wait() == {s3_path: True}
+
+
+def test_upload_error_is_raised(s3, tmp_path):
+    with pytest.raises(FileNotFoundError):
+        with S3Uploader(s3=s3) as uploader:
+            uploader.upload(str(tmp_path / "missing.csv"), "s3://covid-19/public/data.csv")